@@ -1,2 +1,25 @@
-from .pymorse import *
+try:
+    import asyncore
+except ImportError:
+    # asyncore was removed from Python 3.12: only the asyncio client
+    # (pymorse.aio) is available
+    asyncore = None
 
+if asyncore:
+    from .pymorse import *
+else:
+    from .protocol import SUCCESS, FAILURE, PREEMPTED, MorseServiceError, \
+                          MorseServiceFailed, MorseServicePreempted
+
+    # the names of the asyncore-based client
+    _ASYNCORE_API = ('Morse', 'Component', 'Robot', 'ResponseCallback',
+                     'Stream', 'StreamB', 'StreamJSON', 'StreamBinary',
+                     'PollThread', 'MorseExecutor', 'TIMEOUT', 'BUFFER_SIZE')
+
+    def __getattr__(name):
+        if name in _ASYNCORE_API:
+            raise ImportError("pymorse.%s is not available: it relies on "
+                              "asyncore, which was removed from Python 3.12. "
+                              "Use the asyncio client instead: "
+                              "'from pymorse.aio import AsyncMorse'" % name)
+        raise AttributeError("module 'pymorse' has no attribute '%s'" % name)
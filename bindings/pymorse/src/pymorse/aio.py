@@ -0,0 +1,535 @@
+""" An asyncio client for MORSE (Python 3.5 or later).
+
+:class:`AsyncMorse` is the asyncio counterpart of :class:`pymorse.Morse`:
+all the datastreams and the services are handled by the event loop, with
+no thread nor polling, so that one process can follow hundreds of
+streams.
+
+.. code-block:: python
+
+    import asyncio
+    from pymorse.aio import AsyncMorse
+
+    async def main():
+        async with AsyncMorse() as simu:
+            # services return awaitables
+            print(await simu.r2d2.motion.get_status())
+            goto = simu.r2d2.motion.goto(2.5, 0, 0)
+
+            # streams can be iterated over
+            async for pose in simu.r2d2.pose:
+                print(pose['x'], pose['y'])
+                if goto.done():
+                    break
+
+    asyncio.run(main())
+
+(before Python 3.7, use
+``asyncio.get_event_loop().run_until_complete(main())`` instead of
+``asyncio.run``.)
+
+The robots and their components are exposed as with :class:`pymorse.Morse`.
+A component with a datastream offers:
+
+- ``await component.get(timeout=None)``: wait for the next message,
+- ``component.last()``: the last received message, or None,
+- ``async for msg in component``: the received messages, in order (up to
+  ``maxlen`` messages are kept if the reader is late),
+- ``component.subscribe(callback)`` (and ``unsubscribe``): call
+  ``callback(msg)`` for each received message,
+- ``component.publish(msg)``: send a message to an actuator.
+
+Messages are only decoded when they are read. Cancelling the awaitable
+returned by a service cancels the service in the simulator.
+"""
+import json
+import asyncio
+import logging
+import weakref
+from collections import deque
+
+from .protocol import MSG_SEPARATOR, BINARY_MAGIC, BINARY_PREFIX, \
+                      ReceiveBuffer, decode_binary_frame, normalize_name, \
+                      parse_response, rpc_get_result, MorseServiceFailed
+
+logger = logging.getLogger("pymorse")
+
+class _Connection(asyncio.Protocol):
+    """ Splits the data received on a socket into messages: lines, or
+    binary frames (see :class:`pymorse.stream.StreamBinary`) """
+    def __init__(self, on_message, on_close, binary=False):
+        self._on_message = on_message
+        self._on_close = on_close
+        self.transport = None
+        if binary:
+            self.data_received = self._frames_received
+            self._prefix = bytearray(BINARY_PREFIX.size)
+            self._frame = None
+            self._received = 0
+        else:
+            self._buffer = ReceiveBuffer()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def connection_lost(self, exc):
+        self._on_close(exc)
+
+    def data_received(self, data):
+        view = memoryview(data)
+        start = 0
+        while True:
+            end = data.find(MSG_SEPARATOR, start)
+            if end < 0:
+                self._buffer.append(view[start:])
+                return
+            if len(self._buffer):
+                self._buffer.append(view[start:end])
+                msg = self._buffer.take()
+            else:
+                msg = data[start:end]
+            start = end + len(MSG_SEPARATOR)
+            self._on_message(msg)
+
+    def _frames_received(self, data):
+        view = memoryview(data)
+        while view:
+            target = self._prefix if self._frame is None else self._frame
+            size = min(len(target) - self._received, len(view))
+            target[self._received:self._received + size] = view[:size]
+            self._received += size
+            view = view[size:]
+            if self._received < len(target):
+                return
+
+            if self._frame is None:
+                magic, header_size, payload_size = \
+                        BINARY_PREFIX.unpack(self._prefix)
+                if magic != BINARY_MAGIC:
+                    logger.error("Invalid binary frame received, closing stream")
+                    self.transport.close()
+                    return
+                self._frame = bytearray(len(self._prefix) + header_size +
+                                        payload_size)
+                self._frame[:len(self._prefix)] = self._prefix
+            else:
+                frame, self._frame = self._frame, None
+                self._received = 0
+                self._on_message(frame)
+
+
+class _StreamIterator(object):
+    def __init__(self, stream, maxlen):
+        self._stream = stream
+        self._queue = deque([], maxlen)
+        self._waiter = None
+
+    def _push(self, msg):
+        self._queue.append(msg)
+        if self._waiter and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def _close(self):
+        if self._waiter and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self._queue:
+            if self._stream.closed:
+                raise StopAsyncIteration
+            self._waiter = self._stream._loop.create_future()
+            await self._waiter
+        return self._stream._decode_once(self._queue.popleft())
+
+
+class AsyncStream(object):
+    """ A datastream of a component, on an asyncio event loop
+
+    :param binary: True if the stream sends binary frames (see
+                   :class:`pymorse.stream.StreamBinary`), False for JSON
+    :param maxlen: the number of messages kept for a late iterator
+    """
+    def __init__(self, loop, binary=False, maxlen=100):
+        self._loop = loop
+        self.binary = binary
+        self.maxlen = maxlen
+        self.closed = False
+        self._transport = None
+        self._last = None
+        # last decoded message, as (raw message, decoded message)
+        self._decoded = (None, None)
+        self._waiters = []
+        # iterators stop receiving messages when they are garbage collected
+        self._iterators = weakref.WeakSet()
+        self._callbacks = []
+
+    async def connect(self, host, port):
+        self._transport, _ = await self._loop.create_connection(
+                lambda: _Connection(self._on_message, self._on_close,
+                                    self.binary),
+                host, port)
+
+    def decode(self, msg_bytes):
+        if self.binary:
+            return decode_binary_frame(msg_bytes)
+        return json.loads(msg_bytes.decode())
+
+    def _decode_once(self, msg):
+        raw, decoded = self._decoded
+        if raw is not msg:
+            decoded = self.decode(msg)
+            self._decoded = (msg, decoded)
+        return decoded
+
+    def _on_message(self, msg):
+        self._last = msg
+        if self._waiters:
+            decoded = self._decode_once(msg)
+            waiters, self._waiters = self._waiters, []
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(decoded)
+        for iterator in list(self._iterators):
+            iterator._push(msg)
+        if self._callbacks:
+            decoded = self._decode_once(msg)
+            for callback in self._callbacks:
+                callback(decoded)
+
+    def _on_close(self, exc):
+        self.closed = True
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_exception(ConnectionError("stream closed"))
+        self._waiters = []
+        for iterator in list(self._iterators):
+            iterator._close()
+
+    def last(self):
+        """ Return the last received message, or None """
+        if self._last is None:
+            return None
+        return self._decode_once(self._last)
+
+    async def get(self, timeout=None):
+        """ Wait :param timeout: (in seconds, forever if None) for the next
+        message.
+
+        :returns: the decoded message, or None in case of timeout
+        """
+        if self.closed:
+            raise ConnectionError("stream closed")
+        waiter = self._loop.create_future()
+        self._waiters.append(waiter)
+        try:
+            return await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            logger.debug("get: timed out")
+            return None
+
+    def __aiter__(self):
+        iterator = _StreamIterator(self, self.maxlen)
+        self._iterators.add(iterator)
+        return iterator
+
+    def subscribe(self, callback):
+        self._callbacks.append(callback)
+
+    def unsubscribe(self, callback):
+        self._callbacks.remove(callback)
+
+    def publish(self, msg):
+        """ Encode :param msg: in JSON, and send it """
+        self._transport.write(json.dumps(msg).encode() + MSG_SEPARATOR)
+
+    def close(self):
+        if self._transport:
+            self._transport.close()
+
+
+class AsyncComponent(object):
+    def __init__(self, morse, name, fqn, services = []):
+        self._morse = morse
+        self.name = name
+        self.fqn = fqn # fully qualified name
+        self.stream = None
+
+        for service in services:
+            self._add_service(service)
+
+    def _add_service(self, method):
+        def innermethod(*args):
+            return self._morse.rpc(self.fqn, method, *args)
+
+        innermethod.__doc__ = "This method is a proxy for the MORSE %s service." % method
+        innermethod.__name__ = str(method)
+        setattr(self, innermethod.__name__, innermethod)
+
+    def _set_stream(self, stream, directions):
+        self.stream = stream
+        if 'IN' in directions:
+            self.publish = stream.publish
+        if 'OUT' in directions:
+            self.get = stream.get
+            self.last = stream.last
+            self.subscribe = stream.subscribe
+            self.unsubscribe = stream.unsubscribe
+
+    def __aiter__(self):
+        if self.stream is None:
+            raise TypeError("%s has no datastream" % self.fqn)
+        return self.stream.__aiter__()
+
+    def close(self):
+        if self.stream:
+            self.stream.close()
+
+class AsyncRobot(dict, AsyncComponent):
+    __setattr__ = dict.__setitem__
+    __delattr__ = dict.__delitem__
+
+    def __init__(self, morse, name, fqn, services = []):
+        AsyncComponent.__init__(self, morse, name, fqn, services)
+
+    def __getattr__(self, name):
+        try:
+            return dict.__getitem__(self, name)
+        except KeyError:
+            raise AttributeError(name)
+
+
+class AsyncMorse(object):
+    """ The asyncio proxy of the MORSE simulator
+
+    Use it as an asynchronous context manager (``async with AsyncMorse()
+    as simu:``), or create it with ``simu = await AsyncMorse.connect()``
+    and call :py:meth:`close` before leaving.
+
+    :param host: the simulator host (default: localhost)
+    :param port: the port of the simulator socket interface (default: 4000)
+    :param loop: the event loop (default: the current one)
+    :param streams: if False, the datastreams are not connected (only the
+                    services are available)
+    """
+    def __init__(self, host = "localhost", port = 4000, loop = None,
+                 streams = True):
+        self.host = host
+        self.port = port
+        self._loop = loop or asyncio.get_event_loop()
+        self._with_streams = streams
+        self._transport = None
+        self._next_id = 0
+        self._pending = {}
+        self._components = []
+        self.robots = []
+
+    @classmethod
+    async def connect(cls, host = "localhost", port = 4000, loop = None,
+                      streams = True):
+        morse = cls(host, port, loop, streams)
+        await morse._connect()
+        return morse
+
+    async def _connect(self):
+        self._transport, _ = await self._loop.create_connection(
+                lambda: _Connection(self._on_response, self._on_close),
+                self.host, self.port)
+        await self.initialize_api()
+
+    def is_up(self):
+        return self._transport is not None and not self._transport.is_closing()
+
+    #### services ####
+    def rpc(self, component, service, *args):
+        """ Call a service of the simulator.
+
+        :returns: an asyncio future, done with the result of the service.
+                  Cancelling it cancels the service.
+        """
+        return self._request("%s %s %s" % (component, service, json.dumps(args)))
+
+    def _request(self, request):
+        if not self.is_up():
+            raise ConnectionError("simulation service is down")
+        req_id = '%i' % self._next_id
+        self._next_id += 1
+        future = self._loop.create_future()
+        self._pending[req_id] = future
+        future.add_done_callback(lambda f: self._rpc_done(req_id, f))
+        raw = "%s %s" % (req_id, request)
+        logger.debug(raw)
+        self._transport.write(raw.encode() + MSG_SEPARATOR)
+        return future
+
+    def batch(self, calls):
+        """ Call several services in one request: they are invoked during
+        the same simulation step.
+
+        :param calls: list of ``(component, service, arg1, arg2...)``
+        :returns: an asyncio future, done when all the services are
+                  completed, with the list of their results (a failed
+                  service gives its exception in place of its result,
+                  like ``asyncio.gather(..., return_exceptions=True)``)
+        """
+        calls = [[call[0], call[1], list(call[2:])] for call in calls]
+        future = self._loop.create_future()
+        def done(batch):
+            if future.cancelled():
+                return
+            if batch.exception():
+                future.set_exception(batch.exception())
+                return
+            results = []
+            for status, result in batch.result():
+                try:
+                    results.append(rpc_get_result({'status': status,
+                                                   'result': result}))
+                except Exception as e:
+                    results.append(e)
+            future.set_result(results)
+        batch = self._request("batch " + json.dumps(calls))
+        batch.add_done_callback(done)
+        future.add_done_callback(lambda f: f.cancelled() and batch.cancel())
+        return future
+
+    def _rpc_done(self, req_id, future):
+        self._pending.pop(req_id, None)
+        if future.cancelled() and self.is_up():
+            self._transport.write(("%s cancel" % req_id).encode() + MSG_SEPARATOR)
+
+    def _on_response(self, raw):
+        response = parse_response(raw.decode())
+        future = self._pending.get(response['id'])
+        if not future or future.done():
+            return
+        try:
+            future.set_result(rpc_get_result(response))
+        except Exception as e:
+            future.set_exception(e)
+
+    def _on_close(self, exc):
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("simulation service is down"))
+
+    #### scene ####
+    async def initialize_api(self):
+        """ Ask MORSE for the scene structure, create the corresponding
+        objects in 'self', and connect the datastreams (concurrently). """
+        details = await asyncio.wait_for(self.rpc('simulation', 'details'), 15)
+        if not details:
+            raise ValueError("simulation details not available")
+        connections = []
+        for robot_detail in details["robots"]:
+            name = normalize_name(robot_detail["name"])
+            self.robots.append(name)
+            robot = AsyncRobot(self, robot_detail['name'], robot_detail['name'],
+                               services = robot_detail.get('services', []))
+            setattr(self, name, robot)
+
+            components = robot_detail["components"]
+            # parents must be created before children
+            for component in sorted(components.keys()):
+                connection = self._add_component(robot, component,
+                                                 components[component])
+                if connection:
+                    connections.append(connection)
+        await asyncio.gather(*connections)
+
+    def _add_component(self, robot, fqn, details):
+        name = fqn.split('.')[1:] # the first token is always the robot name
+        if not name:
+            logger.error("Component <%s> of robot <%s> has an invalid name!" %
+                         (fqn, robot.name))
+            return None
+
+        cmpt = AsyncComponent(self, name[-1], fqn, details.get('services', []))
+        self._components.append(cmpt)
+        if len(name) == 1:
+            robot[name[0]] = cmpt
+        else:
+            subcmpt = robot[name[0]]
+            for sub in name[1:-1]:
+                subcmpt = getattr(subcmpt, sub)
+            if hasattr(subcmpt, name[-1]):
+                raise RuntimeError("Sub-component name <%s> conflicts with "
+                        "<%s.%s> member." % (name[-1], subcmpt.name, name[-1]))
+            setattr(subcmpt, name[-1], cmpt)
+
+        stream = details.get('stream_interfaces')
+        if stream and self._with_streams:
+            return self._connect_stream(cmpt, stream)
+        return None
+
+    async def _connect_stream(self, cmpt, stream):
+        try:
+            port = await self.get_stream_port(cmpt.fqn)
+        except MorseServiceFailed:
+            logger.warning('Component <%s> has a non-socket stream: '
+                           'datastream via pymorse not supported', cmpt.fqn)
+            return
+        binary = any(len(s) > 2 and s[2] == 'binary' for s in stream)
+        async_stream = AsyncStream(self._loop, binary)
+        await async_stream.connect(self.host, port)
+        cmpt._set_stream(async_stream, set(s[1] for s in stream))
+
+    def close(self):
+        """ Close the datastreams, and the connection to the simulator """
+        for cmpt in self._components:
+            cmpt.close()
+        if self._transport:
+            self._transport.close()
+
+    #### asynchronous with statement ####
+    async def __aenter__(self):
+        await self._connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    #####################################################################
+    ###### Predefined methods to interact with the simulator
+
+    def quit(self):
+        return self.rpc("simulation", "quit")
+
+    def reset(self):
+        return self.rpc("simulation", "reset_objects")
+
+    def streams(self):
+        return self.rpc("simulation", "list_streams")
+
+    def get_stream_port(self, stream):
+        return self.rpc("simulation", "get_stream_port", stream)
+
+    def activate(self, cmpnt):
+        return self.rpc("simulation", "activate", cmpnt)
+
+    def deactivate(self, cmpnt):
+        return self.rpc("simulation", "deactivate", cmpnt)
+
+    def sleep(self, time):
+        """ Wait for time second, in simulated time (in Lockstep mode,
+        the simulation must be stepped meanwhile, see
+        :py:meth:`pymorse.Morse.sleep`) """
+        return self.rpc("time", "sleep", time)
+
+    def time(self):
+        """ Return the simulated time, in seconds, since Epoch """
+        return self.rpc("time", "now")
+
+    def step(self, n = 1):
+        """ Advance the simulation by n steps (only in Lockstep mode), see
+        :py:meth:`pymorse.Morse.step` """
+        return self.rpc("time", "step", n)
+
+    def run_until(self, time):
+        """ Advance the simulation until the simulated time reaches time
+        (only in Lockstep mode) """
+        return self.rpc("time", "run_until", time)
@@ -0,0 +1,149 @@
+""" Encoding of the robot poses exchanged between the MORSE nodes and the
+multinode server (see the ``multinode_server`` program).
+
+Messages are still newline-separated JSON documents (see
+:class:`pymorse.stream.StreamJSON`), but the poses are packed in a
+compact binary form: each pose is a ``POSE`` record (a robot id, the
+position and the euler rotation, as little-endian float32), and the
+records of a message are concatenated and base64-encoded.
+
+A node sends ``[node_name, message]``, the server replies ``message``,
+where ``message`` is a dictionary with the keys:
+
+- ``'__version'``: ``PROTOCOL_VERSION``
+- ``'__names'``: the ``{name: id}`` of the robots appearing for the first
+  time on this connection (ids are given by the sender, and are only
+  valid on this connection)
+- ``'__poses'``: the packed poses, only the ones which changed
+- ``'__time'``: ``[simulated time, time step, real time]`` (node only)
+- ``'__subscribe'``: the ``Subscription`` of the node (node only,
+  when it changes)
+
+Messages without ``'__version'`` are the original protocol, a
+dictionary ``{robot_name: [position, rotation]}``.
+"""
+import math
+import base64
+import struct
+
+PROTOCOL_VERSION = 2
+
+# robot id, x, y, z, rx, ry, rz
+POSE = struct.Struct('<H6f')
+
+def encode_poses(records):
+    """ Pack a list of ``POSE`` records (as returned by
+    :func:`pack_pose`) in a string """
+    return base64.b64encode(b''.join(records)).decode('ascii')
+
+def pack_pose(robot_id, position, rotation):
+    return POSE.pack(robot_id, position[0], position[1], position[2],
+                     rotation[0], rotation[1], rotation[2])
+
+def decode_poses(payload):
+    """ Return the list of ``(robot id, position, rotation)`` packed in
+    :param payload: """
+    raw = base64.b64decode(payload)
+    size = POSE.size
+    res = []
+    for offset in range(0, len(raw) - len(raw) % size, size):
+        values = POSE.unpack_from(raw, offset)
+        res.append((values[0], values[1:4], values[4:7]))
+    return res
+
+def pose_changed(previous, position, rotation,
+                 position_threshold, orientation_threshold):
+    """ Return True if the pose moved from :param previous: (a
+    ``(position, rotation)`` tuple, or None) by more than the thresholds.
+    """
+    if previous is None:
+        return True
+    last_position, last_rotation = previous
+    for i in range(3):
+        if abs(position[i] - last_position[i]) > position_threshold:
+            return True
+    for i in range(3):
+        delta = abs(rotation[i] - last_rotation[i]) % (2 * math.pi)
+        if min(delta, 2 * math.pi - delta) > orientation_threshold:
+            return True
+    return False
+
+
+class RobotIds(object):
+    """ Ids of the robots on one side of a connection.
+
+    Ids are given on first use, and the ones which have not yet been
+    announced to the other side are returned by :meth:`announce`.
+    """
+    def __init__(self):
+        self._ids = {}
+        self._names = {}
+        self._new = {}
+
+    def id(self, name):
+        try:
+            return self._ids[name]
+        except KeyError:
+            robot_id = len(self._ids)
+            if robot_id >= 1 << 16:
+                raise ValueError("too many robots")
+            self._ids[name] = robot_id
+            self._names[robot_id] = name
+            self._new[name] = robot_id
+            return robot_id
+
+    def announce(self):
+        """ Return the ids given since the last call """
+        new, self._new = self._new, {}
+        return new
+
+    def forget_announces(self):
+        """ Announce again all the ids, e.g. for a new connection """
+        self._new = dict(self._ids)
+
+    def learn(self, names):
+        """ Record the ids announced by the other side """
+        for name, robot_id in names.items():
+            self._ids[name] = robot_id
+            self._names[robot_id] = name
+
+    def name(self, robot_id):
+        return self._names.get(robot_id)
+
+
+class Subscription(object):
+    """ The robots a node wants to receive.
+
+    :param robots: if set, only the robots with these names
+    :param region: if set, only the robots whose position is in the
+                   ``[xmin, ymin, xmax, ymax]`` area
+    """
+    def __init__(self, robots=None, region=None):
+        self.robots = set(robots) if robots else None
+        if region is not None and len(region) != 4:
+            raise ValueError("a region is [xmin, ymin, xmax, ymax]")
+        self.region = list(region) if region is not None else None
+
+    def accepts(self, name, position):
+        if self.robots is not None and name not in self.robots:
+            return False
+        if self.region is not None:
+            xmin, ymin, xmax, ymax = self.region
+            return xmin <= position[0] <= xmax and ymin <= position[1] <= ymax
+        return True
+
+    @property
+    def everything(self):
+        return self.robots is None and self.region is None
+
+    def to_dict(self):
+        res = {}
+        if self.robots is not None:
+            res['robots'] = sorted(self.robots)
+        if self.region is not None:
+            res['region'] = self.region
+        return res
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('robots'), data.get('region'))
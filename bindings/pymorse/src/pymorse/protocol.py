@@ -0,0 +1,137 @@
+""" The protocol spoken by the MORSE socket interface, shared by the
+threaded (:mod:`pymorse.pymorse`) and asyncio (:mod:`pymorse.aio`)
+clients: framing of the datastreams, and requests to the services.
+"""
+import json
+import struct
+import logging
+
+logger = logging.getLogger("pymorse")
+
+SUCCESS='SUCCESS'
+FAILURE='FAILED'
+PREEMPTED='PREEMPTED'
+
+class MorseServiceError(Exception):
+    """ Morse Service Exception thrown when unknown error """
+
+class MorseServiceFailed(Exception):
+    """ Morse Service Exception thrown when failed error """
+
+class MorseServicePreempted(Exception):
+    """ Morse Service Exception thrown when preempted error """
+
+MSG_SEPARATOR=b"\n"
+
+# Binary framing, see morse.middleware.socket_datastream.encode_binary_frame
+BINARY_MAGIC = b'MRSB'
+BINARY_PREFIX = struct.Struct('<4sII')
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+def decode_binary_frame(msg_bytes):
+    """ Decode a binary frame (see :class:`pymorse.stream.StreamBinary`) to a dictionary.
+
+    Bulk fields are not copied: they are returned as numpy arrays (or
+    memoryviews, if numpy is not available) over :param msg_bytes:
+    """
+    _, header_size, _ = BINARY_PREFIX.unpack_from(msg_bytes)
+    view = memoryview(msg_bytes)
+    offset = BINARY_PREFIX.size
+    header = json.loads(bytes(view[offset:offset + header_size]).decode())
+    offset += header_size
+
+    msg = header['fields']
+    for layout in header['buffers']:
+        raw = view[offset:offset + layout['size']]
+        offset += layout['size']
+        msg[layout['name']] = _decode_buffer(raw, layout)
+    return msg
+
+def _decode_buffer(raw, layout):
+    shape = layout['shape']
+    if numpy:
+        return numpy.frombuffer(raw, dtype=numpy.dtype(layout['format'])).reshape(shape)
+    if layout['format'] == 'B' and len(shape) == 1:
+        return raw
+    return raw.cast(layout['format'], shape)
+
+# Initial size of the receive buffer of line-based streams, in bytes
+RECEIVE_BUFFER_SIZE = 64 * 1024
+
+class ReceiveBuffer(object):
+    """ A growable receive buffer
+
+    The data are appended in a preallocated buffer, whose size doubles
+    when it is full, instead of concatenating bytes (which copies the whole
+    message at each received chunk).
+    """
+    def __init__(self, size=RECEIVE_BUFFER_SIZE):
+        self._buffer = bytearray(size)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, data):
+        end = self._size + len(data)
+        if end > len(self._buffer):
+            self._buffer.extend(bytes(max(end, 2 * len(self._buffer)) -
+                                      len(self._buffer)))
+        self._buffer[self._size:end] = data
+        self._size = end
+
+    def take(self):
+        """ Return the content of the buffer (as bytes), and empty it """
+        msg = bytes(memoryview(self._buffer)[:self._size])
+        self._size = 0
+        return msg
+
+def normalize_name(name):
+    """Normalize Blender names to get valid Python identifiers"""
+    normalized = name
+    for illegal in ".-~":
+        normalized = normalized.replace(illegal, "_")
+    return normalized
+
+def parse_response(raw):
+    result = None
+    try:
+        msg_id, status, result = raw.split(' ', 2)
+        try:
+            result = json.loads(result)
+        except TypeError:
+            logger.error("Could not deserialize MORSE answer! Got: <%s>" % result)
+    except ValueError:
+        # No return value
+        if ' ' in raw:
+            msg_id, status = raw.split(' ')
+        else:
+            logger.error("Could not receive a valid response from MORSE: <%s>" % raw)
+            msg_id = '???'
+            status = FAILURE
+
+    logger.debug("Got answer: %s, %s"%(status, result))
+    return {
+        "id": msg_id,
+        "status": status,
+        "result": result,
+    }
+
+def rpc_get_result(response):
+    result = response['result']
+    status = response['status']
+
+    if status == SUCCESS:
+        return result
+    elif status == FAILURE:
+        if result and "wrong # of parameters" in result:
+            raise TypeError(result)
+        raise MorseServiceFailed(result)
+    elif status == PREEMPTED:
+        raise MorseServicePreempted(result)
+    else:
+        raise MorseServiceError(result)
@@ -229,6 +229,15 @@ be rewritten:
             print("Here we are")
 
 
+asyncio
+-------
+
+:py:mod:`pymorse.aio` offers the same API on an asyncio event loop
+(services return awaitables, and streams can be iterated over with
+``async for``), without threads: use it to follow many robots from one
+process. It is also the only client available from Python 3.12, where
+``asyncore`` was removed.
+
 Simulator control
 -----------------
 
@@ -298,7 +307,10 @@ import threading
 import re
 
 from .future import MorseExecutor
-from .stream import Stream, StreamJSON, PollThread
+from .stream import Stream, StreamJSON, StreamBinary, PollThread
+from .protocol import SUCCESS, FAILURE, PREEMPTED, MorseServiceError, \
+                      MorseServiceFailed, MorseServicePreempted, \
+                      normalize_name, parse_response, rpc_get_result
 
 logger = logging.getLogger("pymorse")
 logger.setLevel(logging.WARNING)
@@ -306,20 +318,6 @@ logger.setLevel(logging.WARNING)
 
 TIMEOUT=8
 BUFFER_SIZE=8192
-SUCCESS='SUCCESS'
-FAILURE='FAILED'
-PREEMPTED='PREEMPTED'
-
-class MorseServiceError(Exception):
-    """ Morse Service Exception thrown when unknown error """
-
-class MorseServiceFailed(Exception):
-    """ Morse Service Exception thrown when failed error """
-
-class MorseServicePreempted(Exception):
-    """ Morse Service Exception thrown when preempted error """
-
-
 class Component(object):
     def __init__(self, morse, name, fqn, stream = None, port = None, services = []):
         self._morse = morse
@@ -329,10 +327,14 @@ class Component(object):
         self.stream = None
         self._init = False
         self._port = port
+        self._stream_binary = False
         if not stream:
             self._stream_dir = set()
         else:
             self._stream_dir = set([s[1] for s in stream])
+            # Older simulators do not report the stream format
+            self._stream_binary = any(len(s) > 2 and s[2] == 'binary'
+                                      for s in stream)
 
         for service in services:
             logger.debug("Adding service %s to component %s" % (service, self.name))
@@ -343,7 +345,10 @@ class Component(object):
             return
 
         if self._port:
-            self.stream = StreamJSON(self._morse.host, self._port)
+            if self._stream_binary:
+                self.stream = StreamBinary(self._morse.host, self._port)
+            else:
+                self.stream = StreamJSON(self._morse.host, self._port)
 
             if 'IN' in self._stream_dir:
                 self.publish = self.stream.publish
@@ -392,52 +397,6 @@ class Robot(dict, Component):
             comp.lazy_init()
         return comp
 
-def normalize_name(name):
-    """Normalize Blender names to get valid Python identifiers"""
-    normalized = name
-    for illegal in ".-~":
-        normalized = normalized.replace(illegal, "_")
-    return normalized
-
-def parse_response(raw):
-    result = None
-    try:
-        msg_id, status, result = raw.split(' ', 2)
-        try:
-            result = json.loads(result)
-        except TypeError:
-            logger.error("Could not deserialize MORSE answer! Got: <%s>" % result)
-    except ValueError:
-        # No return value
-        if ' ' in raw:
-            msg_id, status = raw.split(' ')
-        else:
-            logger.error("Could not receive a valid response from MORSE: <%s>" % raw)
-            msg_id = '???'
-            status = FAILURE
-
-    logger.debug("Got answer: %s, %s"%(status, result))
-    return {
-        "id": msg_id,
-        "status": status,
-        "result": result,
-    }
-
-def rpc_get_result(response):
-    result = response['result']
-    status = response['status']
-
-    if status == SUCCESS:
-        return result
-    elif status == FAILURE:
-        if result and "wrong # of parameters" in result:
-            raise TypeError(result)
-        raise MorseServiceFailed(result)
-    elif status == PREEMPTED:
-        raise MorseServicePreempted(result)
-    else:
-        raise MorseServiceError(result)
-
 class ResponseCallback:
     _conditions = []
     def __init__(self, req_id):
@@ -673,6 +632,11 @@ class Morse(object):
 
         Time may be a float. Contrary to ``time.sleep``, this method
         consider the simulated time.
+
+        In Lockstep mode, the simulated time only advances with
+        :py:meth:`step` and :py:meth:`run_until`: use
+        ``run_until(self.time() + time)`` instead, unless another thread
+        steps the simulation.
         """
         return self.rpc("time", "sleep", time)
 
@@ -684,6 +648,25 @@ class Morse(object):
         """
         return self.rpc("time", "now")
 
+    def step(self, n = 1):
+        """ Advance the simulation by n steps (only in Lockstep mode, see
+        ``env.set_time_strategy(TimeStrategies.Lockstep)``).
+
+        Block until the steps are simulated, and return a report
+        containing the number of simulated steps, the simulated time,
+        the wall-clock time the steps took (``wall_time``), and the
+        resulting ``real_time_factor``.
+        """
+        return self.rpc("time", "step", n)
+
+    def run_until(self, time):
+        """ Advance the simulation until the simulated time reaches time
+        (only in Lockstep mode).
+
+        Return the same report than :py:meth:`step`.
+        """
+        return self.rpc("time", "run_until", time)
+
     #### with statement ####
     def __enter__(self):
         return self
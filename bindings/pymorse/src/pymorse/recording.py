@@ -0,0 +1,243 @@
+""" Recordings of the data of MORSE components.
+
+A recording is a directory, with one sub-directory per recorded
+component (see ``add_stream('record')`` in the Builder API), holding:
+
+- ``schema.json``: the name of the component, and the description of its
+  data fields
+- ``index.bin``: one ``INDEX`` entry per sample, in time order: the
+  timestamp (float64), then the chunk number (uint32), offset (uint64)
+  and size (uint32) of the sample
+- ``chunk_00000.bin``, ``chunk_00001.bin``...: the samples, as binary
+  frames (see :class:`pymorse.stream.StreamBinary`), where images, depth
+  buffers and other bulk fields are stored raw. The size of the chunks is
+  bounded, so that they can be mapped in memory.
+
+Reading a sample does not copy it: its bulk fields are numpy arrays
+over the mapped chunk.
+
+.. code-block:: python
+
+    from pymorse.recording import Recording
+
+    with Recording('/tmp/dataset') as recording:
+        camera = recording['robot.camera']
+        for sample in camera:
+            image = sample['image']
+        depth = recording['robot.depth'].sample_at(12.5)
+"""
+import os
+import json
+import mmap
+import bisect
+import struct
+
+from .protocol import decode_binary_frame
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+RECORDING_VERSION = 1
+
+INDEX = struct.Struct('<dIQI')
+INDEX_FILE = 'index.bin'
+SCHEMA_FILE = 'schema.json'
+CHUNK_FILE = 'chunk_%05d.bin'
+# Default maximal size of a chunk, in bytes
+CHUNK_SIZE = 256 * 1024 * 1024
+
+class StreamWriter(object):
+    """ Write the samples of a component in the directory :param path:
+
+    :param schema: JSON-serialisable description of the component data
+    :param chunk_size: maximal size of a chunk, in bytes (a sample bigger
+                       than this size gets a chunk of its own)
+    """
+    def __init__(self, path, schema=None, chunk_size=CHUNK_SIZE):
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        self.path = path
+        self.chunk_size = chunk_size
+        self.count = 0
+        with open(os.path.join(path, SCHEMA_FILE), 'w') as f:
+            json.dump({'version': RECORDING_VERSION,
+                       'name': os.path.basename(path),
+                       'fields': schema or {}}, f, indent=1)
+        self._index = open(os.path.join(path, INDEX_FILE), 'wb')
+        self._chunk = None
+        self._chunk_number = -1
+        self._offset = 0
+        self._last_time = None
+
+    def _new_chunk(self):
+        if self._chunk:
+            self._chunk.close()
+        self._chunk_number += 1
+        self._offset = 0
+        self._chunk = open(os.path.join(self.path,
+                                        CHUNK_FILE % self._chunk_number), 'wb')
+
+    def write(self, sample):
+        """ Append a :param sample:, as a ``(timestamp, frame)`` tuple. The
+        frame is a bytes-like object, or a list of them. Timestamps must not
+        decrease. """
+        timestamp, frame = sample
+        if self._last_time is not None and timestamp < self._last_time:
+            raise ValueError("samples must be written in time order")
+        self._last_time = timestamp
+
+        if isinstance(frame, list):
+            size = sum(memoryview(part).nbytes for part in frame)
+        else:
+            frame = [frame]
+            size = memoryview(frame[0]).nbytes
+
+        if self._chunk is None or \
+           (self._offset and self._offset + size > self.chunk_size):
+            self._new_chunk()
+        self._chunk.writelines(frame)
+        self._index.write(INDEX.pack(timestamp, self._chunk_number,
+                                     self._offset, size))
+        self._offset += size
+        self.count += 1
+
+    def flush(self):
+        if self._chunk:
+            self._chunk.flush()
+        self._index.flush()
+
+    def close(self):
+        if self._chunk:
+            self._chunk.close()
+            self._chunk = None
+        self._index.close()
+
+
+class StreamReader(object):
+    """ Read the samples of a component, recorded by :class:`StreamWriter`
+    in the directory :param path: """
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, SCHEMA_FILE)) as f:
+            self.schema = json.load(f)
+        self.name = self.schema['name']
+
+        with open(os.path.join(path, INDEX_FILE), 'rb') as f:
+            raw = f.read()
+        raw = raw[:len(raw) - len(raw) % INDEX.size]
+        if numpy:
+            index = numpy.frombuffer(raw, dtype=numpy.dtype(
+                                        [('time', '<f8'), ('chunk', '<u4'),
+                                         ('offset', '<u8'), ('size', '<u4')]))
+            self.times = index['time']
+            self._locations = index[['chunk', 'offset', 'size']]
+        else:
+            entries = [INDEX.unpack_from(raw, offset)
+                       for offset in range(0, len(raw), INDEX.size)]
+            self.times = [entry[0] for entry in entries]
+            self._locations = [entry[1:] for entry in entries]
+        self._chunks = {}
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def start_time(self):
+        return float(self.times[0]) if len(self) else None
+
+    @property
+    def end_time(self):
+        return float(self.times[-1]) if len(self) else None
+
+    def _map(self, chunk):
+        try:
+            return self._chunks[chunk]
+        except KeyError:
+            with open(os.path.join(self.path, CHUNK_FILE % chunk), 'rb') as f:
+                mapped = self._chunks[chunk] = \
+                        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return mapped
+
+    def frame(self, i):
+        """ Return the raw frame of the sample :param i:, as a memoryview
+        over the mapped chunk """
+        chunk, offset, size = self._locations[i]
+        offset = int(offset)
+        return memoryview(self._map(int(chunk)))[offset:offset + int(size)]
+
+    def timestamp(self, i):
+        return float(self.times[i])
+
+    def __getitem__(self, i):
+        """ Return the sample :param i: as a dictionary """
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("sample %d out of range" % i)
+        return decode_binary_frame(self.frame(i))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def index_at(self, timestamp):
+        """ Return the index of the last sample recorded at or before
+        :param timestamp:, -1 if there is none """
+        if numpy:
+            return int(numpy.searchsorted(self.times, timestamp, 'right')) - 1
+        return bisect.bisect_right(self.times, timestamp) - 1
+
+    def sample_at(self, timestamp):
+        """ Return the last sample recorded at or before :param timestamp:,
+        or None """
+        i = self.index_at(timestamp)
+        return self[i] if i >= 0 else None
+
+    def close(self):
+        for mapped in self._chunks.values():
+            try:
+                mapped.close()
+            except BufferError:
+                # samples still reference it, it will be closed with them
+                pass
+        self._chunks = {}
+
+
+class Recording(object):
+    """ A recording directory: gives a :class:`StreamReader` per recorded
+    component """
+    def __init__(self, path):
+        self.path = path
+        self.streams = {}
+        for name in sorted(os.listdir(path)):
+            if os.path.exists(os.path.join(path, name, INDEX_FILE)):
+                self.streams[name] = StreamReader(os.path.join(path, name))
+
+    def __getitem__(self, name):
+        return self.streams[name]
+
+    def __contains__(self, name):
+        return name in self.streams
+
+    @property
+    def start_time(self):
+        times = [s.start_time for s in self.streams.values() if len(s)]
+        return min(times) if times else None
+
+    @property
+    def end_time(self):
+        times = [s.end_time for s in self.streams.values() if len(s)]
+        return max(times) if times else None
+
+    def close(self):
+        for stream in self.streams.values():
+            stream.close()
+
+    #### with statement ####
+    def __enter__(self):
+        return self
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
@@ -7,6 +7,7 @@ s.publish("GET /\r\n")
 s.get(.5) or s.last()
 """
 import json
+import errno
 import socket
 import logging
 import asyncore
@@ -20,7 +21,8 @@ logger = logging.getLogger("pymorse")
 logger.setLevel(logging.WARNING)
 # logger.addHandler( logging.NullHandler() )
 
-MSG_SEPARATOR=b"\n"
+from .protocol import MSG_SEPARATOR, BINARY_MAGIC, BINARY_PREFIX, \
+                      ReceiveBuffer, decode_binary_frame
 
 class PollThread(threading.Thread):
     def __init__(self, timeout=0.01):
@@ -60,8 +62,10 @@ class StreamB(asynchat.async_chat):
         if not sock:
             sock = socket.socket(family=socket.AF_INET, type=socket.SOCK_STREAM)
             sock.connect( (host, port) )
-        self._in_buffer  = b""
+        self._in_buffer  = ReceiveBuffer()
         self._in_queue   = deque([], maxlen)
+        # last decoded message, as (raw message, decoded message)
+        self._decoded    = (None, None)
         self._callbacks  = []
         self._cv_new_msg = threading.Condition()
         # init asynchat after connect and setting all locals avoids EBADF
@@ -96,37 +100,47 @@ class StreamB(asynchat.async_chat):
     #### IN ####
     def collect_incoming_data(self, data):
         """Buffer the data"""
-        self._in_buffer += data
+        self._in_buffer.append(data)
 
     def found_terminator(self):
-        self.handle_msg(self._in_buffer)
-        self._in_buffer = b""
+        self.handle_msg(self._in_buffer.take())
 
     def handle_msg(self, msg):
         """ append new raw :param msg: in the input queue
 
-        and call subscribed callback methods if any
+        and call subscribed callback methods if any. Messages are only
+        decoded when they are read (see :meth:`last` and :meth:`get`), or
+        if callbacks are subscribed.
         """
         with self._cv_new_msg:
             self._in_queue.append(msg)
             self._cv_new_msg.notify_all()
         # handle callback(s)
-        decoded_msg = None
-        for callback in self._callbacks:
-            if not decoded_msg:
-                decoded_msg = self.decode( msg )
-            callback( decoded_msg )
+        if self._callbacks:
+            decoded_msg = self._decode_once(msg)
+            for callback in self._callbacks:
+                callback( decoded_msg )
+
+    def _decode_once(self, msg):
+        """ decode :param msg:, unless it was the last decoded one """
+        raw, decoded = self._decoded
+        if raw is not msg:
+            decoded = self.decode( msg )
+            self._decoded = (msg, decoded)
+        return decoded
 
     def _msg_available(self):
         return bool(self._in_queue)
 
     def _get_last_msg(self):
-        return self.decode( self._in_queue[-1] )
+        return self._decode_once( self._in_queue[-1] )
 
-    # TODO implement last n msg decode and msg_queue with hash(msg) -> decoded msg
     def last(self, n=1):
         """ get the last message received
 
+        A message is decoded once: successive calls return the same object
+        until a new message is received.
+
         :returns: decoded message or None if no message available
         """
         with self._cv_new_msg:
@@ -228,3 +242,72 @@ class StreamJSON(Stream):
     def encode(self, msg_obj):
         """ encode object to json string and then bytes """
         return Stream.encode(self, json.dumps(msg_obj))
+
+
+class StreamBinary(StreamB):
+    """ Binary Stream
+
+    Decodes the binary frames published by MORSE socket datastreams
+    configured with ``add_stream('socket', format='binary')``.
+
+    Messages are decoded to a dictionary. Bulk fields (images, depth
+    points, range lists...) are not copied: they are returned as numpy
+    arrays (or memoryviews, if numpy is not available) over the
+    received frame.
+
+    The size of each frame is known from its prefix: the frame is received
+    directly in a buffer of this size, without intermediate copies.
+
+    Binary streams are output only (MORSE does not read binary frames):
+    :py:meth:`publish` is not supported, and raises a ``TypeError``.
+    """
+    def __init__(self, host='localhost', port=1234, maxlen=100, sock=None):
+        self._prefix = bytearray(BINARY_PREFIX.size)
+        self._frame = None
+        self._received = 0
+        StreamB.__init__(self, host, port, maxlen, sock)
+
+    #### IN ####
+    def handle_read(self):
+        if self._frame is None:
+            view = memoryview(self._prefix)
+        else:
+            view = memoryview(self._frame)
+        try:
+            received = self.socket.recv_into(view[self._received:])
+        except socket.error as e:
+            if e.args[0] in (errno.EWOULDBLOCK, errno.EAGAIN, errno.EINTR):
+                return
+            self.handle_close()
+            return
+        if not received:
+            self.handle_close()
+            return
+        self._received += received
+        if self._received < len(view):
+            return
+
+        if self._frame is None:
+            magic, header_size, payload_size = BINARY_PREFIX.unpack(self._prefix)
+            if magic != BINARY_MAGIC:
+                logger.error("Invalid binary frame received, closing stream")
+                self.handle_close()
+                return
+            # keep the prefix, and wait for the rest of the frame
+            self._frame = bytearray(len(self._prefix) + header_size + payload_size)
+            self._frame[:len(self._prefix)] = self._prefix
+        else:
+            # the frame now belongs to the decoded messages, a new one is
+            # allocated for the next frame
+            frame, self._frame = self._frame, None
+            self._received = 0
+            self.handle_msg(frame)
+
+    #### CODEC ####
+    def decode(self, msg_bytes):
+        """ decode a binary frame to a dictionary """
+        return decode_binary_frame(msg_bytes)
+
+    def encode(self, msg_obj):
+        raise TypeError("Can not publish on a binary stream: binary streams "
+                        "are output only, use a JSON stream instead")
@@ -0,0 +1,169 @@
+""" Tests of the asyncio client (pymorse.aio), against a fake simulator.
+
+This module needs Python 3.5: it is imported by pymorse_internals_testing
+only on this version and later.
+"""
+import unittest
+import asyncio
+import json
+
+import logging; logger = logging.getLogger("pymorse")
+from pymorse.protocol import MorseServiceFailed
+from pymorse.aio import AsyncMorse
+
+HOST = '127.0.0.1'
+TIMEOUT = 1.0
+
+class FakeSimulator(object):
+    """ Serves the services and the datastream of a 'robot.pose' sensor,
+    on ports chosen by the system """
+    def __init__(self):
+        self.stream_writers = []
+        self.cancelled = []
+
+    async def start(self):
+        # created in the event loop of the test (Python < 3.10)
+        self.stream_connected = asyncio.Event()
+        self.cancel_received = asyncio.Event()
+        self.servers = [
+            await asyncio.start_server(self.serve_services, HOST, 0),
+            await asyncio.start_server(self.serve_stream, HOST, 0)]
+        self.port = self._port(self.servers[0])
+        self.stream_port = self._port(self.servers[1])
+
+    @staticmethod
+    def _port(server):
+        return server.sockets[0].getsockname()[1]
+
+    def stop(self):
+        for server in self.servers:
+            server.close()
+        for writer in self.stream_writers:
+            writer.close()
+
+    async def serve_stream(self, reader, writer):
+        self.stream_writers.append(writer)
+        self.stream_connected.set()
+
+    def publish(self, data):
+        for writer in self.stream_writers:
+            writer.write(json.dumps(data).encode() + b'\n')
+
+    async def serve_services(self, reader, writer):
+        details = {'robots': [{'name': 'robot', 'services': [],
+                               'components': {'robot.pose': {
+                                   'stream_interfaces': [['socket', 'OUT']],
+                                   'services': ['wait']}}}]}
+        while True:
+            line = await reader.readline()
+            if not line:
+                writer.close()
+                return
+            request = line.decode().strip().split(' ', 3)
+            if request[1] == 'cancel':
+                self.cancelled.append(request[0])
+                self.cancel_received.set()
+                continue
+            if request[1] == 'batch':
+                calls = json.loads(line.decode().split(' ', 2)[2])
+                results = [['SUCCESS', args] if service == 'echo' else
+                           ['FAILED', 'unknown service']
+                           for component, service, args in calls]
+                writer.write(('%s SUCCESS %s\n' %
+                              (request[0], json.dumps(results))).encode())
+                continue
+            msg_id, component, service, args = request
+            if service == 'details':
+                response = 'SUCCESS ' + json.dumps(details)
+            elif service == 'get_stream_port':
+                response = 'SUCCESS %d' % self.stream_port
+            elif service == 'wait':
+                # never answers
+                continue
+            else:
+                response = 'FAILED "unknown service"'
+            writer.write(('%s %s\n' % (msg_id, response)).encode())
+
+class TestAsyncMorse(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.simulator = FakeSimulator()
+
+    def tearDown(self):
+        self.simulator.stop()
+        self.loop.run_until_complete(asyncio.sleep(0))
+        self.loop.close()
+
+    def run_client(self, test):
+        """ Run the coroutine function :param test: with a client connected
+        to the fake simulator, once its datastream is connected """
+        async def client():
+            await self.simulator.start()
+            async with AsyncMorse(HOST, self.simulator.port, self.loop) as simu:
+                await asyncio.wait_for(self.simulator.stream_connected.wait(),
+                                       TIMEOUT)
+                await test(simu)
+        self.loop.run_until_complete(client())
+
+    def test_services(self):
+        async def test(simu):
+            with self.assertRaises(MorseServiceFailed):
+                await simu.rpc('simulation', 'unknown')
+
+            # cancelling a pending service cancels it in the simulator
+            wait = simu.robot.pose.wait(1)
+            wait.cancel()
+            await asyncio.wait_for(self.simulator.cancel_received.wait(),
+                                   TIMEOUT)
+            self.assertEqual(len(self.simulator.cancelled), 1)
+        self.run_client(test)
+
+    def test_get_last(self):
+        async def test(simu):
+            pose = simu.robot.pose
+            self.assertIsNone(pose.last())
+
+            next_msg = asyncio.ensure_future(pose.get(TIMEOUT))
+            self.simulator.publish({'x': 0})
+            self.assertEqual(await next_msg, {'x': 0})
+            self.assertEqual(pose.last(), {'x': 0})
+
+            # get waits for the next message, not the last one
+            next_msg = asyncio.ensure_future(pose.get(TIMEOUT))
+            self.simulator.publish({'x': 1})
+            self.assertEqual(await next_msg, {'x': 1})
+
+            # no message: get times out
+            self.assertIsNone(await pose.get(0.01))
+        self.run_client(test)
+
+    def test_iteration(self):
+        async def test(simu):
+            pose = simu.robot.pose
+            # the iterator keeps the messages received since its creation
+            messages = pose.__aiter__()
+            for i in range(3):
+                self.simulator.publish({'x': i})
+
+            received = []
+            async def read():
+                async for msg in messages:
+                    received.append(msg['x'])
+                    if len(received) == 3:
+                        break
+            await asyncio.wait_for(read(), TIMEOUT)
+            self.assertEqual(received, [0, 1, 2])
+            self.assertEqual(pose.last(), {'x': 2})
+        self.run_client(test)
+
+    def test_batch(self):
+        async def test(simu):
+            results = await simu.batch([('robot', 'echo', 1, 2),
+                                        ('robot', 'unknown')])
+            self.assertEqual(results[0], [1, 2])
+            self.assertIsInstance(results[1], MorseServiceFailed)
+        self.run_client(test)
+
+if __name__ == '__main__':
+    unittest.main()
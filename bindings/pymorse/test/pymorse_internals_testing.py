@@ -4,10 +4,18 @@ import time
 import socket
 import select
 import json
+import sys
 import asyncore
+import shutil
+import struct
+import tempfile
 
 import logging; logger = logging.getLogger("pymorse")
 from pymorse import StreamJSON, TIMEOUT
+from pymorse.multinode import RobotIds, Subscription, pack_pose, \
+                              encode_poses, decode_poses, pose_changed
+from pymorse.stream import BINARY_MAGIC, BINARY_PREFIX
+from pymorse.recording import StreamWriter, Recording
 
 class SocketWriter(threading.Thread):
     def __init__(self, port = 61000, freq = 10):
@@ -160,6 +168,87 @@ class TestPyMorseStreamSlow(unittest.TestCase):
         self._asyncore_thread.join(TIMEOUT)
         self._asyncore_thread = None # in case we want to re-create
 
+class TestMultinodeEncoding(unittest.TestCase):
+
+    def test_poses(self):
+        ids = RobotIds()
+        records = [pack_pose(ids.id('robot1'), (1, 2, 3), (0, 0, 0.5)),
+                   pack_pose(ids.id('robot2'), (-1, 0, 0), (0.25, 0, 0))]
+        self.assertEqual(ids.announce(), {'robot1': 0, 'robot2': 1})
+        self.assertEqual(ids.announce(), {})
+
+        other = RobotIds()
+        other.learn({'robot1': 0, 'robot2': 1})
+        poses = decode_poses(encode_poses(records))
+        self.assertEqual([other.name(p[0]) for p in poses], ['robot1', 'robot2'])
+        self.assertEqual(poses[0][1], (1, 2, 3))
+        self.assertEqual(poses[1][2], (0.25, 0, 0))
+        self.assertEqual(decode_poses(encode_poses([])), [])
+
+    def test_pose_changed(self):
+        pose = ((0, 0, 0), (0, 0, 3.14159))
+        self.assertTrue(pose_changed(None, (0, 0, 0), (0, 0, 0), 0.1, 0.1))
+        self.assertFalse(pose_changed(pose, (0.05, 0, 0), (0, 0, 3.14159), 0.1, 0.1))
+        self.assertTrue(pose_changed(pose, (0, 0.2, 0), (0, 0, 3.14159), 0.1, 0.1))
+        # -pi and pi are the same orientation
+        self.assertFalse(pose_changed(pose, (0, 0, 0), (0, 0, -3.14159), 0.1, 0.1))
+        self.assertTrue(pose_changed(pose, (0, 0, 0), (0, 0, 2.9), 0.1, 0.1))
+
+    def test_subscription(self):
+        self.assertTrue(Subscription().accepts('robot1', (100, 100, 0)))
+        subscription = Subscription.from_dict({'robots': ['robot1', 'robot2'],
+                                               'region': [0, 0, 10, 10]})
+        self.assertTrue(subscription.accepts('robot1', (5, 5, 0)))
+        self.assertFalse(subscription.accepts('robot1', (11, 5, 0)))
+        self.assertFalse(subscription.accepts('robot3', (5, 5, 0)))
+        self.assertEqual(Subscription.from_dict(subscription.to_dict()).to_dict(),
+                         subscription.to_dict())
+
+def binary_frame(fields, name, values):
+    payload = struct.pack('<%dd' % len(values), *values)
+    header = json.dumps({'fields': fields,
+                         'buffers': [{'name': name, 'format': 'd',
+                                      'shape': [len(values)],
+                                      'size': len(payload)}]}).encode()
+    return [BINARY_PREFIX.pack(BINARY_MAGIC, len(header), len(payload)),
+            header, payload]
+
+class TestRecording(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_record_and_read(self):
+        writer = StreamWriter(self.directory + '/robot.laser', chunk_size=200)
+        for i in range(10):
+            writer.write((i * 0.5, binary_frame({'timestamp': i * 0.5},
+                                                'range_list', [i] * 10)))
+        self.assertRaises(ValueError, writer.write,
+                          (0.0, binary_frame({}, 'range_list', [])))
+        writer.close()
+
+        with Recording(self.directory) as recording:
+            laser = recording['robot.laser']
+            self.assertEqual(len(laser), 10)
+            self.assertEqual((recording.start_time, recording.end_time),
+                             (0.0, 4.5))
+            self.assertEqual(laser.index_at(-1), -1)
+            self.assertEqual(laser.index_at(1.0), 2)
+            self.assertEqual(laser.index_at(1.2), 2)
+            sample = laser.sample_at(1.2)
+            self.assertEqual(sample['timestamp'], 1.0)
+            self.assertEqual(list(sample['range_list']), [2.0] * 10)
+            self.assertEqual([s['timestamp'] for s in laser],
+                             [i * 0.5 for i in range(10)])
+            del sample
+
+if sys.version_info >= (3, 5):
+    # the asyncio client tests use the async / await syntax
+    from pymorse_aio_testing import *
+
 if __name__ == '__main__':
     
     import logging
@@ -11,6 +11,40 @@ from morse.core.exceptions import MorseRPCInvokationError
 from morse.core.morse_time import time_isafter
 from morse.helpers.morse_math import normalise_angle
 from morse.helpers.components import add_property
+from morse.helpers.trajectory import JointTrajectory
+
+
+class Joint(object):
+    """
+    Static description of a joint (ie, a channel) of an armature, computed
+    once when the armature actuator is created.
+    """
+    def __init__(self, channel, index):
+        self.name = channel.name
+        self.channel = channel
+        # position of the joint in the armature, from root to tip
+        self.index = index
+        # The detection of prismatic joint relies solely on a non-zero
+        # value for the IK parameter 'ik_stretch'.
+        self.prismatic = bool(channel.ik_stretch)
+        # index of the (first) free axis of the joint
+        dofs = [channel.ik_dof_x, channel.ik_dof_y, channel.ik_dof_z]
+        self.axis = next((i for i, j in enumerate(dofs) if j), 0)
+
+        if self.prismatic:
+            self.limits = (0.0, channel.ik_stretch)
+        else:
+            self.limits = [(channel.ik_min_x, channel.ik_max_x),
+                           (channel.ik_min_y, channel.ik_max_y),
+                           (channel.ik_min_z, channel.ik_max_z)][self.axis]
+
+    def value(self):
+        """ Current rotation (in radians) or translation (in meters) of
+        the joint """
+        if self.prismatic:
+            return self.channel.pose_head[2] #The 'Z' value
+        else: # revolute joint
+            return self.channel.joint_rotation[self.axis]
 
 class Armature(morse.core.actuator.Actuator):
     """
@@ -113,6 +147,15 @@ class Armature(morse.core.actuator.Actuator):
         for channel in armature.channels:
             self.local_data[channel.name] = 0.0
 
+        # Model of the armature: joint name -> Joint, from root to tip
+        self._joints = OrderedDict((channel.name, Joint(channel, i))
+                                   for i, channel in enumerate(armature.channels))
+
+        # Snapshot of the joint values, valid for one simulation step, until
+        # the armature is modified (see joint_state)
+        self._joint_state = {}
+        self._joint_state_time = None
+
         self._ik_targets = {c.target: c for c in armature.constraints \
                             if c.type == blenderapi.CONSTRAINT_TYPE_KINEMATIC and \
                                c.ik_type == blenderapi.CONSTRAINT_IK_DISTANCE}
@@ -189,26 +232,27 @@ class Armature(morse.core.actuator.Actuator):
         Important: The detection of prismatic joint relies solely on a
         non-zero value for the IK parameter 'ik_stretch'.
         """
-        return True if channel.ik_stretch else False
+        return self._joints[channel.name].prismatic
 
-    def _get_joint(self, joint):
-        """ Checks a given joint name exist in the armature,
-        and returns it as a tuple (Blender channel, is_prismatic?)
+    def _joint(self, joint):
+        """ Returns the :py:class:`Joint` of the given name.
 
         If the joint does not exist, throw an exception.
         """
-        armature = self.bge_object
-
-        if joint not in [c.name for c in armature.channels]:
-            msg = "Joint <%s> does not exist in armature %s" % (joint, armature.name)
+        try:
+            return self._joints[joint]
+        except KeyError:
+            msg = "Joint <%s> does not exist in armature %s" % (joint, self.bge_object.name)
             raise MorseRPCInvokationError(msg)
 
-        channel = armature.channels[joint]
+    def _get_joint(self, joint):
+        """ Checks a given joint name exist in the armature,
+        and returns it as a tuple (Blender channel, is_prismatic?)
 
-        if self._is_prismatic(channel):
-            return channel, True
-        else:
-            return channel, False
+        If the joint does not exist, throw an exception.
+        """
+        joint = self._joint(joint)
+        return joint.channel, joint.prismatic
 
     def _get_joint_value(self, joint):
         """
@@ -220,15 +264,29 @@ class Armature(morse.core.actuator.Actuator):
 
         :param joint: the name of the joint in the armature.
         """
-        channel, is_prismatic = self._get_joint(joint)
+        self._joint(joint) # checks the joint exists
+        return self.joint_state()[joint]
+
+    def joint_state(self):
+        """
+        Returns the values of all the joints of the armature, as a
+        dictionary joint name -> value (see :py:meth:`_get_joint_value`).
+
+        The values are read once per simulation step, and read again only
+        if the armature has been modified since. The returned dictionary
+        must not be modified.
+        """
+        now = self.robot_parent.gettime()
+        if self._joint_state_time != now:
+            self._joint_state = {name: joint.value()
+                                 for name, joint in self._joints.items()}
+            self._joint_state_time = now
+        return self._joint_state
+
+    def _invalidate_joint_state(self):
+        self._joint_state_time = None
 
-        # Retrieve the motion axis
-        axis_index = next(i for i, j in enumerate(self.find_dof(channel)) if j)
 
-        if is_prismatic:
-            return channel.pose_head[2] #The 'Z' value
-        else: # revolute joint
-            return channel.joint_rotation[axis_index]
 
     def _get_prismatic(self, joint):
         """ Checks a given prismatic joint name exist in the armature, and
@@ -257,7 +315,7 @@ class Armature(morse.core.actuator.Actuator):
 
     def _clamp_joint(self, channel, rotation):
 
-        ik_min, ik_max = self.get_IK_limits(channel.name)
+        ik_min, ik_max = self._joints[channel.name].limits
         return max(ik_min, min(rotation, ik_max))
 
     @service
@@ -329,6 +387,7 @@ class Armature(morse.core.actuator.Actuator):
         if rotation:
             target.worldOrientation = rotation
 
+        self._invalidate_joint_state()
         # save the joint state computed from IK in local_data
         self._store_current_joint_state()
 
@@ -427,7 +486,7 @@ class Armature(morse.core.actuator.Actuator):
         channel = self._get_prismatic(joint)
 
         # Retrieve the translation axis
-        axis_index = next(i for i, j in enumerate(self.find_dof(channel)) if j)
+        axis_index = self._joints[joint].axis
 
         translation = self._clamp_joint(channel, translation)
 
@@ -436,6 +495,7 @@ class Armature(morse.core.actuator.Actuator):
         tmp = channel.location
         tmp[axis_index] = translation
         channel.location = tmp
+        self._invalidate_joint_state()
 
     @service
     def set_translations(self, translations):
@@ -462,19 +522,16 @@ class Armature(morse.core.actuator.Actuator):
         :sees: `set_translation`
         :param translations: a set of absolute translations, in meters
         """
-        armature = self.bge_object
+        joints = list(self._joints.values())[:len(translations)]
 
-        nb_trans = min(len(translations), len(armature.channels))
-
-        channels = [c for c in armature.channels]
-        for i in range(nb_trans):
-            if not self._is_prismatic(channels[i]):
+        for joint in joints:
+            if not joint.prismatic:
                 msg = "Joint %s is not a prismatic joint! " \
-                      "Can not apply the translation set" % channels[i].name
+                      "Can not apply the translation set" % joint.name
                 raise MorseRPCInvokationError(msg)
 
-        for trans, channel in zip(translations[:nb_trans], channels[:nb_trans]):
-            self.set_translation(channel.name, trans)
+        for trans, joint in zip(translations, joints):
+            self.set_translation(joint.name, trans)
 
 
     @interruptible
@@ -548,7 +605,7 @@ class Armature(morse.core.actuator.Actuator):
         channel = self._get_revolute(joint)
 
         # Retrieve the translation axis
-        axis_index = next(i for i, j in enumerate(self.find_dof(channel)) if j)
+        axis_index = self._joints[joint].axis
 
         rotation = self._clamp_joint(channel, rotation)
 
@@ -557,6 +614,7 @@ class Armature(morse.core.actuator.Actuator):
         tmp = channel.joint_rotation
         tmp[axis_index] = rotation
         channel.joint_rotation = tmp
+        self._invalidate_joint_state()
 
     @service
     def set_rotations(self, rotations):
@@ -582,18 +640,15 @@ class Armature(morse.core.actuator.Actuator):
         :sees: `set_rotation`
         :param rotations: a set of absolute rotations, in radians
         """
-        armature = self.bge_object
+        joints = list(self._joints.values())[:len(rotations)]
 
-        nb_rot = min(len(rotations), len(armature.channels))
-
-        channels = [c for c in armature.channels]
-        for i in range(nb_rot):
-            if self._is_prismatic(channels[i]):
-                msg = "Joint %s is not a revolute joint! Can not apply the rotation set" % joint
+        for joint in joints:
+            if joint.prismatic:
+                msg = "Joint %s is not a revolute joint! Can not apply the rotation set" % joint.name
                 raise MorseRPCInvokationError(msg)
 
-        for rot, channel in zip(rotations[:nb_rot], channels[:nb_rot]):
-            self.set_rotation(channel.name, rot)
+        for rot, joint in zip(rotations, joints):
+            self.set_rotation(joint.name, rot)
 
 
 
@@ -668,11 +723,11 @@ class Armature(morse.core.actuator.Actuator):
         free to rotate (or translate, depending on the type of the joint).
 
         """
-        armature = self.bge_object
         dofs = {}
+
         # find the dof of each channel
-        for channel in armature.channels:
-            dofs[channel.name] = self.find_dof(channel)
+        for joint in self._joints.values():
+            dofs[joint.name] = self.find_dof(joint.channel)
 
         return dofs
 
@@ -682,8 +737,7 @@ class Armature(morse.core.actuator.Actuator):
         Returns the names of all the joints in this armature, ordered from the
         root to the tip.
         """
-        armature = self.bge_object
-        return [channel.name for channel in armature.channels]
+        return list(self._joints.keys())
 
 
     @service
@@ -695,24 +749,7 @@ class Armature(morse.core.actuator.Actuator):
         - For prismatic joint, returns a pair `(0.0, max translation)`, in meters.
         """
 
-        channel, is_prismatic = self._get_joint(joint)
-
-        if is_prismatic:
-            return 0.0, channel.ik_stretch
-        else:
-            # Retrieve the translation axis
-            axis_index = next(i for i, j in enumerate(self.find_dof(channel)) if j)
-            if axis_index == 0:
-                return (channel.ik_min_x, 
-                        channel.ik_max_x)
-            elif axis_index == 1:
-                return (channel.ik_min_y, 
-                        channel.ik_max_y)
-            elif axis_index == 2:
-                return (channel.ik_min_z, 
-                        channel.ik_max_z)
-
-            assert False # should not reach this point.
+        return self._joint(joint).limits
 
     @async_service
     def trajectory(self, trajectory):
@@ -735,9 +772,24 @@ class Armature(morse.core.actuator.Actuator):
                     ]
                 }
 
+        or, more compact for large trajectories:
+
+        .. code-block:: python
+
+            trajectory = {
+                'starttime': <timestamp in second>,
+                'time_from_start': [<seconds>, ...],
+                'positions': [...],
+                'velocities': [...]
+                }
+
+        where `positions` and `velocities` hold the values of each waypoint
+        one after the other (as a flat list, a list of lists, or a
+        base64-encoded string of little-endian doubles).
+
         .. warning::
 
-            Currently, both `velocities` and `accelerations` are ignored.
+            Currently, `accelerations` are ignored.
 
         The trajectory execution starts after `starttime` timestamp passed (if
         omitted, the trajectory execution starts right away).
@@ -746,23 +798,31 @@ class Armature(morse.core.actuator.Actuator):
         values in the waypoints are ordered the same way as in the set of joint
         of the armature (ie, from the root to the tip of the armature. Use the
         service ``get_joints()`` to retrieve the list of joints in the correct
-        order.) `velocities` and `accelerations` are optional.
+        order.), unless the trajectory contains a `joints` list, naming the
+        joints the values refer to. `velocities` and `accelerations` are
+        optional.
 
         The component attempts to achieve each waypoint at the time obtained
         by adding that waypoint's `time_from_start` value to `starttime`.
+        Between the waypoints, the joints follow a linear interpolation,
+        or, if the trajectory contains ``'interpolation': 'cubic'``, a cubic
+        spline (using the `velocities` of the waypoints, if provided).
 
         :param trajectory: the trajectory to execute, as describe above.
         """
 
+        try:
+            trajectory = JointTrajectory(trajectory, list(self._joints.keys()))
+        except ValueError as e:
+            raise MorseRPCInvokationError("Error: invalid trajectory: %s" % e)
+
         self._suspend_ik_targets()
 
-        # TODO: support velocities and accelerations via cubic/quintic spline
-        # interpolation
         starttime = self.robot_parent.gettime()
-        if 'starttime' in trajectory:
-            trajectory["starttime"] = max(starttime, trajectory["starttime"])
+        if trajectory.starttime is not None:
+            trajectory.starttime = max(starttime, trajectory.starttime)
         else:
-            trajectory["starttime"] = starttime
+            trajectory.starttime = starttime
 
         self._active_trajectory = trajectory
 
@@ -771,51 +831,34 @@ class Armature(morse.core.actuator.Actuator):
         t = self.robot_parent.gettime()
         trajectory = self._active_trajectory
 
-        try:
-            if time_isafter(trajectory["starttime"], t):
-                return
-            
-            if time_isafter(t, trajectory["starttime"] + trajectory["points"][-1]["time_from_start"]):
-                #trajectory execution is over!
-                self._active_trajectory = None
-                # TODO: check here the final pose match the last point pose
-                self.completed(status.SUCCESS, None)
-
-            for p in trajectory["points"]:
-                end = trajectory["starttime"] + p["time_from_start"]
-                if "started" in p and time_isafter(end, t):
-                    # currently going to this waypoint: fine!
-                    break
-
-                elif "started" not in p and time_isafter(end, t):
-                    # start the new waypoint
-                    allocated_time = end - t
-                    assert(allocated_time > 0)
-
-                    target = OrderedDict(zip(self.local_data.keys(),
-                                    p["positions"]))
-
-                    for joint in target.keys():
-                        # compute the distance based on actual current joint pose
-                        dist = target[joint] - self._get_joint_value(joint)
-                        self.joint_speed[joint] = dist/allocated_time
-
-                    self.local_data = target
+        if time_isafter(trajectory.starttime, t):
+            return
 
-                    p["started"] = True
-                    break
+        state = self.joint_state()
+        if not trajectory.started:
+            trajectory.start(trajectory.starttime, state)
 
-                elif "started" not in p and time_isafter(t, end):
-                    logger.warning("Skipped a waypoint on armature <%s>. Wrong 'time_from_start'?" % self.name())
+        # Aim at the position of the trajectory at the next call, at a
+        # speed which allows to reach it in one call
+        elapsed = t - trajectory.starttime + 1.0 / self.frequency
+        positions = trajectory.sample(elapsed).tolist()
+        for joint, position in zip(trajectory.joints, positions):
+            self.local_data[joint] = position
+            self.joint_speed[joint] = abs(position - state[joint]) * self.frequency
 
-                # case: "started" and t > end: do nothing, go to next point
-        except KeyError as ke:
+        if time_isafter(t, trajectory.starttime + trajectory.duration):
+            #trajectory execution is over!
             self._active_trajectory = None
-            self.completed(status.FAILED, "Error: invalid trajectory: key %s was expected." % ke)
+            for joint in trajectory.joints:
+                self.joint_speed.pop(joint, None)
+            # TODO: check here the final pose match the last point pose
+            self.completed(status.SUCCESS, None)
 
     def _store_current_joint_state(self):
+
+        state = self.joint_state()
         for joint in self.local_data.keys():
-            self.local_data[joint] = self._get_joint_value(joint)
+            self.local_data[joint] = state[joint]
 
     def interrupt(self):
     
@@ -877,6 +920,7 @@ class Armature(morse.core.actuator.Actuator):
 
         # Update the armature to reflect the changes we just performed
         armature.update()
+        self._invalidate_joint_state()
 
         # save the joint state computed from IK in local_data
         self._store_current_joint_state()
@@ -913,30 +957,25 @@ class Armature(morse.core.actuator.Actuator):
         #TODO: we should no have to iterate over the whole armature when we do
         # not have to move at all!
         position_reached = True
-        for channel in armature.channels:
+        for joint_model in self._joints.values():
 
-            # we assume a joint is prismatic (translation joint) if its IK
-            # 'stretch' parameter is non-null
-            is_prismatic = self._is_prismatic(channel)
+            channel = joint_model.channel
+            is_prismatic = joint_model.prismatic
+            axis_index = joint_model.axis
 
-            joint = channel.name
+            joint = joint_model.name
 
             if joint in self.joint_speed and self.joint_speed[joint]:
                 speed = self.joint_speed[joint]
             else:
                 speed = self.linear_speed if is_prismatic else self.radial_speed
 
-
-            # Retrieve the rotation or translation axis
-            axis_index = next(i for i, j in enumerate(self.find_dof(channel)) if j)
-
-            if is_prismatic:
-                # we take the last index ('Z') of the pose of the HEAD of the
-                # bone as the absolute translation of the joint. Not 100% sure
-                # it is right...
-                dist = self.local_data[joint] - channel.pose_head[2] 
-            else:
-                dist = self.local_data[joint] - channel.joint_rotation[axis_index]
+            # For prismatic joints, we take the last index ('Z') of the
+            # pose of the HEAD of the bone as the absolute translation of
+            # the joint. Not 100% sure it is right...
+            # The value is read from the channel, as it depends on the
+            # joints moved before in this loop.
+            dist = self.local_data[joint] - joint_model.value()
 
             w = math.copysign(speed / self.frequency, dist)
 
@@ -947,6 +986,8 @@ class Armature(morse.core.actuator.Actuator):
                     trans = channel.location
                     trans[axis_index] += w
                     channel.location = trans
+                    # Update the armature to reflect the changes with just performed
+                    armature.update()
             else:
                 if not abs(dist) < self.angle_tolerance:
                     position_reached = False
@@ -954,9 +995,12 @@ class Armature(morse.core.actuator.Actuator):
                     rot = channel.joint_rotation
                     rot[axis_index] += w
                     channel.joint_rotation = rot
+                    # Update the armature to reflect the changes with just performed
+                    armature.update()
+
+        if not position_reached:
+            self._invalidate_joint_state()
 
-            # Update the armature to reflect the changes with just performed
-            armature.update()
 
 
         if position_reached: # True only when all joints match local_data
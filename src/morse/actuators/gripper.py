@@ -57,6 +57,9 @@ class Gripper(morse.core.actuator.Actuator):
                  way from the gripper than this distance cannot be  \
                  held')
 
+    # Reads its own logic bricks: called by them, not by the scheduler
+    uses_logic_bricks = True
+
     def __init__(self, obj, parent=None):
         """
         Constructor method.
@@ -37,6 +37,9 @@ class Joystick(Actuator):
     add_property('_speed', 1.0, 'Speed', 'float',
                  "Movement speed of the parent robot, in m/s")
 
+    # Reads its own logic bricks: called by them, not by the scheduler
+    uses_logic_bricks = True
+
     def __init__(self, obj, parent=None):
         logger.info('%s initialization' % obj.name)
         # Call the constructor of the parent class
@@ -28,6 +28,9 @@ class PA10(morse.core.actuator.Actuator):
     add_data('seg4', 0.0, "float", "fifth joint, in radians")
     add_data('seg5', 0.0, "float", "sixth joint (wrist), in radians")
 
+    # Reads its own logic bricks: called by them, not by the scheduler
+    uses_logic_bricks = True
+
     def __init__(self, obj, parent=None):
         # Call the constructor of the parent class
         morse.core.actuator.Actuator.__init__(self, obj, parent)
@@ -14,6 +14,9 @@ class Sound(Actuator):
 
     add_data('mode', "stop", 'string', "mode, enum in ['play','pause','stop']")
 
+    # Reads its own logic bricks: called by them, not by the scheduler
+    uses_logic_bricks = True
+
     def __init__(self, obj, parent=None):
         logger.info("%s initialization" % obj.name)
         # Call the constructor of the parent class
@@ -17,7 +17,6 @@ def robot_action(contr):
     simu = blenderapi.persistantstorage()
     if "morse_initialised" not in simu or not simu.morse_initialised:
         return
-
     # Execute only when the sensor is really activated
     if contr.sensors[0].positive:
         obj = contr.owner
@@ -25,7 +24,8 @@ def robot_action(contr):
         # Do nothing if the component was not initialised.
         # Should be the case for external robots and components
         robot_object = simu.robotDict.get(obj, None)
-        if robot_object:
+        # unless it is called by the scheduler (see morse.core.scheduler)
+        if robot_object and not robot_object.scheduled:
             robot_object.action()
 
 def component_action(contr):
@@ -38,7 +38,6 @@ def component_action(contr):
     simu = blenderapi.persistantstorage()
     if "morse_initialised" not in simu or not simu.morse_initialised:
         return
-
     # Execute only when the sensor is really activated
     if contr.sensors[0].positive:
         obj = contr.owner
@@ -46,7 +45,8 @@ def component_action(contr):
         # Do nothing if the component was not initialised.
         # Should be the case for external robots and components
         cmpt_object = simu.componentDict.get(obj.name, None)
-        if cmpt_object:
+        # unless it is called by the scheduler (see morse.core.scheduler)
+        if cmpt_object and not cmpt_object.scheduled:
             cmpt_object.action()
 
 def sensor_action(contr):
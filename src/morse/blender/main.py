@@ -22,6 +22,11 @@ from morse.core.modifier import register_modifier
 from morse.helpers.loading import create_instance, create_instance_level
 from morse.core.morse_time import TimeStrategies
 from morse.core.zone import ZoneManager
+from morse.core.object_registry import ObjectRegistry
+from morse.core.spatial_index import SpatialIndex
+from morse.helpers import passive_objects
+from morse.core.profiler import profiler
+from morse.core.scheduler import Scheduler
 
 # Override the default Python exception handler
 def morse_excepthook(*args, **kwargs):
@@ -160,6 +165,14 @@ def create_dictionaries ():
 
     scene = morse.core.blenderapi.scene()
 
+    # Index the objects of the scene by game property and 'Type': the
+    # lookups below, and the components looking for tagged objects, use
+    # it instead of iterating over the whole scene
+    persistantstorage.object_registry = ObjectRegistry(scene)
+    registry = persistantstorage.object_registry
+    # Positions of the tagged objects, for range-limited queries
+    persistantstorage.spatial_index = SpatialIndex(registry)
+
     # Store the position and orientation of all objects
     for obj in scene.objects:
         if obj.parent is None:
@@ -174,43 +187,34 @@ def create_dictionaries ():
     # (plus several other optional properties).
     # See the documentation for the up-to-date list
     # (doc/morse/user/others/passive_objects.rst) -- or read the code below :-)
-    for obj in scene.objects:
-        # Check the object has an 'Object' property set to true
-        if 'Object' in obj and obj['Object']:
-            details = {
-                       'label': obj['Label'] if 'Label' in obj else str(obj),
-                       'description': obj['Description'] if 'Description' in obj else "",
-                       'type': obj['Type'] if 'Type' in obj else "Object",
-                       'graspable': obj['Graspable'] if 'Graspable' in obj else False
-                      }
-            persistantstorage.passiveObjectsDict[obj] = details
-            logger.info("Added {name} as a {graspable}active object".format(
-                                 name = details['label'],
-                                 graspable = "graspable " if details['graspable'] else ""))
+    for obj in registry.tagged('Object'):
+        passive_objects.register(obj, new = False)
 
     if not persistantstorage.passiveObjectsDict:
         logger.info("No passive objects in the scene.")
 
     # Get the robots
-    for obj in scene.objects:
-        if 'Robot_Tag' in obj or 'External_Robot_Tag' in obj:
-            if not 'classpath' in obj:
-                logger.error("No 'classpath' in %s\n  Please make sure you are "
-                             "using the new builder classes"%str(obj.name))
-                return False
-            # Create an object instance and store it
-            instance = create_instance_level(obj['classpath'],
-                                             obj.get('abstraction_level'),
-                                             obj)
+    robots = registry.tagged('Robot_Tag')
+    robots.extend(obj for obj in registry.tagged('External_Robot_Tag')
+                  if not 'Robot_Tag' in obj)
+    for obj in robots:
+        if not 'classpath' in obj:
+            logger.error("No 'classpath' in %s\n  Please make sure you are "
+                         "using the new builder classes"%str(obj.name))
+            return False
+        # Create an object instance and store it
+        instance = create_instance_level(obj['classpath'],
+                                         obj.get('abstraction_level'),
+                                         obj)
 
-            if not instance:
-                logger.error("Could not create %s"%str(obj['classpath']))
-                return False
-            # store instance in persistant storage dictionary
-            if 'Robot_Tag' in obj:
-                persistantstorage.robotDict[obj] = instance
-            else:
-                persistantstorage.externalRobotDict[obj] = instance
+        if not instance:
+            logger.error("Could not create %s"%str(obj['classpath']))
+            return False
+        # store instance in persistant storage dictionary
+        if 'Robot_Tag' in obj:
+            persistantstorage.robotDict[obj] = instance
+        else:
+            persistantstorage.externalRobotDict[obj] = instance
 
     if not (persistantstorage.robotDict or
             persistantstorage.externalRobotDict): # No robot!
@@ -220,9 +224,8 @@ def create_dictionaries ():
         return False
 
     # Get the zones
-    for obj in scene.objects:
-        if 'Zone_Tag' in obj:
-            persistantstorage.zone_manager.add(obj)
+    for obj in registry.tagged('Zone_Tag'):
+        persistantstorage.zone_manager.add(obj)
 
     # Get the robot and its instance
     for obj, robot_instance in persistantstorage.robotDict.items():
@@ -235,16 +238,12 @@ def create_dictionaries ():
             return False
 
     # Check we have no 'free' component (they all must belong to a robot)
-    for obj in scene.objects:
-        try:
-            obj['Component_Tag']
-            if obj.name not in persistantstorage.componentDict.keys():
-                logger.error("INITIALIZATION ERROR: the component '%s' "
-                             "does not belong to any robot: you need to fix "
-                             "that by parenting it to a robot." % obj.name)
-                return False
-        except KeyError as detail:
-            pass
+    for obj in registry.tagged('Component_Tag'):
+        if obj.name not in persistantstorage.componentDict:
+            logger.error("INITIALIZATION ERROR: the component '%s' "
+                         "does not belong to any robot: you need to fix "
+                         "that by parenting it to a robot." % obj.name)
+            return False
 
     # Will return true always (for the moment)
     return True
@@ -522,11 +521,21 @@ def init_multinode():
         import socket
         node_name = socket.gethostname()
 
+    # Protocol specific options (thresholds, subscription...)
+    try:
+        options = {key: value
+                   for key, value in multinode_config.node_config.items()
+                   if key not in ['protocol', 'node_name',
+                                  'server_address', 'server_port']}
+    except (NameError, AttributeError):
+        options = {}
+
     logger.info ("This is node '%s'" % node_name)
     # Create the instance of the node class
 
     persistantstorage.node_instance = create_instance(classpath,
-                                                      node_name, server_address, server_port)
+                                                      node_name, server_address, server_port,
+                                                      **options)
 
 class MorseSyncProcess:
     def __init__(self):
@@ -570,6 +579,13 @@ def init(contr):
     # Variable to keep trac of the camera being used
     persistantstorage.current_camera_index = 0
 
+    persistantstorage.turbo_mode = False
+    if morse.core.blenderapi.getssr().get('turbo_mode', False):
+        set_turbo_mode(True)
+
+    if morse.core.blenderapi.getssr().get('profiling', False):
+        profiler.enable(morse.core.blenderapi.getssr().get('profiling_report', ''))
+
     init_ok = True
     init_ok = init_ok and create_dictionaries()
 
@@ -599,6 +615,7 @@ def init(contr):
 
     if init_ok:
         check_dictionaries()
+        init_scheduler()
         persistantstorage.morse_initialised = True
         logger.log(ENDSECTION, 'SCENE INITIALIZED')
     else:
@@ -612,6 +629,17 @@ def init(contr):
     #bge.logic.setLogicTicRate(60.0)
     #bge.logic.setPhysicsTicRate(60.0)
 
+def init_scheduler():
+    """ Let the scheduler call the action of the robots and of their
+    components, instead of their logic bricks (except for the components
+    reading their own logic bricks, see morse.core.scheduler) """
+    scheduler = Scheduler(persistantstorage.time)
+    for robot_instance in persistantstorage.robotDict.values():
+        scheduler.add(robot_instance, 'robot')
+    for component_instance in persistantstorage.componentDict.values():
+        scheduler.add(component_instance, 'component')
+    persistantstorage.scheduler = scheduler
+
 def init_logging():
     from morse.core.ansistrm import ColorizingStreamHandler
 
@@ -706,12 +734,18 @@ def simulation_main(contr):
     """ This method is called at every simulation step.
 
     We do here all homeworks to manage the simulation at whole.
+
+    When the profiler is enabled, the time spent in each stage is recorded
+    (see :py:mod:`morse.core.profiler`).
     """
+    profiler.frame()
+
     # Call datastream manager action handler
     # Call it early at the synchronisation management may be done here
     if 'stream_managers' in persistantstorage:
         for ob in persistantstorage.stream_managers.values():
             ob.action()
+        profiler.lap('simulation', 'stream_managers')
 
     # Update the time variable
     try:
@@ -724,18 +758,32 @@ def simulation_main(contr):
                         "messages, and report them on the morse-dev@laas.fr "
                         "mailing list.")
         quit(contr)
+    profiler.lap('simulation', 'time')
+
+    # The objects moved since the last step
+    if 'spatial_index' in persistantstorage:
+        persistantstorage.spatial_index.invalidate()
+        profiler.lap('simulation', 'spatial_index')
+
+    # Call the robots and components due at this step
+    if 'scheduler' in persistantstorage:
+        persistantstorage.scheduler.tick()
+        profiler.lap('simulation', 'components')
 
     if 'serviceObjectDict' in persistantstorage:
         for ob in persistantstorage.serviceObjectDict.values():
             ob.action()
+        profiler.lap('simulation', 'service_objects')
 
     if "morse_services" in persistantstorage:
         # let the service managers process their inputs/outputs
         persistantstorage.morse_services.process()
+        profiler.lap('simulation', 'services')
 
     if MULTINODE_SUPPORT:
         # Register the locations of all the robots handled by this node
         persistantstorage.node_instance.synchronize()
+        profiler.lap('simulation', 'multinode')
 
 
 def switch_camera(contr):
@@ -755,12 +803,45 @@ def switch_camera(contr):
         persistantstorage.current_camera_index = index
 
 
+def _skip_render():
+    """ Called after each rendered frame in turbo mode: disable the
+    render of the next frames, until a camera needs one again """
+    morse.core.blenderapi.set_render(False)
+
+def set_turbo_mode(enable):
+    """ Enable or disable the turbo mode.
+
+    In turbo mode, the frames are only rendered when a camera sensor
+    needs it (see :py:meth:`morse.sensors.camera.Camera.default_action`).
+    The other frames only run the logic and the physics.
+    """
+    scene = morse.core.blenderapi.scene()
+    if enable:
+        if not morse.core.blenderapi.set_render(False):
+            logger.warning("Turbo mode requires bge.logic.setRender "
+                           "(Blender >= 2.74): all frames will be rendered")
+            return False
+        if _skip_render not in scene.post_draw:
+            scene.post_draw.append(_skip_render)
+        logger.info("Turbo mode enabled: only rendering frames needed by "
+                    "cameras")
+    else:
+        if _skip_render in scene.post_draw:
+            scene.post_draw.remove(_skip_render)
+        morse.core.blenderapi.set_render(True)
+        logger.info("Turbo mode disabled")
+    persistantstorage.turbo_mode = enable
+    return True
+
 def close_all(contr):
     """ Close the open communication channels from middlewares
     Call the destructors of all component instances. This should also call
     the methods to close middlewares
     """
     logger.log(ENDSECTION, 'COMPONENTS FINALIZATION')
+    if profiler.report_file:
+        profiler.dump_report()
+
     # Force the deletion of the sensor objects
     if 'componentDict' in persistantstorage:
         for component_instance in persistantstorage.componentDict.values():
@@ -782,6 +863,11 @@ def close_all(contr):
             datastream_instance.finalize()
         del persistantstorage.stream_managers
 
+    if persistantstorage.get('socket_reactor'):
+        logger.log(ENDSECTION, 'STOPPING SOCKET I/O THREAD...')
+        persistantstorage.socket_reactor.stop()
+        del persistantstorage.socket_reactor
+
     logger.log(ENDSECTION, 'CLOSING OVERLAYS...')
     del persistantstorage.overlayDict
 
@@ -367,6 +367,26 @@ class AbstractComponent(object):
             component.add_stream('moos', moos_host='127.0.0.1', moos_port=9000,
                                     moos_name='iMorse')
 
+        Socket publishers use JSON by default. ``format='binary'`` selects
+        length-prefixed binary frames instead, where bulk fields (images,
+        depth points, range lists) are sent raw, without copy nor base64
+        encoding (see :py:class:`pymorse.stream.StreamBinary` for the
+        client side):
+
+        .. code-block:: python
+
+            camera.add_stream('socket', format='binary')
+
+        The ``record`` datastream records the data of any component, and
+        the ``replay`` datastream replaces the data computed by a sensor by
+        the ones of a recording (see :doc:`the recording middleware
+        <../user/middlewares/recording>`):
+
+        .. code-block:: python
+
+            env.configure_stream_manager('record', directory='/tmp/dataset')
+            camera.add_stream('record')
+
         """
         self._err_if_not_exportable()
 
@@ -385,6 +405,9 @@ class AbstractComponent(object):
             if not direction:
                 return
 
+        if not method and datastream in INTERFACE_GENERIC:
+            method = INTERFACE_GENERIC[datastream]
+
         config = []
         # Configure the datastream for this component
         if not method:
@@ -42,6 +42,8 @@ MORSE_DATASTREAM_MODULE = {
     'hla': 'morse.middleware.hla_datastream.HLADatastreamManager',
     'mavlink': 'morse.middleware.mavlink_datastream.MavlinkDatastreamManager',
     'pprzlink': 'morse.middleware.pprzlink_datastream.PprzlinkDatastreamManager',
+    'record': 'morse.middleware.recording_datastream.RecordingDatastreamManager',
+    'replay': 'morse.middleware.recording_datastream.RecordingDatastreamManager',
 }
 
 MORSE_MODIFIER_DICT = {
@@ -120,6 +122,12 @@ INTERFACE_DEFAULT_IN = {
         "yarp_json": "morse.middleware.yarp.yarp_json.YarpJsonReader",
 }
 
+# Datastreams which work with any component, whatever its data
+INTERFACE_GENERIC = {
+        "record": "morse.middleware.recording_datastream.Recorder",
+        "replay": "morse.middleware.recording_datastream.Replay",
+}
+
 MORSE_DATASTREAM_DICT = {
     "morse.sensors.accelerometer.Accelerometer": {
         "default": {
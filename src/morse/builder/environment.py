@@ -125,6 +125,7 @@ class Environment(AbstractComponent):
                         'node_name': node_name,
                         'server_address': self._server_address,
                         'server_port': self._server_port,}
+        node_config.update(self._multinode_options)
         # Create the config file if it does not exist
         if not 'multinode_config.py' in bpymorse.get_texts().keys():
             bpymorse.new_text()
@@ -572,7 +573,8 @@ class Environment(AbstractComponent):
         :param strategy:  the strategy to choose. Must be one of value
         of :py:class:`morse.builder.TimeStrategies`
         """
-        if strategy == TimeStrategies.FixedSimulationStep:
+        if strategy in (TimeStrategies.FixedSimulationStep,
+                        TimeStrategies.Lockstep):
             bpymorse.get_context_scene().game_settings.use_frame_rate = 0
             self.auto_tune_time = False
         elif strategy == TimeStrategies.BestEffort:
@@ -609,6 +611,51 @@ class Environment(AbstractComponent):
         self.properties(use_internal_syncer = True)
         self.configure_stream_manager('socket', time_sync = True)
 
+    def use_turbo_mode(self, turbo=True):
+        """ Run the simulation as fast as possible: the frames are only
+        rendered when a camera sensor needs it, the frame rate is not
+        limited and v-sync is disabled. As the simulation does not run
+        in real-time anymore, the Best Effort time strategy is replaced
+        by the Fixed Simulation Step one.
+
+        The turbo mode can also be toggled at runtime, with the
+        ``simulation.set_turbo_mode`` service. The achieved real-time
+        factor is reported by the ``time.statistics`` service.
+        """
+        self.properties(turbo_mode = turbo)
+        if turbo:
+            self.auto_tune_time = False
+            self.use_vsync('OFF')
+            strategy = self.property_value('time_management')
+            if strategy is None or strategy == TimeStrategies.BestEffort:
+                strategy = TimeStrategies.FixedSimulationStep
+            # make sure the frame rate is not limited
+            self.set_time_strategy(strategy)
+
+    def enable_profiling(self, report=None):
+        """ Enable the frame-budget profiler from the start of the
+        simulation (it can also be enabled at runtime, with the
+        ``simulation.set_profiling`` service).
+
+        :param report: if set, the name of the file where the report
+                       is written when the simulation quits, in CSV if
+                       the name ends with '.csv', in JSON otherwise.
+        """
+        self.properties(profiling = True)
+        if report:
+            self.properties(profiling_report = report)
+
+    def use_io_thread(self, use_io_thread=True):
+        """ Handle all the socket datastreams and the socket service
+        requests from a single background I/O thread, instead of polling
+        each socket from the simulation main loop.
+
+        This takes the network latency and most of the syscall overhead
+        off the simulation loop. Binary socket streams are however copied
+        once before being handed to the I/O thread.
+        """
+        self.properties(use_io_thread = use_io_thread)
+
     def fullscreen(self, fullscreen=True):
         """ Run the simulation fullscreen
 
@@ -664,7 +711,10 @@ class Environment(AbstractComponent):
         self._physics_step_sub = step_sub
 
     def configure_multinode(self, protocol='socket',
-            server_address='localhost', server_port='65000', distribution=None):
+            server_address='localhost', server_port='65000', distribution=None,
+            position_threshold=None, orientation_threshold=None,
+            subscribe_robots=None, subscribe_region=None,
+            asynchronous=None, max_extrapolation=None, reply_timeout=None):
         """ Provide the information necessary for the node to connect to a multi-node server.
 
         :param protocol: Either 'socket' or 'hla'
@@ -673,6 +723,31 @@ class Environment(AbstractComponent):
         :param distribution: A Python dictionary. The keys are the names of the
                 nodes, and the values are lists with the names of the robots handled by
                 each node
+        :param position_threshold: Used only for 'socket' protocol. A robot
+                is published when it moved by more than this distance (in
+                meters, default 0.001) since it was last published
+        :param orientation_threshold: Used only for 'socket' protocol. A
+                robot is published when it turned by more than this angle
+                (in radians, default 0.001) since it was last published
+        :param subscribe_robots: Used only for 'socket' protocol. If set,
+                the node only receives the poses of these robots from the
+                other nodes
+        :param subscribe_region: Used only for 'socket' protocol. If set,
+                the node only receives the poses of the robots of the other
+                nodes which are in this ``[xmin, ymin, xmax, ymax]`` area
+        :param asynchronous: Used only for 'socket' protocol. If True, the
+                node does not wait for the server at each step: the poses
+                of the other nodes are applied when they arrive, and the
+                robots of the other nodes are extrapolated in between
+        :param max_extrapolation: Used only for 'socket' protocol, in
+                asynchronous mode. Maximum duration (in seconds, default
+                0.5) a robot of another node is extrapolated after its last
+                update. 0 disables the extrapolation
+        :param reply_timeout: Used only for 'socket' protocol, in synchronous
+                mode. Maximum duration (in seconds, default 0.1) a node
+                waits for the reply of the server at each step. Increase it
+                when the server runs with ``--barrier``
+
 
         .. code-block:: python
 
@@ -695,6 +770,16 @@ class Environment(AbstractComponent):
         self._server_port = server_port
         if distribution is not None:
             self.multinode_distribution = distribution
+        self._multinode_options = {}
+        for key, value in [('position_threshold', position_threshold),
+                           ('orientation_threshold', orientation_threshold),
+                           ('subscribe_robots', subscribe_robots),
+                           ('subscribe_region', subscribe_region),
+                           ('asynchronous', asynchronous),
+                           ('max_extrapolation', max_extrapolation),
+                           ('reply_timeout', reply_timeout)]:
+            if value is not None:
+                self._multinode_options[key] = value
         self._multinode_configured = True
 
     def configure_stream_manager(self, stream_manager, **kwargs):
@@ -1,6 +1,7 @@
 import logging; logger = logging.getLogger("morse." + __name__)
 from abc import ABCMeta, abstractmethod
 import morse.core.object
+from morse.core.profiler import profiler, clock
 
 class Actuator(morse.core.object.Object):
     """ Basic Class for all actuator objects.
@@ -38,6 +39,10 @@ class Actuator(morse.core.object.Object):
         # Update the component's position in the world
         self.position_3d.update(self.bge_object)
 
+        profiling = profiler.enabled
+        if profiling:
+            time_before_datastreams = clock()
+
         received = False
         status = False
 
@@ -46,10 +51,23 @@ class Actuator(morse.core.object.Object):
             status = function(self)
             received = received or status
 
+        if profiling:
+            time_before_modifiers = clock()
+
         if received:
             # Data modification functions
             for function in self.input_modifiers:
                 function()
 
+        if profiling:
+            time_before_action = clock()
+
         # Call the regular action function of the component
         self.default_action()
+
+        if profiling:
+            time_now = clock()
+            name = self.name()
+            profiler.record(name, 'datastreams', time_before_modifiers - time_before_datastreams)
+            profiler.record(name, 'modifiers', time_before_action - time_before_modifiers)
+            profiler.record(name, 'action', time_now - time_before_action)
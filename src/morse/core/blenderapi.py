@@ -216,6 +216,16 @@ def getalwayssensors(obj):
     else:
         return []
 
+def getcallingsensor(obj):
+    """ Return the sensor triggering the MORSE logic brick of obj (the
+    python controller calling the 'calling' module), or None """
+    if not fake:
+        for contr in obj.controllers:
+            if isinstance(contr, bge.types.SCA_PythonController) and \
+               contr.script.startswith('calling.') and contr.sensors:
+                return contr.sensors[0]
+    return None
+
 def get_armatures(obj):
     if not fake:
         return [child for child in obj.children if isinstance(child, bge.types.BL_ArmatureObject)]
@@ -251,6 +261,32 @@ def persistantstorage():
     else:
         return {}
 
+def viewport_rendering():
+    """ Return True if the next frame is rendered (see :py:func:`set_render`
+    and the turbo mode), i.e. if it makes sense to update purely visual
+    elements.
+    """
+    if not fake:
+        if bpy.app.background:
+            return False
+        if hasattr(bge.logic, 'getRender'):
+            return bge.logic.getRender()
+        # Before Blender 2.74, all the frames are rendered
+        return True
+    else:
+        return False
+
+def set_render(render):
+    """ Enable or disable the render of the next frames (the logic and
+    physics steps are still done). Return False if not supported by the
+    current version of Blender.
+    """
+    if not fake:
+        if hasattr(bge.logic, 'setRender'):
+            bge.logic.setRender(render)
+            return True
+    return False
+
 def version():
     if not fake:
         return bpy.app.version
@@ -2,13 +2,18 @@
 This module deals with the time management in Morse, providing several
 possible implementations.
 
-At the moment, it provides two implementations:
+At the moment, it provides three implementations:
     - best effort (i.e. try to simulate at real-time, by dropping
       frame). The simulation is less acurate, because the physical steps
       are not really constant.
     - fixed simulation step. Compute all physical / logical step. The
       simulation will be more precise, but the simulation time will
       differ from computer clock time.
+    - lockstep. Same as fixed simulation step, but the simulation only
+      advances when it is asked to (through the ``time.step`` and
+      ``time.run_until`` services), and blocks otherwise. It allows to
+      run the simulation as fast as possible, while staying
+      deterministic.
 """
 
 import logging
@@ -163,8 +168,116 @@ class FixedSimulationStepStrategy:
             self._last_time = time.time()
             self._stat_jitter.update(ds)
 
+class LockstepStrategy(FixedSimulationStepStrategy):
+    """
+    Fixed simulation step, but the simulation only advances by the
+    number of steps requested through :py:meth:`request`. When there is no
+    step left, :py:meth:`update` blocks the simulation loop, processing
+    only the incoming service requests, until a new step is requested.
+    """
+    # Period at which service requests are polled while blocked
+    poll_period = 0.0001
+
+    def __init__ (self, relative_time):
+        FixedSimulationStepStrategy.__init__(self, relative_time)
+        self._remaining = 0
+        self._until = None
+        self._batch_steps = 0
+        self._batch_start = 0.0
+        self._batch_sim_start = 0.0
+        self._last_batch = None
+        self._stat_batch = Stats()
+        self._nb_steps = 0
+
+        logger.info('Morse configured in Lockstep Mode: waiting for '
+                    'time.step / time.run_until requests')
+
+    def name (self):
+        return 'Lockstep'
+
+    def request(self, steps = None, until = None):
+        """
+        Allow the simulation to advance by :param steps: steps, or until
+        the simulated time reaches :param until:
+        """
+        if until is not None:
+            if until <= self.time:
+                raise ValueError("%f is already in the past (current time: %f)"
+                                 % (until, self.time))
+            self._until = until
+            self._remaining = 0
+        else:
+            if steps < 1:
+                raise ValueError("The number of steps must be positive "
+                                 "(got %d)" % steps)
+            self._until = None
+            self._remaining = int(steps)
+        self._batch_steps = 0
+        self._batch_start = time.time()
+        self._batch_sim_start = self.time
+        self._last_batch = None
+
+    @property
+    def running(self):
+        return bool(self._remaining) or self._until is not None
+
+    def last_batch(self):
+        """
+        Return the report of the last completed batch of steps, or None
+        if the current batch is still running
+        """
+        return self._last_batch
+
+    def _wait_for_step(self):
+        persistantstorage = blenderapi.persistantstorage()
+        while not self.running:
+            if 'morse_services' not in persistantstorage:
+                # the simulation is closing
+                return
+            persistantstorage.morse_services.process()
+            if not self.running:
+                time.sleep(self.poll_period)
+
+    def update (self):
+        self._wait_for_step()
+        FixedSimulationStepStrategy.update(self)
+
+        if not self.running:
+            return
+        self._batch_steps += 1
+        self._nb_steps += 1
+        if self._until is not None:
+            # complete the batch if the next step would go past 'until'
+            if self.time + self._incr / 2 >= self._until:
+                self._until = None
+        else:
+            self._remaining -= 1
+        if not self.running:
+            self._end_batch()
+
+    def _end_batch(self):
+        wall_time = time.time() - self._batch_start
+        sim_time = self.time - self._batch_sim_start
+        self._stat_batch.update(wall_time)
+        self._last_batch = {
+            "steps": self._batch_steps,
+            "time": self.time,
+            "wall_time": wall_time,
+            "real_time_factor": sim_time / wall_time if wall_time > 0 else 0.0
+        }
+
+    def statistics (self):
+        stats = FixedSimulationStepStrategy.statistics(self)
+        stats.update({
+            "steps": self._nb_steps,
+            "batches": self._stat_batch.n,
+            "mean_batch_wall_time": self._stat_batch.mean,
+            "last_batch": self._last_batch
+        })
+        return stats
+
 class TimeStrategies:
-    (BestEffort, FixedSimulationStep) = range(2)
+    (BestEffort, FixedSimulationStep, Lockstep) = range(3)
 
     internal_mapping = {
         BestEffort:
@@ -176,6 +289,11 @@ class TimeStrategies:
             { "impl": FixedSimulationStepStrategy,
               "python_repr": b"TimeStrategies.FixedSimulationStep",
               "human_repr": "Fixed Simulation Step"
+            },
+        Lockstep:
+            { "impl": LockstepStrategy,
+              "python_repr": b"TimeStrategies.Lockstep",
+              "human_repr": "Lockstep"
             }
         }
 
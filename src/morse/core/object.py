@@ -21,6 +21,14 @@ class Object(AbstractObject):
     # Make this an abstract class
     __metaclass__ = ABCMeta
 
+    # Components reading their own logic bricks (through
+    # blenderapi.controller()) must be called by these bricks: they are
+    # left out of the scheduler (see morse.core.scheduler)
+    uses_logic_bricks = False
+
+    # Set by the scheduler, once it calls the action of the object
+    scheduled = False
+
     def __init__ (self, obj, parent=None):
 
         AbstractObject.__init__(self)
@@ -187,6 +195,11 @@ class Object(AbstractObject):
     def periodic_call(self):
         """
         Return true if the component must be called on this loop call, False otherwise
+
+        When the simulation is running, the robots and components are
+        called by the :py:class:`morse.core.scheduler.Scheduler` (unless
+        they set ``uses_logic_bricks``), which replaces this method by
+        one always returning True.
         """
         # must be called on each loop occurence
         if not hasattr(self, '_component_period'):
@@ -0,0 +1,120 @@
+import logging; logger = logging.getLogger("morse." + __name__)
+from collections import OrderedDict
+from morse.core import blenderapi
+
+class ObjectRegistry(object):
+    """
+    Index of the objects of the scene, by game property and by 'Type'.
+
+    Components looking for tagged objects (proximity sensor, semantic
+    camera...) query the registry instead of iterating over all the
+    objects of the scene at each step.
+
+    The registry is built once, from all the objects of the scene. Objects
+    added or removed later are registered with :py:meth:`add` and
+    :py:meth:`remove` (see :py:mod:`morse.helpers.passive_objects`). As a
+    safety net, the registry also resynchronises itself with the scene
+    when the number of objects of the scene changes. Objects whose
+    properties are modified at runtime must be re-registered with
+    :py:meth:`update`.
+
+    ``version`` is incremented at each change, so that users may cache the
+    result of their queries.
+    """
+    def __init__(self, scene):
+        self._scene = scene
+        # property name -> objects (in scene order)
+        self._by_property = {}
+        # value of the 'Type' property -> objects
+        self._by_type = {}
+        # object -> (property names, type)
+        self._objects = {}
+        self.version = 0
+
+        for obj in scene.objects:
+            self._add(obj)
+        self._count = len(scene.objects)
+
+    def _add(self, obj):
+        names = obj.getPropertyNames()
+        obj_type = obj.get('Type')
+        try:
+            hash(obj_type)
+        except TypeError:
+            obj_type = None
+        self._objects[obj] = (names, obj_type)
+        for name in names:
+            self._by_property.setdefault(name, OrderedDict())[obj] = True
+        if obj_type is not None:
+            self._by_type.setdefault(obj_type, OrderedDict())[obj] = True
+
+    def _remove(self, obj):
+        names, obj_type = self._objects.pop(obj)
+        for name in names:
+            del self._by_property[name][obj]
+        if obj_type is not None:
+            del self._by_type[obj_type][obj]
+
+    def add(self, obj):
+        """ Register a new object of the scene """
+        if obj in self._objects:
+            self._remove(obj)
+        self._add(obj)
+        self._count = len(self._scene.objects)
+        self.version += 1
+
+    def remove(self, obj):
+        """ Forget an object (removed from the scene) """
+        if obj in self._objects:
+            self._remove(obj)
+            self.version += 1
+        self._count = len(self._scene.objects)
+
+    def update(self, obj):
+        """ Index again an object whose properties changed """
+        self.add(obj)
+
+    def sync(self):
+        """ Resynchronise the registry if the number of objects of the
+        scene changed (objects added or ended without being registered)
+        """
+        objects = self._scene.objects
+        if len(objects) == self._count:
+            return
+        current = set(objects)
+        for obj in [o for o in self._objects if o not in current]:
+            self._remove(obj)
+        for obj in objects:
+            if obj not in self._objects:
+                self._add(obj)
+        self._count = len(objects)
+        self.version += 1
+
+    def _valid(self, objects):
+        return [obj for obj in objects if not obj.invalid]
+
+    def tagged(self, name):
+        """ Return the objects which have the game property :param name: """
+        self.sync()
+        return self._valid(self._by_property.get(name, ()))
+
+    def of_type(self, obj_type):
+        """ Return the objects whose 'Type' property is :param obj_type: """
+        self.sync()
+        return self._valid(self._by_type.get(obj_type, ()))
+
+    def tracked(self, tag):
+        """ Return the objects whose 'Type' is :param tag:, or which have a
+        :param tag: game property set to a true value (the objects tracked
+        by the semantic camera)
+        """
+        res = self.of_type(tag)
+        known = set(res)
+        res.extend(obj for obj in self.tagged(tag)
+                   if obj not in known and bool(obj[tag]))
+        return res
+
+
+def object_registry():
+    """ Return the registry of the objects of the current scene """
+    return blenderapi.persistantstorage().object_registry
@@ -0,0 +1,193 @@
+"""
+This module provides the MORSE frame-budget profiler.
+
+When enabled, it records how much (real) time each component spends in
+each stage of the simulation loop:
+
+    - robots, sensors and actuators: ``action`` (their default action),
+      ``modifiers`` and ``datastreams``,
+    - the simulation itself (pseudo-component ``simulation``):
+      ``stream_managers``, ``time``, ``spatial_index``, ``components``
+      (all the robots
+      and components), ``service_objects``, ``services``
+      (request managers), ``multinode``, and ``frame``, the time between
+      two consecutive logic steps.
+
+Durations are accumulated in histograms with logarithmic buckets, which
+give the p50/p95/p99 percentiles in constant memory. The statistics are
+available through the ``simulation`` services ``set_profiling``,
+``profiling_report`` and ``reset_profiling``, and may be dumped to a
+JSON or CSV file at the end of the simulation (see
+``env.enable_profiling()`` in the Builder API).
+
+The profiler is a module-level object, so that checking whether it is
+enabled costs a single attribute lookup in the hot loop.
+"""
+
+import logging; logger = logging.getLogger("morse." + __name__)
+import csv
+import json
+import math
+import time
+
+# Bucket i holds the durations in [MIN * GROWTH ** i, MIN * GROWTH ** (i+1))
+HISTOGRAM_MIN = 1e-6 # 1 µs
+HISTOGRAM_GROWTH = 1.1
+HISTOGRAM_SIZE = 200 # up to ~190 s
+
+clock = time.perf_counter
+
+class Histogram:
+    """
+    Histogram of durations, with logarithmic buckets: percentiles are
+    estimated with a relative error lower than 10%.
+    """
+    _log_growth = math.log(HISTOGRAM_GROWTH)
+
+    def __init__(self):
+        self.buckets = [0] * HISTOGRAM_SIZE
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def update(self, duration):
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+        if duration <= HISTOGRAM_MIN:
+            index = 0
+        else:
+            index = min(int(math.log(duration / HISTOGRAM_MIN) / self._log_growth),
+                        HISTOGRAM_SIZE - 1)
+        self.buckets[index] += 1
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, p):
+        """ Return the (estimated) p-th percentile, p in [0, 100] """
+        if not self.count:
+            return 0.0
+        rank = p / 100.0 * self.count
+        seen = 0
+        for index, nb in enumerate(self.buckets):
+            seen += nb
+            if seen >= rank and nb:
+                # upper bound of the bucket, never above the observed max
+                return min(HISTOGRAM_MIN * HISTOGRAM_GROWTH ** (index + 1),
+                           self.max)
+        return self.max
+
+    def statistics(self):
+        return {'count': self.count,
+                'total': self.total,
+                'mean': self.mean,
+                'max': self.max,
+                'p50': self.percentile(50),
+                'p95': self.percentile(95),
+                'p99': self.percentile(99)}
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.report_file = None
+        self._histograms = {}
+        self._last_frame = None
+        self._last_lap = None
+
+    def enable(self, report_file = None):
+        """ Start profiling. If :param report_file: is given, the report is
+        written to this file (JSON, or CSV if its extension is .csv) by
+        :py:meth:`dump_report`
+        """
+        if report_file:
+            self.report_file = report_file
+        if not self.enabled:
+            logger.info("Frame-budget profiler enabled")
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        self._last_frame = None
+        self._last_lap = None
+
+    def reset(self):
+        self._histograms = {}
+        self._last_frame = None
+
+    def record(self, component, stage, duration):
+        try:
+            histogram = self._histograms[(component, stage)]
+        except KeyError:
+            histogram = self._histograms[(component, stage)] = Histogram()
+        histogram.update(duration)
+
+    def frame(self):
+        """ Mark the beginning of a new logic step (does nothing if the
+        profiler is disabled) """
+        if not self.enabled:
+            return
+        now = clock()
+        if self._last_frame is not None:
+            self.record('simulation', 'frame', now - self._last_frame)
+        self._last_frame = now
+        self._last_lap = now
+
+    def lap(self, component, stage):
+        """ Record the time elapsed since the beginning of the logic step,
+        or the previous lap, as the duration of :param stage: (does nothing
+        if the profiler is disabled) """
+        if not self.enabled:
+            return
+        now = clock()
+        if self._last_lap is not None:
+            self.record(component, stage, now - self._last_lap)
+        self._last_lap = now
+
+    def statistics(self):
+        """
+        Return a dictionary component -> stage -> statistics. The
+        statistics of each stage contain the number of calls, the total,
+        mean, max, p50, p95 and p99 durations (in seconds), and the
+        'share' of the total frame time it represents.
+        """
+        frame = self._histograms.get(('simulation', 'frame'))
+        frame_total = frame.total if frame else 0.0
+
+        res = {}
+        for (component, stage), histogram in self._histograms.items():
+            stats = histogram.statistics()
+            if frame_total:
+                stats['share'] = histogram.total / frame_total
+            else:
+                stats['share'] = 0.0
+            res.setdefault(component, {})[stage] = stats
+        return res
+
+    def dump_report(self, filename = None):
+        """ Write the statistics in :param filename: (by default, the
+        report file given to :py:meth:`enable`) """
+        filename = filename or self.report_file
+        if not filename or not self._histograms:
+            return False
+
+        stats = self.statistics()
+        with open(filename, 'w') as f:
+            if filename.endswith('.csv'):
+                fields = ['count', 'total', 'mean', 'max', 'p50', 'p95',
+                          'p99', 'share']
+                writer = csv.writer(f)
+                writer.writerow(['component', 'stage'] + fields)
+                for component in sorted(stats):
+                    for stage in sorted(stats[component]):
+                        s = stats[component][stage]
+                        writer.writerow([component, stage] + [s[k] for k in fields])
+            else:
+                json.dump(stats, f, indent = 2, sort_keys = True)
+
+        logger.info("Profiling report written in %s" % filename)
+        return True
+
+profiler = Profiler()
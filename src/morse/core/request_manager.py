@@ -208,7 +208,7 @@ class RequestManager(object):
 
         """
 
-        logger.info("Incoming request " + service + " for " + component + "!")
+        logger.debug("Incoming request %s for %s!", service, component)
 
         #Unique ID for our request
         request_id = uuid.uuid1()
@@ -254,7 +254,7 @@ class RequestManager(object):
 
         else: #Synchronous service.
             #Invoke the method
-            logger.info("Synchronous service -> invoking it now.")
+            logger.debug("Synchronous service -> invoking it now.")
             try:
                 values = method(*params) if params else method() #Invoke the method with unpacked parameters
             except AttributeError as e:
@@ -276,7 +276,7 @@ class RequestManager(object):
             # If we are here, no exception has been raised by the
             # service, which mean the service call is successful. Good.
             values = (status.SUCCESS, values)
-            logger.info("Done. Result: " + str(values))
+            logger.debug("Done. Result: %s", values)
             return True, values
 
     def abort_request(self, request_id):
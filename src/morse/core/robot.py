@@ -4,6 +4,7 @@ import morse.core.object
 from morse.core import blenderapi
 from morse.core import mathutils
 from morse.helpers.components import add_property
+from morse.core.profiler import profiler, clock
 
 class Robot(morse.core.object.Object):
     """ Basic Class for all robots
@@ -46,7 +47,12 @@ class Robot(morse.core.object.Object):
         # Update the component's position in the world
         self.position_3d.update(self.bge_object)
 
-        self.default_action()
+        if profiler.enabled:
+            time_before_action = clock()
+            self.default_action()
+            profiler.record(self.name(), 'action', clock() - time_before_action)
+        else:
+            self.default_action()
 
     def gettime(self):
         """ Return the current time, as seen by the robot, in seconds """
@@ -0,0 +1,159 @@
+"""
+This module provides the scheduler of the components actions.
+
+Instead of calling the ``action`` method of each robot and component at
+each logic step, and let it decide (through
+:py:meth:`morse.core.object.Object.periodic_call`) if it must do
+something, the components are grouped in buckets by frequency. At each
+step, the scheduler decides once per bucket if it is due, and only calls
+the components of the due buckets.
+
+The components which read their own logic bricks (through
+``blenderapi.controller()``, which only returns their controller when
+called by it) set ``uses_logic_bricks``: they are still called by their
+logic brick.
+"""
+
+import logging; logger = logging.getLogger("morse." + __name__)
+from morse.core import blenderapi
+
+def always():
+    return True
+
+class Bucket:
+    """
+    The components sharing the same frequency. A bucket without
+    frequency is due at each logic step.
+
+    The schedule follows the one of
+    :py:meth:`morse.core.object.Object.periodic_call`.
+    """
+    def __init__(self, frequency = None):
+        self.frequency = frequency
+        self.components = []
+        self._last_call = None
+        self._nb_call = 0
+        if frequency:
+            self._period = 1.0 / frequency
+
+    def is_due(self, now, half_step):
+        if not self.frequency:
+            return True
+
+        # First call
+        if self._last_call is None:
+            self._last_call = now
+            self._nb_call = 1
+            return True
+
+        # We deal with a complete simulated second to deal with
+        # frequencies that are not a fraction of the main simulator
+        # frequency.
+        if self._last_call + self._nb_call * self._period - now < half_step:
+            if self._nb_call == self.frequency:
+                self._nb_call = 1
+                self._last_call = now
+            else:
+                self._nb_call += 1
+            return True
+        return False
+
+
+class Scheduler:
+    """
+    Call the action of the robots and components when they are due.
+
+    The robots are called first, then the components, in the order they
+    have been added. As with the logic bricks, an object is only called
+    if the sensor of its logic brick is positive. After each
+    :py:meth:`tick`, ``ran`` and ``skipped`` hold the number of objects
+    called and not called during this step.
+    """
+    def __init__(self, time):
+        self._time = time
+        self._buckets = {}
+        # buckets in dispatch order
+        self._ordered = []
+        self.ran = 0
+        self.skipped = 0
+        self.ticks = 0
+        self.total_ran = 0
+        self.total_skipped = 0
+        self._size = 0
+        # objects left to their logic bricks
+        self.unscheduled = 0
+
+    def add(self, obj, category):
+        """ Schedule the action of :param obj: (a robot or a
+        component). :param category: is 'robot' or 'component' (robots
+        are called first).
+
+        :return: False if the object is left to its logic brick (if it
+                 has none, it is never called)
+        """
+        sensor = blenderapi.getcallingsensor(obj.bge_object)
+        if obj.uses_logic_bricks or (sensor is None and not blenderapi.fake):
+            self.unscheduled += 1
+            return False
+
+        frequency = None
+        if hasattr(obj, '_component_period'):
+            frequency = obj.frequency
+
+        key = (category != 'robot', frequency or 0)
+        bucket = self._buckets.get(key)
+        if not bucket:
+            bucket = self._buckets[key] = Bucket(frequency)
+            self._ordered = [self._buckets[k] for k in sorted(self._buckets)]
+        bucket.components.append((obj, sensor))
+        self._size += 1
+
+        # The scheduler decides now when the object is called
+        obj.periodic_call = always
+        obj.scheduled = True
+        return True
+
+    def tick(self):
+        """ Call the action of all the objects due at this step """
+        now = self._time.time
+        half_step = self._time.mean / 2
+
+        ran = 0
+        for bucket in self._ordered:
+            if bucket.is_due(now, half_step):
+                for obj, sensor in bucket.components:
+                    # Execute only when the sensor is really activated
+                    if sensor is None or sensor.positive:
+                        obj.action()
+                        ran += 1
+
+        self.ran = ran
+        self.skipped = self._size - ran
+        self.ticks += 1
+        self.total_ran += ran
+        self.total_skipped += self.skipped
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Scheduler: %d objects ran, %d skipped" %
+                         (self.ran, self.skipped))
+
+    def statistics(self):
+        """
+        Return the number of objects called and skipped at the last step,
+        the totals since the start of the simulation, and the number of
+        objects by frequency
+        """
+        by_frequency = {}
+        for bucket in self._ordered:
+            frequency = str(bucket.frequency or 'every_step')
+            by_frequency[frequency] = by_frequency.get(frequency, 0) + \
+                                      len(bucket.components)
+        return {
+            "ran": self.ran,
+            "skipped": self.skipped,
+            "ticks": self.ticks,
+            "total_ran": self.total_ran,
+            "total_skipped": self.total_skipped,
+            "by_frequency": by_frequency,
+            "unscheduled": self.unscheduled
+        }
@@ -5,6 +5,7 @@ import morse.core.object
 from morse.core.services import service
 from morse.helpers.components import add_data
 from morse.core import blenderapi
+from morse.core.profiler import profiler, clock
 
 class Sensor(morse.core.object.Object):
     """ Basic Class for all sensors
@@ -38,7 +39,7 @@ class Sensor(morse.core.object.Object):
                             "profile_datastreams"]
             for key in self.profile:
                 self.time[key] = 0.0
-            self.time_start = time.time()
+            self.time_start = clock()
 
     def finalize(self):
         self._active = False
@@ -71,32 +72,43 @@ class Sensor(morse.core.object.Object):
         if logger.isEnabledFor(logging.DEBUG):
             self.local_data['simulator_time'] = time.time()
 
+        profiling = self.profile or profiler.enabled
+
         # record the time before performing the default action for profiling
-        if self.profile:
-            time_before_action = time.time()
+        if profiling:
+            time_before_action = clock()
 
         # Call the regular action function of the component
         self.default_action()
 
         # record the time before calling modifiers for profiling
-        if self.profile:
-            time_before_modifiers = time.time()
+        if profiling:
+            time_before_modifiers = clock()
 
         # Data modification functions
         for function in self.output_modifiers:
             function()
 
         # record the time before calling datastreams for profiling
-        if self.profile:
-            time_before_datastreams = time.time()
+        if profiling:
+            time_before_datastreams = clock()
 
         # Lastly output functions
         for function in self.output_functions:
             function(self)
 
-        # profiling
+        if not profiling:
+            return
+
+        time_now = clock()
+        if profiler.enabled:
+            name = self.name()
+            profiler.record(name, 'action', time_before_modifiers - time_before_action)
+            profiler.record(name, 'modifiers', time_before_datastreams - time_before_modifiers)
+            profiler.record(name, 'datastreams', time_now - time_before_datastreams)
+
+        # per-component profiling display
         if self.profile:
-            time_now = time.time()
             self.time["profile"] += time_now - time_before_action
             self.time["profile_action"] += time_before_modifiers - time_before_action
             self.time["profile_modifiers"] += time_before_datastreams - time_before_modifiers
@@ -109,7 +121,7 @@ class Sensor(morse.core.object.Object):
             if morse_time > 1: # re-init mean every sec
                 for key in self.profile:
                     self.time[key] = 0.0
-                self.time_start = time.time()
+                self.time_start = clock()
 
     @service
     def get_local_data(self):
@@ -0,0 +1,185 @@
+import logging; logger = logging.getLogger("morse." + __name__)
+import math
+from morse.core import blenderapi
+
+# Default size (in meters) of the cells of the grid
+DEFAULT_CELL_SIZE = 5.0
+
+class _Grid(object):
+    """ The positions of a set of objects, hashed in a uniform grid """
+    def __init__(self, objects, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+        for obj in objects:
+            pos = obj.worldPosition
+            position = (pos[0], pos[1], pos[2])
+            self.cells.setdefault(self.cell(position), []).append((obj, position))
+
+    def cell(self, position):
+        size = self.cell_size
+        return (int(math.floor(position[0] / size)),
+                int(math.floor(position[1] / size)),
+                int(math.floor(position[2] / size)))
+
+    def cells_around(self, position, radius):
+        """ Yield the (cell, entries) of the non-empty cells which may
+        contain points within :param radius: of :param position: """
+        if math.isinf(radius):
+            for item in self.cells.items():
+                yield item
+            return
+
+        low = self.cell([c - radius for c in position])
+        high = self.cell([c + radius for c in position])
+        count = 1
+        for i in range(3):
+            count *= high[i] - low[i] + 1
+
+        if count >= len(self.cells):
+            # the sphere covers more cells than there are objects
+            for cell, entries in self.cells.items():
+                if all(low[i] <= cell[i] <= high[i] for i in range(3)):
+                    yield cell, entries
+            return
+
+        cells = self.cells
+        for x in range(low[0], high[0] + 1):
+            for y in range(low[1], high[1] + 1):
+                for z in range(low[2], high[2] + 1):
+                    entries = cells.get((x, y, z))
+                    if entries:
+                        yield (x, y, z), entries
+
+    def box(self, cell, margin):
+        """ Return the 8 corners of :param cell:, inflated by :param margin: """
+        size = self.cell_size
+        low = [cell[i] * size - margin for i in range(3)]
+        high = [(cell[i] + 1) * size + margin for i in range(3)]
+        return [[x, y, z] for x in (low[0], high[0])
+                          for y in (low[1], high[1])
+                          for z in (low[2], high[2])]
+
+
+class SpatialIndex(object):
+    """
+    Index of the positions of the tagged objects of the scene, shared by
+    the components doing range-limited queries (proximity sensor,
+    thermometer, semantic camera...).
+
+    For each tag queried during a simulation step, the positions of the
+    tagged objects (see :py:class:`morse.core.object_registry.ObjectRegistry`)
+    are hashed once in a uniform grid. Queries only look at the cells
+    overlapping the queried volume. The grids are dropped at each
+    simulation step (see :py:meth:`invalidate`), and when the objects of
+    the scene change.
+
+    .. code-block:: python
+
+        from morse.core.spatial_index import spatial_index
+
+        for obj, distance in spatial_index().near('Fire', position, 10.0):
+            ...
+
+    :param registry: the object registry of the scene
+    :param cell_size: the size of the cells of the grid, in meters. Queries
+                      are the most efficient when the size of the cells is
+                      close to the usual query radius.
+    """
+    def __init__(self, registry, cell_size = DEFAULT_CELL_SIZE):
+        self._registry = registry
+        self.cell_size = float(cell_size)
+        self._grids = {}
+        self._version = registry.version
+
+    def invalidate(self):
+        """ Forget the positions of the objects (called once per simulation
+        step) """
+        self._grids.clear()
+
+    def _grid(self, tag, tracked):
+        registry = self._registry
+        registry.sync()
+        if registry.version != self._version:
+            self._version = registry.version
+            self._grids.clear()
+
+        key = (tag, tracked)
+        grid = self._grids.get(key)
+        if grid is None:
+            if tracked:
+                objects = registry.tracked(tag)
+            else:
+                objects = registry.tagged(tag)
+            grid = self._grids[key] = _Grid(objects, self.cell_size)
+        return grid
+
+    def near(self, tag, position, radius, tracked = False):
+        """ Return the objects within :param radius: of :param position:
+
+        :param tag: the game property of the queried objects
+        :param tracked: if True, query the objects whose 'Type' is
+                        :param tag:, or whose :param tag: property is true
+                        (see :py:meth:`ObjectRegistry.tracked`)
+        :return: a list of (object, distance), in no particular order
+        """
+        position = (position[0], position[1], position[2])
+        radius2 = radius * radius
+        res = []
+        for cell, entries in self._grid(tag, tracked).cells_around(position, radius):
+            for obj, pos in entries:
+                d2 = (pos[0] - position[0]) ** 2 + \
+                     (pos[1] - position[1]) ** 2 + \
+                     (pos[2] - position[2]) ** 2
+                if d2 <= radius2 and not obj.invalid:
+                    res.append((obj, math.sqrt(d2)))
+        return res
+
+    def nearest(self, tag, position, radius = float('inf'), tracked = False):
+        """ Return the (object, distance) of the nearest object within
+        :param radius: of :param position:, or (None, None) """
+        candidates = self.near(tag, position, radius, tracked)
+        if not candidates:
+            return None, None
+        return min(candidates, key = lambda c: c[1])
+
+    def in_frustum(self, tag, camera, margin = 0.0, tracked = True):
+        """ Return the objects whose position may be in the frustum of the
+        Blender camera :param camera:
+
+        The test is done per cell: the caller must still check the objects
+        it is interested in (their bounding box, for instance).
+
+        :param margin: the maximal distance between the position of an
+                       object and the farthest point of the object
+        :param tracked: see :py:meth:`near`
+        """
+        grid = self._grid(tag, tracked)
+        pos = camera.worldPosition
+        position = (pos[0], pos[1], pos[2])
+        outside = camera.OUTSIDE
+        res = []
+        radius = _frustum_radius(camera) + margin
+        for cell, entries in grid.cells_around(position, radius):
+            if camera.boxInsideFrustum(grid.box(cell, margin)) != outside:
+                res.extend(obj for obj, pos in entries if not obj.invalid)
+        return res
+
+
+def _frustum_radius(camera):
+    """ Return the distance between the Blender camera :param camera: and
+    the farthest point of its frustum (the corners of its far plane) """
+    far = camera.far
+    if not camera.perspective:
+        half_size = camera.ortho_scale / 2
+        return math.sqrt(far * far + 2 * half_size * half_size)
+    # the diagonal of the projection matrix holds 1 / tan(half FOV), in x
+    # and y: far / radius is the cosine of the half diagonal FOV
+    projection = camera.projection_matrix
+    tan_x = 1.0 / projection[0][0]
+    tan_y = 1.0 / projection[1][1]
+    return far * math.sqrt(1.0 + tan_x * tan_x + tan_y * tan_y)
+
+
+def spatial_index():
+    """ Return the spatial index of the current scene """
+    return blenderapi.persistantstorage().spatial_index
@@ -4,6 +4,10 @@ from morse.core import mathutils
 import morse.core.object
 from sys import float_info
 
+# Zones covering more than this number of cells of the spatial index are
+# not stored in the grid, but checked for every query
+MAX_CELLS_PER_ZONE = 256
+
 class Zone:
     """ 
     Creates a named zone in the 3D environment. This can be used by
@@ -14,8 +18,9 @@ class Zone:
     point is part of a zone (and so potentially to trigger some
     behaviour).
 
-    Note that for simplicity, we currently assume the zone axis follows
-    the world axis.
+    The zone is a box, which may be rotated: the test is done in the
+    local frame of the zone, except for zones following the world axis
+    for which the (faster) test against the bounding box is enough.
     """
     def __init__(self, obj):
         self.name = obj.name
@@ -30,44 +35,97 @@ class Zone:
             vertex = mesh.getVertex(0, v_index)
             vertexes_.add(vertex.getXYZ()[:])
 
-        vertexes = [mathutils.Vector(p) for p in vertexes_]
+        self._vertexes = [mathutils.Vector(p) for p in vertexes_]
+        self.update()
 
-        # Compute range
-        self._min_values = [float_info.max, float_info.max, float_info.max]
-        self._max_values = [-float_info.max, -float_info.max, -float_info.max]
+    def update(self):
+        """
+        Recompute the geometry of the zone from the position, orientation
+        and scale of its Blender object. Must be called when the zone
+        has been moved (see :py:meth:`ZoneManager.update`).
+        """
+        obj = self.obj
+        scale = obj.worldScale
+        position = obj.worldPosition
+        orientation = obj.worldOrientation
 
-        for i in range(len(vertexes)):
+        # Range of the zone, in its local frame (scaled)
+        self._local_min = [float_info.max, float_info.max, float_info.max]
+        self._local_max = [-float_info.max, -float_info.max, -float_info.max]
+        for vertex in self._vertexes:
             for j in range(3):
-                # XXX Here, we assume there is no rotation
-                vertexes[i][j] = vertexes[i][j] * obj.worldScale[j] + obj.worldPosition[j]
-                if self._min_values[j] > vertexes[i][j]:
-                    self._min_values[j] = vertexes[i][j]
-                if self._max_values[j] < vertexes[i][j]:
-                    self._max_values[j] = vertexes[i][j]
+                value = vertex[j] * scale[j]
+                if self._local_min[j] > value:
+                    self._local_min[j] = value
+                if self._local_max[j] < value:
+                    self._local_max[j] = value
+
+        self._position = [position[0], position[1], position[2]]
+        # rows of the inverse (transposed) rotation
+        self._inv_rotation = [[orientation[j][i] for j in range(3)]
+                              for i in range(3)]
+
+        self.aligned = all(abs(orientation[i][j] - (1.0 if i == j else 0.0)) < 1e-6
+                           for i in range(3) for j in range(3))
+
+        # Axis-aligned bounding box, in the world frame
+        self._min_values = [float_info.max, float_info.max, float_info.max]
+        self._max_values = [-float_info.max, -float_info.max, -float_info.max]
+        for corner in range(8):
+            local = [self._local_max[j] if corner & (1 << j) else self._local_min[j]
+                     for j in range(3)]
+            for i in range(3):
+                value = self._position[i] + \
+                        sum(orientation[i][j] * local[j] for j in range(3))
+                if self._min_values[i] > value:
+                    self._min_values[i] = value
+                if self._max_values[i] < value:
+                    self._max_values[i] = value
 
     def contains(self, pos):
         """
         Verify if a pos (represented by a vector) is contained in the zone
-
-        The implementation assumes that the zone is a rectangle, with
-        axis following world axis.
         """
-        res = True
-        for i in range(3):
-            res = res and pos[i] >= self._min_values[i]
-            res = res and pos[i] <= self._max_values[i]
-        return res
+        mins = self._min_values
+        maxs = self._max_values
+        x, y, z = pos[0], pos[1], pos[2]
+        if not (mins[0] <= x <= maxs[0] and mins[1] <= y <= maxs[1] and
+                mins[2] <= z <= maxs[2]):
+            return False
+        if self.aligned:
+            return True
+
+        # Express pos in the local frame of the zone
+        x -= self._position[0]
+        y -= self._position[1]
+        z -= self._position[2]
+        mins = self._local_min
+        maxs = self._local_max
+        for i, row in enumerate(self._inv_rotation):
+            value = row[0] * x + row[1] * y + row[2] * z
+            if value < mins[i] or value > maxs[i]:
+                return False
+        return True
 
 
 class ZoneManager:
     """
-    Handle the different zones, allowing to search for them
-    'efficiently' (at least in an abstract way)
+    Handle the different zones, allowing to search for them efficiently.
+
+    The zones are indexed in a uniform grid in the XY plane: a query only
+    tests the zones whose bounding box overlaps the cell of the position.
+    The grid is (re)built lazily, on the first query following the
+    addition of zones, or a call to :py:meth:`update`.
     """
     def __init__(self):
         self.all_zones = {}
         self.zones_by_type = {}
 
+        self._grid = {}
+        self._large_zones = []
+        self._cell_size = 1.0
+        self._dirty = False
+
     def add(self, obj):
         new_zone = Zone(obj)
         logger.info("Adding zone %s of type %s" % (new_zone.name, new_zone.type))
@@ -80,21 +138,105 @@ class ZoneManager:
             zone_type = self.zones_by_type[new_zone.type]
         zone_type[new_zone.name] = new_zone
 
+        self._dirty = True
+
+    def update(self, name = None):
+        """
+        Take into account the move of the zone :param name: (or of all the
+        zones if it is not precised). The spatial index is rebuilt on the
+        next query.
+        """
+        if name:
+            self.all_zones[name].update()
+        else:
+            for zone in self.all_zones.values():
+                zone.update()
+        self._dirty = True
+
+    def _build_index(self):
+        self._grid = {}
+        self._large_zones = []
+        self._dirty = False
+
+        zones = list(self.all_zones.values())
+        if not zones:
+            return
+
+        # Use the median size of the zones as cell size: most zones then
+        # cover a few cells
+        sizes = sorted(max(z._max_values[0] - z._min_values[0],
+                           z._max_values[1] - z._min_values[1])
+                       for z in zones)
+        self._cell_size = max(sizes[len(sizes) // 2], 1e-3)
+
+        for zone in zones:
+            min_x, min_y = self._cell(zone._min_values)
+            max_x, max_y = self._cell(zone._max_values)
+            if (max_x - min_x + 1) * (max_y - min_y + 1) > MAX_CELLS_PER_ZONE:
+                self._large_zones.append(zone)
+                continue
+            for i in range(min_x, max_x + 1):
+                for j in range(min_y, max_y + 1):
+                    self._grid.setdefault((i, j), []).append(zone)
+
+        logger.debug("Zone index: %d zones in %d cells of %f m, %d large "
+                     "zones" % (len(zones), len(self._grid), self._cell_size,
+                                len(self._large_zones)))
+
+    def _cell(self, pos):
+        return (int(pos[0] // self._cell_size), int(pos[1] // self._cell_size))
+
+    def _candidates(self, pos):
+        if self._dirty:
+            self._build_index()
+        cell = self._grid.get(self._cell(pos))
+        if cell is None:
+            return self._large_zones
+        if self._large_zones:
+            return cell + self._large_zones
+        return cell
+
     def _get_subset(self, name = None, type = None):
         search_list = self.all_zones
 
         if name:
             if name in self.all_zones:
-                search_list = {name: [self.all_zones[name]]}
+                search_list = {name: self.all_zones[name]}
             else:
                 search_list = {}
         if type:
             if type in self.zones_by_type:
-                search_list = self.zones_by_type[type]
+                if name:
+                    search_list = {n: z for n, z in search_list.items()
+                                        if z.type == type}
+                else:
+                    search_list = self.zones_by_type[type]
             else:
                 search_list = {}
         return search_list
 
+    def _search(self, pos, name, type, first):
+        if name:
+            # a single zone (at most) to check, do not bother with the index
+            zones = self._get_subset(name, type).values()
+        else:
+            zones = self._candidates(pos)
+
+        res = []
+        for zone in zones:
+            if type and zone.type != type:
+                continue
+            if zone.contains(pos):
+                res.append(zone)
+                if first:
+                    break
+        return res
+
+    @staticmethod
+    def _position(obj_or_pos):
+        if (isinstance(obj_or_pos, morse.core.object.Object)):
+            return obj_or_pos.position_3d.translation
+        return obj_or_pos
 
     def is_in(self, obj_or_pos, name = None, type = None):
         """
@@ -108,17 +250,7 @@ class ZoneManager:
         If a :param type: is precised, only search in the zone of this
         type.
         """
-        pos = obj_or_pos
-        if (isinstance(obj_or_pos, morse.core.object.Object)):
-            pos = obj_or_pos.position_3d.translation
-
-        search_list = self._get_subset(name, type)
-
-        for zone in search_list.values():
-            if zone.contains(pos):
-                return True
-
-        return False
+        return bool(self._search(self._position(obj_or_pos), name, type, True))
 
     def contains(self, obj_or_pos, name = None, type = None):
         """
@@ -135,16 +267,35 @@ class ZoneManager:
         The method returns the list of zones containing the position,
         considering the previous limitation
         """
-        pos = obj_or_pos
-        if (isinstance(obj_or_pos, morse.core.object.Object)):
-            pos = obj_or_pos.position_3d.translation
+        return self._search(self._position(obj_or_pos), name, type, False)
+
+    def contains_all(self, objs_or_poses, name = None, type = None):
+        """
+        Batched version of :py:meth:`contains`: return, for each object or
+        position of :param objs_or_poses:, the list of zones containing it.
 
-        search_list = self._get_subset(name, type)
+        The positions falling in the same cell of the index share the
+        lookup of the candidate zones.
+        """
+        poses = [self._position(p) for p in objs_or_poses]
+        if name:
+            return [self._search(pos, name, type, False) for pos in poses]
 
-        res = []
+        if self._dirty:
+            self._build_index()
 
-        for zone in search_list.values():
-            if zone.contains(pos):
-                res.append(zone)
+        by_cell = {}
+        for index, pos in enumerate(poses):
+            by_cell.setdefault(self._cell(pos), []).append(index)
 
+        res = [None] * len(poses)
+        for cell, indexes in by_cell.items():
+            zones = self._grid.get(cell, [])
+            if self._large_zones:
+                zones = zones + self._large_zones
+            if type:
+                zones = [zone for zone in zones if zone.type == type]
+            for index in indexes:
+                pos = poses[index]
+                res[index] = [zone for zone in zones if zone.contains(pos)]
         return res
@@ -1,11 +1,66 @@
 import logging; logger = logging.getLogger("morse." + __name__)
-from math import sqrt, cos, sin, tan, atan, atan2, radians, degrees, pi
+import math
+from math import cos, sin, radians, pi
 from morse.core import blenderapi
 from morse.helpers.morse_math import normalise_angle
 import numpy
 
+class _Functions(object):
+    """ The mathematical functions used by the conversions, for a single
+    point (from :py:mod:`math`) or for arrays of points (from numpy) """
+    def __init__(self, module, **names):
+        for name in ('sqrt', 'sin', 'cos', 'tan', 'degrees', 'radians'):
+            setattr(self, name, getattr(module, name))
+        for name, function in names.items():
+            setattr(self, name, function)
+
+_SCALAR = _Functions(math, atan = math.atan, atan2 = math.atan2)
+_ARRAY = _Functions(numpy, atan = numpy.arctan, atan2 = numpy.arctan2)
+
+def _split(points):
+    """ Split :param points: in coordinates
+
+    :param points: a single point (a sequence of 3 numbers, or a 1x3
+                   ``numpy.matrix``), or a Nx3 array
+    :return: (x, y, z, functions, pack): floats and the :py:mod:`math`
+             functions for a single point, columns and the numpy functions
+             for an array. pack(x, y, z) builds the result in the form
+             of :param points:
+    """
+    if isinstance(points, numpy.matrix):
+        return (float(points[0, 0]), float(points[0, 1]), float(points[0, 2]),
+                _SCALAR, _pack_matrix)
+    if not isinstance(points, numpy.ndarray):
+        if len(points) == 3 and not hasattr(points[0], '__len__'):
+            return (float(points[0]), float(points[1]), float(points[2]),
+                    _SCALAR, _pack_point)
+        points = numpy.asarray(points, dtype = float)
+    if points.ndim == 1:
+        return (float(points[0]), float(points[1]), float(points[2]),
+                _SCALAR, _pack_point)
+    return points[:, 0], points[:, 1], points[:, 2], _ARRAY, _pack_array
+
+def _pack_matrix(x, y, z):
+    return numpy.matrix([x, y, z])
+
+def _pack_point(x, y, z):
+    return numpy.array((x, y, z))
+
+def _pack_array(x, y, z):
+    return numpy.column_stack((x, y, z))
+
 class CoordinateConverter:
-    """ Allow to convert coordinates from Geodetic to LTP to ECEF-r ... """
+    """ Allow to convert coordinates from Geodetic to LTP to ECEF-r ...
+
+    All the conversions take either a single point, as a sequence of 3
+    numbers (list, tuple, 1-D array, ``mathutils.Vector``) or a 1x3
+    ``numpy.matrix``, or a Nx3 ``numpy.ndarray`` of points. They return
+    a 1-D array for a single point (a 1x3 ``numpy.matrix`` if they were
+    given one), and a Nx3 array for an array of points, so that the
+    positions of several objects can be converted in one call. Angles are
+    in radians, and geodetic / geocentric points are (longitude,
+    latitude, altitude / radius).
+    """
     A  = 6378137.0 # WGS-84 Earth semi-major axis
     F = 1 / 298.257223563 # WGS-84 flattening
     ECC = 8.181919191e-2 # first excentricity
@@ -18,19 +73,19 @@ class CoordinateConverter:
     
     def __init__(self, latitude, longitude, altitude, angle_east_blender_x):
         P = [radians(longitude), radians(latitude), altitude]
-        self.origin_ecef = self.geodetic_to_ecef(numpy.matrix(P))
+        self.origin_ecef = self.geodetic_to_ecef(P)
         _rot = \
           [[-sin(P[0]), cos(P[0]), 0],
            [-cos(P[0]) * sin(P[1]), -sin(P[1]) * sin(P[0]), cos(P[1])],
            [cos(P[1]) * cos(P[0]), cos(P[1]) * sin(P[0]), sin(P[1])]]
-        self._rot_ltp_ecef = numpy.matrix(_rot)
+        self._rot_ltp_ecef = numpy.array(_rot)
         self._rot_ecef_ltp = self._rot_ltp_ecef.T
         _rot_east_x = \
          [[cos(angle_east_blender_x), -sin(angle_east_blender_x), 0],
           [sin(angle_east_blender_x), cos(angle_east_blender_x),  0],
           [0, 0, 1]]
         self._angle_east = angle_east_blender_x
-        self._rot_blender_ltp = numpy.matrix(_rot_east_x )
+        self._rot_blender_ltp = numpy.array(_rot_east_x)
         self._rot_ltp_blender = self._rot_blender_ltp.T
 
     @staticmethod
@@ -58,26 +113,25 @@ class CoordinateConverter:
         """
         converts gps-data(radians) to ECEF-r coordinates
         """
-        lg = P[0, 0]
-        la = P[0, 1]
-        h =  P[0, 2]
-        N = self.A/sqrt(1-(self.ECC2*(sin(la)**2)))
-        return numpy.matrix([
-               (h + N)*cos(la)*cos(lg),
-               (h + N)*cos(la)*sin(lg),
-               (h + (1 - self.ECC2) * N)*sin(la)])
+        lg, la, h, m, pack = _split(P)
+        sin_la = m.sin(la)
+        cos_la = m.cos(la)
+        N = self.A / m.sqrt(1 - (self.ECC2 * (sin_la ** 2)))
+        return pack((h + N) * cos_la * m.cos(lg),
+                    (h + N) * cos_la * m.sin(lg),
+                    (h + (1 - self.ECC2) * N) * sin_la)
 
     def ltp_to_ecef(self, xt):
         """
         converts point in LTP(Blender) to ECEF-r coordinates
         """
-        return  self.origin_ecef + xt * self._rot_ltp_ecef   #transformed xt -> xe
+        return self.origin_ecef + numpy.dot(xt, self._rot_ltp_ecef) #transformed xt -> xe
     
     def ecef_to_ltp(self, xt):
         """
         converts point in ECEF-r coordinates to LTP(Blender)
         """
-        return (xt - self.origin_ecef) * self._rot_ecef_ltp
+        return numpy.dot(numpy.subtract(xt, self.origin_ecef), self._rot_ecef_ltp)
 
 
     def ecef_to_geodetic(self, xe):
@@ -85,25 +139,24 @@ class CoordinateConverter:
         converts point in ECEF-r coordinates into Geodetic (GPS) via
         Vermeille's method
         """
-        x = xe[0, 0]
-        y = xe[0, 1]
-        z = xe[0, 2]
+        x, y, z, m, pack = _split(xe)
         #"just intermediary parameters" see FoIz
-        p = (x**2+y**2)/self.A2
+        xy2 = x**2 + y**2
+        nxy = m.sqrt(xy2)
+        p = xy2/self.A2
         q = (1-self.ECC2)/self.A2*z**2
         r = (p+q-self.ECC4)/6
         s = self.ECC4 * (p*q)/(4*r**3)
-        t = (1+s+sqrt(s*(2+s)))**(1/3.0)
+        t = (1+s+m.sqrt(s*(2+s)))**(1/3.0)
         u = r*(1+t+1/t)
-        v = sqrt(u**2+(self.ECC4*q))
+        v = m.sqrt(u**2+(self.ECC4*q))
         w = self.ECC2*((u+v-q)/(2*v))
-        k = sqrt(u+v+w**2)-w
-        D = (k*(sqrt(x**2+y**2)))/(k+self.ECC2)
-        gps_coords = numpy.matrix([
-                      2*atan(y/(x+(sqrt(x**2+y**2)))),
-                      2*atan(z/(D+sqrt(D**2+z**2))),
-                     ((k+self.ECC2-1)/k)*sqrt(D**2+z**2)])
-        return gps_coords
+        k = m.sqrt(u+v+w**2)-w
+        D = (k*nxy)/(k+self.ECC2)
+        Dz = m.sqrt(D**2+z**2)
+        return pack(2*m.atan(y/(x+nxy)),
+                    2*m.atan(z/(D+Dz)),
+                    ((k+self.ECC2-1)/k)*Dz)
 
     def ltp_to_geodetic(self, xe):
         return self.ecef_to_geodetic(self.ltp_to_ecef(xe))
@@ -114,47 +167,40 @@ class CoordinateConverter:
     def geodetic_to_geocentric(self, lat, h):
         """ Convert geodetic latitude to geocentric latitude
 
-        :param: latitude geodetic latitude in degree
+        :param: latitude geodetic latitude in degree (a number, or an array)
         :param: h height against sea level in meter
         :return: geocentric latitude in degree
         """
-        lat_rad = radians(lat)
-        lat_surface = atan((1 - self.F)**2 *tan(lat_rad))
-        sin_lat = sin(lat_rad)
-        cos_lat = cos(lat_rad)
-        s1 = h * sin_lat + self.R * sin(lat_surface)
-        cc = h * cos_lat + self.R * cos(lat_surface)
-        lat_geoc = atan(s1 / cc)
-        return degrees(lat_geoc)
+        m = _ARRAY if numpy.ndim(lat) or numpy.ndim(h) else _SCALAR
+        lat_rad = m.radians(lat)
+        lat_surface = m.atan((1 - self.F)**2 * m.tan(lat_rad))
+        sin_lat = m.sin(lat_rad)
+        cos_lat = m.cos(lat_rad)
+        s1 = h * sin_lat + self.R * m.sin(lat_surface)
+        cc = h * cos_lat + self.R * m.cos(lat_surface)
+        lat_geoc = m.atan(s1 / cc)
+        return m.degrees(lat_geoc)
 
     def geocentric_to_ecef(self, xt):
-        longitude = xt[0, 0]
-        latitude = xt[0, 1]
-        radius =  xt[0, 2]
-        clon = cos(longitude)
-        slon = sin(longitude)
-        clat = cos(latitude)
-        slat = sin(latitude)
-        return radius * numpy.matrix([
-            clat * clon,
-            clat * slon,
-            slat])
+        longitude, latitude, radius, m, pack = _split(xt)
+        clat = m.cos(latitude)
+        return pack(radius * clat * m.cos(longitude),
+                    radius * clat * m.sin(longitude),
+                    radius * m.sin(latitude))
 
     def ecef_to_geocentric(self, xt):
-        x = xt[0, 0]
-        y = xt[0, 1]
-        z = xt[0, 2]
-        longitude = atan2(y, x)
-        nxy = sqrt(x * x + y * y)
-        latitude = atan2(z, nxy);
-        radius = sqrt(x * x + y * y + z * z)
-        return numpy.matrix([longitude, latitude, radius])
+        x, y, z, m, pack = _split(xt)
+        longitude = m.atan2(y, x)
+        nxy = m.sqrt(x * x + y * y)
+        latitude = m.atan2(z, nxy)
+        radius = m.sqrt(x * x + y * y + z * z)
+        return pack(longitude, latitude, radius)
 
     def blender_to_ltp(self, xt):
-        return xt * self._rot_blender_ltp
+        return numpy.dot(xt, self._rot_blender_ltp)
 
     def ltp_to_blender(self,  xt):
-        return xt * self._rot_ltp_blender
+        return numpy.dot(xt, self._rot_ltp_blender)
 
     def angle_against_geographic_north(self, orientation):
         """
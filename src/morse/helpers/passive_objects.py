@@ -66,3 +66,42 @@ def obj_from_label(label):
     for obj, det in blenderapi.persistantstorage().passiveObjectsDict.items():
         if det['label'] == label:
             return obj
+
+def register(obj, new = True):
+    """ Make an object of the scene an active object.
+
+    The object is not active if it has no 'Object' property, or if the
+    property is set to False.
+
+    :param obj: the Blender object
+    :param new: True if the object was added to the scene after the
+                start of the simulation (it is then also added to the
+                object registry, see :py:mod:`morse.core.object_registry`)
+    :return: the details of the object, or None if it is not active
+    """
+    if not obj.get('Object'):
+        return None
+
+    details = {
+               'label': obj['Label'] if 'Label' in obj else str(obj),
+               'description': obj['Description'] if 'Description' in obj else "",
+               'type': obj['Type'] if 'Type' in obj else "Object",
+               'graspable': obj['Graspable'] if 'Graspable' in obj else False
+              }
+    persistantstorage = blenderapi.persistantstorage()
+    persistantstorage.passiveObjectsDict[obj] = details
+    if new:
+        persistantstorage.object_registry.add(obj)
+    logger.info("Added {name} as a {graspable}active object".format(
+                         name = details['label'],
+                         graspable = "graspable " if details['graspable'] else ""))
+    return details
+
+def unregister(obj):
+    """ Forget an active object, before removing it from the scene.
+
+    :param obj: the Blender object
+    """
+    persistantstorage = blenderapi.persistantstorage()
+    persistantstorage.passiveObjectsDict.pop(obj, None)
+    persistantstorage.object_registry.remove(obj)
@@ -0,0 +1,186 @@
+"""
+Joint trajectories, as executed by the :doc:`armature actuator
+<../user/actuators/armature>`.
+
+A trajectory is converted once, when it is submitted, into arrays of
+times, positions and (optionally) velocities. Its execution keeps a
+cursor on the current segment, so that evaluating the trajectory at each
+simulation step costs a constant time, whatever the number of waypoints.
+"""
+
+import logging; logger = logging.getLogger("morse." + __name__)
+import base64
+import numpy
+
+INTERPOLATIONS = ['linear', 'cubic']
+
+def _as_array(value, name):
+    """ Convert a list (possibly of lists) of floats, or a base64 string
+    of little-endian float64, to a numpy array """
+    if isinstance(value, str):
+        try:
+            return numpy.frombuffer(base64.b64decode(value), dtype='<f8')
+        except (ValueError, TypeError) as e:
+            raise ValueError("invalid base64 payload for '%s': %s" % (name, e))
+    return numpy.asarray(value, dtype=float)
+
+
+class JointTrajectory(object):
+    """
+    A trajectory of a set of joints.
+
+    It is built from a trajectory in one of these forms:
+
+    - a list of waypoints (as sent by the ``trajectory`` service of the
+      armature actuator)::
+
+        {'starttime': <timestamp in second>,
+         'points': [
+            {'positions': [...],
+             'velocities': [...],
+             'time_from_start': <seconds>},
+            ...
+         ]}
+
+    - a compact, columnar, form::
+
+        {'starttime': <timestamp in second>,
+         'time_from_start': [t0, t1, ...],
+         'positions': [p00, p01, ..., p10, p11, ...],
+         'velocities': [...]}
+
+      where 'positions' (and 'velocities') hold the values for each
+      waypoint, for each joint. They may be either flat lists, lists of
+      lists or base64-encoded arrays of little-endian doubles.
+
+    In both forms, 'joints' may list the names of the joints the values
+    refer to (by default, all the joints of the armature, from root to
+    tip), and 'interpolation' may be 'linear' (the default) or 'cubic'.
+    Cubic interpolation uses the given 'velocities' or, if there are
+    none, velocities estimated from the neighbour waypoints.
+    """
+    def __init__(self, trajectory, joints):
+        """
+        :param trajectory: the trajectory, as described above
+        :param joints: the (ordered) names of all the joints of the armature
+
+        Raises ValueError if the trajectory is not valid.
+        """
+        self.joints = list(trajectory.get('joints', joints))
+        unknown = set(self.joints).difference(joints)
+        if unknown:
+            raise ValueError("unknown joints %s" % ", ".join(sorted(unknown)))
+        nb_joints = len(self.joints)
+
+        self.interpolation = trajectory.get('interpolation', 'linear')
+        if self.interpolation not in INTERPOLATIONS:
+            raise ValueError("unknown interpolation '%s' (expected one of %s)"
+                             % (self.interpolation, INTERPOLATIONS))
+
+        if 'points' in trajectory:
+            try:
+                points = trajectory['points']
+                times = [p['time_from_start'] for p in points]
+                positions = [p['positions'] for p in points]
+                velocities = [p.get('velocities') for p in points]
+            except KeyError as ke:
+                raise ValueError("key %s was expected in each point" % ke)
+            if not all(velocities):
+                velocities = None
+        else:
+            try:
+                times = trajectory['time_from_start']
+                positions = trajectory['positions']
+            except KeyError as ke:
+                raise ValueError("key %s was expected" % ke)
+            velocities = trajectory.get('velocities')
+
+        self.times = _as_array(times, 'time_from_start')
+        nb_points = len(self.times)
+        if not nb_points:
+            raise ValueError("the trajectory has no point")
+        if numpy.any(numpy.diff(self.times) <= 0):
+            raise ValueError("'time_from_start' must be strictly increasing")
+
+        try:
+            self.positions = _as_array(positions, 'positions').reshape(nb_points, nb_joints)
+            if velocities is not None:
+                velocities = _as_array(velocities, 'velocities').reshape(nb_points, nb_joints)
+        except ValueError:
+            raise ValueError("expected %d 'positions' (and 'velocities') values "
+                             "per point, for the joints %s" % (nb_joints, self.joints))
+        self.velocities = velocities
+
+        self.starttime = trajectory.get('starttime')
+        self.duration = self.times[-1]
+        self._cursor = 0
+        self._started = False
+
+    def start(self, starttime, state):
+        """ Start the execution of the trajectory at simulated time
+        :param starttime:, from the current joint :param state: (dict
+        joint name -> value). If the first waypoint is not at time 0, the
+        trajectory starts by going from the current state to it.
+        """
+        self.starttime = starttime
+        self._started = True
+        if self.times[0] > 0:
+            current = numpy.array([[state[j] for j in self.joints]])
+            self.times = numpy.concatenate(([0.0], self.times))
+            self.positions = numpy.concatenate((current, self.positions))
+            if self.velocities is not None:
+                self.velocities = numpy.concatenate(
+                        (numpy.zeros((1, len(self.joints))), self.velocities))
+
+        if self.interpolation == 'cubic' and self.velocities is None:
+            self.velocities = self._estimate_velocities()
+
+    @property
+    def started(self):
+        return self._started
+
+    def _estimate_velocities(self):
+        """ Velocities at the waypoints, as the slopes between their
+        neighbours (null at both ends) """
+        velocities = numpy.zeros_like(self.positions)
+        if len(self.times) > 2:
+            dt = (self.times[2:] - self.times[:-2])[:, None]
+            velocities[1:-1] = (self.positions[2:] - self.positions[:-2]) / dt
+        return velocities
+
+    def sample(self, t):
+        """ Return the positions of the joints (as a numpy array, in the
+        order of ``joints``) at time t, relative to the start of the
+        trajectory.
+
+        The cursor only moves forward: t is expected to increase between
+        calls.
+        """
+        times = self.times
+        last = len(times) - 1
+        if t >= times[last]:
+            self._cursor = last
+            return self.positions[last]
+        if t <= times[0]:
+            return self.positions[0]
+
+        i = self._cursor
+        while times[i + 1] <= t:
+            i += 1
+        self._cursor = i
+
+        t0 = times[i]
+        dt = times[i + 1] - t0
+        a = (t - t0) / dt
+        p0 = self.positions[i]
+        p1 = self.positions[i + 1]
+        if self.interpolation == 'linear':
+            return p0 + (p1 - p0) * a
+
+        # cubic Hermite spline
+        a2 = a * a
+        a3 = a2 * a
+        return (2 * a3 - 3 * a2 + 1) * p0 + \
+               (a3 - 2 * a2 + a) * dt * self.velocities[i] + \
+               (-2 * a3 + 3 * a2) * p1 + \
+               (a3 - a2) * dt * self.velocities[i + 1]
@@ -22,7 +22,7 @@ class LIDARNotifier(MOOSNotifier):
         # build string of the form: '[1x180]{4.9, 29.2, ..., 2.98}'
 
         # replace [] in python string conversion to {} expected by MOOS parsing code
-        laserscan = str(self.data['range_list']).replace('[', '{').replace(']', '}')
+        laserscan = str(list(map(float, self.data['range_list']))).replace('[', '{').replace(']', '}')
         # add array size to beginning of string
         #laserscan = '[1x' + '{0:.0}'.format(num_readings) + ']'+laserscan
         laserscan = '[1x' + '%.0f' % num_readings + ']'+laserscan
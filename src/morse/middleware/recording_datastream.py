@@ -0,0 +1,279 @@
+"""
+Record the data of components, and replay them.
+
+The ``record`` datastream writes the ``local_data`` of a component (after
+its modifiers) in a recording directory, see :py:mod:`pymorse.recording`
+for the format. The samples are encoded as binary frames on the
+simulation side (images and other bulk fields are stored raw), and
+written to the disk by a background thread.
+
+The ``replay`` datastream replaces the computation of a sensor by the
+data of a recording: the sensor does not compute anything anymore (a
+camera does not render anything), and its other datastreams (socket,
+ROS...) publish the recorded data. All the replayed sensors share a clock,
+which runs at the speed of the simulation, N times faster, or as fast as
+possible (each simulation step moves to the next recorded sample), and
+can be moved with the ``replay_seek``, ``replay_set_speed`` and
+``replay_status`` services of the ``simulation`` component.
+"""
+import logging; logger = logging.getLogger("morse." + __name__)
+import os
+from morse.core import blenderapi, services
+from morse.core.datastream import DatastreamManager
+from morse.core.exceptions import MorseRPCInvokationError, MorseMiddlewareError
+from morse.middleware import AbstractDatastream
+from morse.middleware.socket_datastream import encode_binary_frame
+from morse.middleware.text_datastream import FileWriter, schema
+
+from pymorse.recording import StreamWriter, Recording, CHUNK_SIZE
+
+DEFAULT_DIRECTORY = 'morse_recording'
+# Number of samples waiting to be written before the simulation waits
+QUEUE_SIZE = 100
+
+_config = {}
+_writer = None
+_clock = None
+
+def writer():
+    """ Return the thread writing the recordings """
+    global _writer
+    if _writer is None:
+        _writer = FileWriter(int(_config.get('queue_size', QUEUE_SIZE)),
+                             float(_config.get('flush_interval', 1.0)))
+        _writer.start()
+    return _writer
+
+def clock():
+    """ Return the clock shared by the replayed sensors """
+    global _clock
+    if _clock is None:
+        _clock = ReplayClock(_config.get('directory', DEFAULT_DIRECTORY),
+                             _config.get('speed', 1.0),
+                             _config.get('start'))
+    return _clock
+
+def _stream_name(datastream):
+    return datastream.kwargs.get('stream', datastream.component_name)
+
+
+class ReplayClock(object):
+    """
+    The position, in recorded time, of the replay.
+
+    :param speed: the number of recorded seconds per simulated second, or
+                  'max' to move to the next recorded sample at each
+                  simulation step
+    :param start: the recorded time to start from (by default, the start
+                  of the recording)
+    """
+    def __init__(self, directory, speed = 1.0, start = None):
+        self.recording = Recording(directory)
+        self.streams = []
+        self.position = start
+        self.speed = self._check_speed(speed)
+        self._now = None
+        self._origin = None
+
+    def _check_speed(self, speed):
+        if speed == 'max':
+            return speed
+        try:
+            speed = float(speed)
+        except (TypeError, ValueError):
+            speed = -1
+        if speed < 0:
+            raise ValueError("invalid replay speed %s, expected a positive "
+                             "number or 'max'" % speed)
+        return speed
+
+    def add(self, stream):
+        self.streams.append(stream)
+
+    def update(self, now):
+        """ Move the clock to the simulated time :param now: (once per
+        simulation step) """
+        if now == self._now:
+            return
+        self._now = now
+        if self.position is None:
+            self.position = self.recording.start_time or 0.0
+            self._origin = (now, self.position)
+        elif self.speed == 'max':
+            following = [float(stream.times[i + 1]) for stream, i in
+                         ((s, s.index_at(self.position)) for s in self.streams)
+                         if i + 1 < len(stream)]
+            if following:
+                self.position = min(following)
+        elif self._origin is None:
+            self._origin = (now, self.position)
+        else:
+            self.position = self._origin[1] + (now - self._origin[0]) * self.speed
+
+    def seek(self, position):
+        self.position = position
+        self._origin = None if self._now is None else (self._now, position)
+
+    def set_speed(self, speed):
+        self.speed = self._check_speed(speed)
+        if self._now is not None and self.position is not None:
+            self._origin = (self._now, self.position)
+
+    def close(self):
+        self.recording.close()
+
+
+class RecordingDatastreamManager(DatastreamManager):
+    """ Record and replay the data of components
+
+    Options (set with ``env.configure_stream_manager('record', ...)``):
+
+    - ``directory``: the recording directory (default 'morse_recording')
+    - ``chunk_size``: the maximal size of the recording files (default
+      256 MB)
+    - ``queue_size``: the number of samples waiting to be written before
+      the simulation waits for the disk (default 100)
+    - ``speed``: the replay speed, 1.0 by default, 'max' to replay as
+      fast as possible
+    - ``start``: the recorded time the replay starts from
+    """
+    def __init__(self, args, kwargs):
+        DatastreamManager.__init__(self, args, kwargs)
+        _config.clear()
+        _config.update(kwargs)
+
+        services.do_service_registration(self.replay_seek, 'simulation')
+        services.do_service_registration(self.replay_set_speed, 'simulation')
+        services.do_service_registration(self.replay_status, 'simulation')
+
+    def _replay_clock(self):
+        if _clock is None:
+            raise MorseRPCInvokationError("No sensor is replaying a recording")
+        return _clock
+
+    def replay_seek(self, time):
+        """ Move the replay to the recorded time :param time: """
+        self._replay_clock().seek(float(time))
+
+    def replay_set_speed(self, speed):
+        """ Set the speed of the replay: the number of recorded seconds
+        per simulated second (0 pauses the replay), or 'max' to move to the
+        next recorded sample at each simulation step """
+        try:
+            self._replay_clock().set_speed(speed)
+        except ValueError as e:
+            raise MorseRPCInvokationError(str(e))
+
+    def replay_status(self):
+        """ Return the current recorded time of the replay, its speed, and
+        the recorded time span """
+        clock = self._replay_clock()
+        return {'time': clock.position,
+                'speed': clock.speed,
+                'start': clock.recording.start_time,
+                'end': clock.recording.end_time,
+                'streams': [stream.name for stream in clock.streams]}
+
+    def finalize(self):
+        """ Write the pending samples, and close the recordings """
+        global _writer, _clock
+        DatastreamManager.finalize(self)
+        if _writer:
+            _writer.stop()
+            _writer = None
+        if _clock:
+            _clock.close()
+            _clock = None
+
+
+class Recorder(AbstractDatastream):
+    """ Record the data of the component
+
+    Optional keyword arguments: ``directory`` (by default, the one of the
+    stream manager), ``stream``, the name of the recording (by default,
+    the name of the component)
+    """
+    _type_name = "timestamped binary frames, in a recording directory"
+
+    def initialize(self):
+        directory = self.kwargs.get('directory',
+                                    _config.get('directory', DEFAULT_DIRECTORY))
+        self.output = StreamWriter(os.path.join(directory, _stream_name(self)),
+                                   schema(self.component_instance),
+                                   int(_config.get('chunk_size', CHUNK_SIZE)))
+        self.writer = writer()
+        logger.info("Recording %s in %s" % (self.component_name, self.output.path))
+
+    def default(self, ci = 'unused'):
+        data = self.data
+        timestamp = data.get('timestamp', blenderapi.persistantstorage().time.time)
+        # The buffers of the component are overwritten at the next step:
+        # they are copied, once, in the frame
+        frame = b''.join(encode_binary_frame(data))
+        self.writer.write(self.output, (timestamp, frame))
+
+    def finalize(self):
+        if getattr(self, 'output', None):
+            self.writer.close_output(self.output)
+            self.output = None
+
+
+class Replay(AbstractDatastream):
+    """ Replace the data computed by the sensor by the data of a recording
+
+    The recorded samples are played according to the replay clock (see
+    :py:class:`RecordingDatastreamManager`). The sensor action and its
+    modifiers are disabled (the recorded data were already modified).
+
+    Optional keyword arguments: ``stream``, the name of the recording
+    to replay (by default, the name of the component).
+    """
+    _type_name = "replay of recorded data"
+
+    def initialize(self):
+        component = self.component_instance
+        if not hasattr(component, 'output_modifiers'):
+            raise MorseMiddlewareError("%s: only sensors can be replayed" %
+                                       self.component_name)
+
+        self.clock = clock()
+        name = _stream_name(self)
+        if name not in self.clock.recording:
+            raise MorseMiddlewareError("%s: no recording '%s' in %s" %
+                                       (self.component_name, name,
+                                        self.clock.recording.path))
+        self.stream = self.clock.recording[name]
+        self.clock.add(self.stream)
+        self._index = -1
+        self._sample = None
+
+        self._sensor_action = component.action
+        component.action = self.action
+        component.default_action = self.replay
+        if component.output_modifiers:
+            logger.info("%s: modifiers disabled, the recorded data are "
+                        "already modified" % self.component_name)
+            del component.output_modifiers[:]
+        logger.info("%s replays %d samples from %s" %
+                    (self.component_name, len(self.stream), self.stream.path))
+
+    def action(self):
+        """ Replaces the action of the sensor: before the first recorded
+        sample, nothing is computed nor published """
+        self.clock.update(blenderapi.persistantstorage().time.time)
+        index = self.stream.index_at(self.clock.position)
+        if index < 0:
+            return
+        if index != self._index:
+            self._index = index
+            self._sample = self.stream[index]
+        self._sensor_action()
+
+    def replay(self):
+        """ Replaces the default action of the sensor: the last recorded
+        sample is published, with its recorded timestamp (the sensor
+        action has just set the timestamp to the current time) """
+        self.data.update(self._sample)
+
+    def default(self, ci = 'unused'):
+        pass
@@ -59,5 +59,7 @@ class PointCloud2Publisher(ROSPublisherTF):
         self.send_transform_robot()
 
 def pack_xyz_float32(points):
+    if hasattr(points, 'astype'): # numpy array, as produced by LaserScanner
+        return points.astype('<f4').tobytes()
     flatten = itertools.chain.from_iterable(points)
     return struct.pack('%if'%len(points)*3, *flatten)
@@ -81,6 +81,8 @@ class ArmatureController(MorseOverlay):
             points.append(point)
 
         traj["points"] = points
+        # the joints the values refer to, in the local_data order
+        traj["joints"] = [j for j in target_joints if j in joint_names]
         logger.info(traj)
         
         self.overlaid_object.trajectory(
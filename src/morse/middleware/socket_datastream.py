@@ -4,9 +4,13 @@ import select
 import json
 import errno
 import time
+import struct
+import numpy
+from collections import deque
 from morse.core.datastream import DatastreamManager
 from morse.helpers.transformation import Transformation3d
 from morse.middleware import AbstractDatastream
+from morse.middleware.socket_reactor import get_reactor
 from morse.core import services
 from morse.core.exceptions import MorseRPCInvokationError, MorseMiddlewareError
 
@@ -18,6 +22,8 @@ except ImportError:
 
 class MorseEncoder(json.JSONEncoder):
     def default(self, obj):
+        if isinstance(obj, numpy.ndarray):
+            return obj.tolist()
         if isinstance(obj, mathutils.Vector):
             return obj[:]
         if isinstance(obj, mathutils.Matrix):
@@ -32,6 +38,61 @@ class MorseEncoder(json.JSONEncoder):
                     'yaw': obj.yaw, 'pitch': obj.pitch, 'roll': obj.roll }
         return json.JSONEncoder.default(self, obj)
 
+# Binary framing: each message starts with a fixed-size prefix giving the
+# size of the JSON header and of the raw payload which follow it.
+#
+#   magic (4 bytes) | header size (uint32) | payload size (uint32)
+#   header (JSON): {"fields": {...}, "buffers": [{"name", "format",
+#                                                 "shape", "size"}, ...]}
+#   payload: raw content of each buffer, in the order of "buffers"
+#
+# Must be kept in sync with pymorse.stream.StreamBinary
+BINARY_MAGIC = b'MRSB'
+BINARY_PREFIX = struct.Struct('<4sII')
+
+def _as_buffer(value):
+    """ Return a memoryview on :param value: if it holds bulk data
+    (memoryview, bytes, numpy arrays, Blender buffers...), None otherwise.
+    """
+    if value is None or isinstance(value, (str, int, float, list, tuple, dict)):
+        return None
+    if mathutils and isinstance(value, (mathutils.Vector, mathutils.Matrix,
+                                        mathutils.Quaternion, mathutils.Euler)):
+        return None
+    try:
+        return memoryview(value)
+    except TypeError:
+        return None
+
+def encode_binary_frame(data):
+    """ Encode the dictionary :param data: as a binary frame.
+
+    Bulk fields are not copied: the returned list holds the prefix, the
+    header, then a memoryview on each bulk field, ready for a
+    scatter-gather send.
+    """
+    fields = {}
+    layout = []
+    buffers = []
+    for name, value in data.items():
+        mv = _as_buffer(value)
+        if mv is None:
+            fields[name] = value
+            continue
+        layout.append({'name': name, 'format': mv.format,
+                       'shape': list(mv.shape), 'size': mv.nbytes})
+        try:
+            buffers.append(mv.cast('B'))
+        except TypeError:
+            # non contiguous buffer, we need a copy
+            buffers.append(mv.tobytes())
+
+    header = json.dumps({'fields': fields, 'buffers': layout},
+                        cls=MorseEncoder).encode()
+    payload_size = sum(entry['size'] for entry in layout)
+    prefix = BINARY_PREFIX.pack(BINARY_MAGIC, len(header), payload_size)
+    return [prefix, header] + buffers
+
 class SocketServ(AbstractDatastream):
 
     def initialize(self):
@@ -44,11 +105,20 @@ class SocketServ(AbstractDatastream):
         self._server.bind(('', self.kwargs['port']))
         self._server.listen(1)
 
+        # If the I/O thread is enabled, it owns the server socket
+        self._endpoint = None
+        self._reactor = get_reactor()
+
         logger.info("Socket Mw Server now listening on port " + str(self.kwargs['port']) + \
                     " for component " + str(self.component_name) + ".")
 
     def finalize(self):
         """ Terminate the ports used to accept requests """
+        if self._endpoint:
+            self._endpoint.close()
+            self._endpoint = None
+            self._server = None
+
         if self._client_sockets:
             logger.info("Closing client sockets...")
             for s in self._client_sockets:
@@ -75,41 +145,272 @@ class SocketServ(AbstractDatastream):
         except:
             pass
 
+def _send_from(sock, message, offset):
+    """ Send, without blocking, :param message: (bytes or list of buffers)
+    starting at byte :param offset:. Return the number of bytes sent.
+    """
+    if not isinstance(message, list):
+        return sock.send(memoryview(message)[offset:])
+
+    buffers = []
+    for buf in message:
+        size = len(buf) if not isinstance(buf, memoryview) else buf.nbytes
+        if offset >= size:
+            offset -= size
+            continue
+        buffers.append(memoryview(buf)[offset:] if offset else buf)
+        offset = 0
+
+    if hasattr(sock, 'sendmsg'):
+        return sock.sendmsg(buffers)
+    return sock.send(b''.join(buffers))
+
+def _message_size(message):
+    if not isinstance(message, list):
+        return len(message)
+    return sum(len(buf) if not isinstance(buf, memoryview) else buf.nbytes
+               for buf in message)
+
+class ClientQueue(object):
+    """ Bounded, non-blocking, outbound queue of a socket client.
+
+    When the queue is full, the oldest pending message is dropped. With
+    the 'latest' policy, the queue holds a single message, i.e. the
+    client always gets the most recent data. A message is never dropped
+    once its first byte has been sent, so the framing is never broken.
+    """
+    def __init__(self, sock, size, policy):
+        self.sock = sock
+        self.sock.setblocking(False)
+        try:
+            peer = sock.getpeername()
+            self.peer = ':'.join(str(p) for p in peer[:2]) \
+                        if isinstance(peer, tuple) else str(peer)
+        except socket.error:
+            self.peer = 'unknown'
+
+        if policy == 'latest':
+            size = 1
+        self._queue = deque([], size)
+
+        # message being sent: (enqueue time, message, bytes already sent)
+        self._current = None
+        self._offset = 0
+        self._current_since = 0.0
+
+        self.sent = 0
+        self.dropped = 0
+
+    def push(self, message, now):
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1
+        self._queue.append((now, message))
+
+    def flush(self):
+        """ Send as much as possible without blocking.
+
+        Raise socket.error if the connection is broken.
+        """
+        while True:
+            if self._current is None:
+                if not self._queue:
+                    return
+                self._current_since, self._current = self._queue.popleft()
+                self._offset = 0
+                self._current_size = _message_size(self._current)
+
+            try:
+                self._offset += _send_from(self.sock, self._current, self._offset)
+            except (BlockingIOError, InterruptedError):
+                return
+
+            if self._offset < self._current_size:
+                return # socket buffer is full
+
+            self._current = None
+            self.sent += 1
+
+    def holds(self, message):
+        return self._current is message or \
+               any(m is message for _, m in self._queue)
+
+    def replace(self, message, frozen):
+        """ Replace any pending reference to :param message: by :param frozen:
+        """
+        if self._current is message:
+            self._current = frozen
+        for i, (since, m) in enumerate(self._queue):
+            if m is message:
+                self._queue[i] = (since, frozen)
+
+    def pending(self):
+        return len(self._queue) + (self._current is not None)
+
+    def lag(self, now):
+        """ Age, in seconds, of the oldest message still to be sent """
+        if self._current is not None:
+            return now - self._current_since
+        if self._queue:
+            return now - self._queue[0][0]
+        return 0.0
+
+    def status(self, now):
+        return {'peer': self.peer,
+                'pending': self.pending(),
+                'sent': self.sent,
+                'dropped': self.dropped,
+                'lag': self.lag(now)}
+
 class SocketPublisher(SocketServ):
+    """ Publish the component data to all connected clients.
+
+    Each message is encoded once, then pushed in the outbound queue of
+    each client. Queues are flushed without ever blocking, so a slow
+    client can not slow down the simulation: it just misses messages.
+
+    Optional keyword arguments:
+
+    - ``queue_policy``: 'latest' (default) to only keep the latest
+      pending message per client, or 'drop_oldest' to keep up to
+      ``queue_size`` messages.
+    - ``queue_size``: maximal number of pending messages per client, for
+      the 'drop_oldest' policy (default: 10)
+    """
 
-    _type_name = "straight JSON serialization"
+    _type_name = "straight JSON serialization, or binary frames if " \
+                 "format='binary'"
+
+    def initialize(self):
+        SocketServ.initialize(self)
+        self.binary = (self.kwargs.get('format', 'json') == 'binary')
+        self._queue_policy = self.kwargs.get('queue_policy', 'latest')
+        self._queue_size = self.kwargs.get('queue_size', 10)
+        if self._queue_policy not in ['latest', 'drop_oldest']:
+            raise MorseMiddlewareError("Unknown queue policy '%s' for %s" %
+                                       (self._queue_policy, self))
+        # socket -> ClientQueue
+        self._clients = {}
+
+        if self._reactor:
+            self._endpoint = self._reactor.listen(self._server, self._new_queue)
+
+    def _new_queue(self, sock):
+        return ClientQueue(sock, self._queue_size, self._queue_policy)
 
     def default(self, ci='unused'):
-        sockets = self._client_sockets + [self._server]
+        if self._endpoint:
+            return self._default_io_thread()
 
         try:
-            inputready, outputready, _ = select.select(sockets, sockets, [], 0)
-        except select.error:
-            pass
-        except socket.error:
-            pass
+            inputready, _, _ = select.select([self._server], [], [], 0)
+        except (select.error, socket.error):
+            inputready = []
 
         if self._server in inputready:
             sock, _ = self._server.accept()
             self._client_sockets.append(sock)
+            self._clients[sock] = self._new_queue(sock)
 
-        if outputready:
-            message = self.encode()
-            for o in outputready:
-                try:
-                    o.send(message)
-                except socket.error:
-                    self.close_socket(o)
+        if not self._clients:
+            return
+
+        message = self.encode()
+        if message:
+            now = time.time()
+            for client in self._clients.values():
+                client.push(message, now)
+
+        for sock, client in list(self._clients.items()):
+            try:
+                client.flush()
+            except socket.error:
+                self.close_socket(sock)
+
+        # Binary messages reference live buffers (images, scans...), which
+        # will be overwritten. Copy them, once, if they are still pending.
+        if isinstance(message, list):
+            frozen = None
+            for client in self._clients.values():
+                if client.holds(message):
+                    if frozen is None:
+                        frozen = b''.join(message)
+                    client.replace(message, frozen)
+
+    def _default_io_thread(self):
+        """ Hand the message over to the I/O thread, which sends it """
+        connections = self._endpoint.connections
+        if not connections:
+            return
+
+        message = self.encode()
+        if not message:
+            return
+        if isinstance(message, list):
+            # The buffers will be overwritten while the I/O thread is
+            # sending them: take a snapshot.
+            message = b''.join(message)
+
+        now = time.time()
+        for conn in connections:
+            conn.send(message, now)
+
+    def close_socket(self, sock):
+        self._clients.pop(sock, None)
+        SocketServ.close_socket(self, sock)
+
+    def clients_status(self):
+        """ Return, for each connected client, the number of pending,
+        sent and dropped messages, and its lag (in seconds).
+        """
+        now = time.time()
+        if self._endpoint:
+            queues = [conn.outbox for conn in self._endpoint.connections]
+        else:
+            queues = self._clients.values()
+        return [queue.status(now) for queue in queues]
 
     def encode(self):
+        if self.binary:
+            return self.encode_binary(self.component_instance.local_data)
         js = json.dumps(self.component_instance.local_data, cls=MorseEncoder)
         return (js + '\n').encode()
 
+    def encode_binary(self, data):
+        return encode_binary_frame(data)
+
 class SocketReader(SocketServ):
 
     _type_name = "straight JSON deserialization"
 
+    def initialize(self):
+        SocketServ.initialize(self)
+        if self._reactor:
+            self._endpoint = self._reactor.listen(self._server,
+                                                  self._new_queue,
+                                                  read_lines=True)
+
+    def _new_queue(self, sock):
+        # Readers never write back to their clients
+        return ClientQueue(sock, 1, 'latest')
+
+    def _default_io_thread(self):
+        """ Read the lines received by the I/O thread """
+        msg = []
+        for conn in self._endpoint.connections:
+            msg.extend(conn.receive())
+        if not msg:
+            return False
+
+        if len(msg) > 1:
+            logger.warning("Messages missed on socket datastream! <%s>" % msg[:-1])
+        # keep only the last msg if we got several in row
+        self.component_instance.local_data = self.decode(msg[-1].decode())
+        return True
+
     def default(self, ci='unused'):
+        if self._endpoint:
+            return self._default_io_thread()
+
         sockets = self._client_sockets + [self._server]
         try:
             inputready, outputready, exceptready = select.select(sockets, [], [], 0)
@@ -190,6 +491,7 @@ class SocketDatastreamManager(DatastreamManager):
         services.do_service_registration(self.list_streams, 'simulation')
         services.do_service_registration(self.get_stream_port, 'simulation')
         services.do_service_registration(self.get_all_stream_ports, 'simulation')
+        services.do_service_registration(self.get_stream_clients, 'simulation')
 
     def __del__(self):
         if self.time_sync:
@@ -257,6 +559,15 @@ class SocketDatastreamManager(DatastreamManager):
         """
         return self._component_nameservice
 
+    def get_stream_clients(self, name):
+        """ Get the status (pending, sent and dropped messages, lag in
+        seconds) of each client of the stream of component name.
+        """
+        serv = self._server_dict[self.get_stream_port(name)]
+        if not hasattr(serv, 'clients_status'):
+            raise MorseRPCInvokationError("Stream %s is not a publisher" % name)
+        return serv.clients_status()
+
     def register_component(self, component_name, component_instance, mw_data):
         """ Open the port used to communicate by the specified component.
         """
@@ -0,0 +1,302 @@
+"""
+Optional I/O thread for the socket datastreams and the socket request
+manager.
+
+By default, each socket datastream and the socket request manager poll
+their own sockets from the Blender logic loop, i.e. one ``select`` per
+stream and per tick. When the simulation is configured with
+``env.use_io_thread()``, a single :py:class:`SocketReactor` thread owns
+all these sockets instead: it accepts connections, reads incoming data
+and flushes outgoing messages.
+
+The logic loop only exchanges messages with the reactor through
+``collections.deque`` objects, whose ``append`` and ``popleft`` are
+atomic: no lock is taken on the logic side.
+"""
+
+import logging; logger = logging.getLogger("morse." + __name__)
+import socket
+import selectors
+import threading
+from collections import deque
+
+from morse.core import blenderapi
+
+
+class ReactorConnection(object):
+    """ A client connection owned by the reactor.
+
+    From the logic thread, use :py:meth:`send` to queue an outgoing
+    message, and :py:meth:`receive` to get the complete lines received
+    since the last call (if the server has been created with
+    ``read_lines``). Blank lines are skipped, as when the sockets are
+    polled from the logic loop. If the server has a ``parse`` function,
+    the lines are parsed by the reactor thread, and :py:meth:`receive`
+    returns the results.
+    """
+    def __init__(self, reactor, sock, outbox, read_lines, parse=None):
+        self._reactor = reactor
+        self.sock = sock
+        self.sock.setblocking(False)
+        # outbox is expected to provide push/flush/pending, like
+        # morse.middleware.socket_datastream.ClientQueue
+        self.outbox = outbox
+        self._read_lines = read_lines
+        self._parse = parse
+        self._in_buffer = bytearray()
+        self._inbox = deque()
+        self._writing = False
+        self.closed = False
+
+    #### logic thread ####
+    def send(self, message, now=0.0):
+        if self.closed:
+            return
+        self.outbox.push(message, now)
+        self._reactor.request_flush(self)
+
+    def receive(self):
+        """ Return the list of the lines received since the last call """
+        lines = []
+        inbox = self._inbox
+        while inbox:
+            lines.append(inbox.popleft())
+        return lines
+
+    #### reactor thread ####
+    def handle(self, events):
+        if events & selectors.EVENT_READ:
+            self._handle_read()
+        if not self.closed and events & selectors.EVENT_WRITE:
+            self.flush()
+
+    def _handle_read(self):
+        try:
+            data = self.sock.recv(65536)
+        except (BlockingIOError, InterruptedError):
+            return
+        except socket.error:
+            data = None
+
+        if not data:
+            # an empty read means that the remote host has disconnected
+            self.close()
+            return
+
+        if not self._read_lines:
+            return
+
+        self._in_buffer += data
+        if b'\n' not in data:
+            return
+        lines = self._in_buffer.split(b'\n')
+        self._in_buffer = bytearray(lines.pop())
+        lines = [line for line in lines if line.strip()]
+        if self._parse:
+            self._inbox.extend(self._parse(bytes(line)) for line in lines)
+        else:
+            self._inbox.extend(bytes(line) for line in lines)
+
+    def flush(self):
+        try:
+            self.outbox.flush()
+        except socket.error:
+            self.close()
+            return
+
+        writing = bool(self.outbox.pending())
+        if writing != self._writing:
+            self._writing = writing
+            events = selectors.EVENT_READ
+            if writing:
+                events |= selectors.EVENT_WRITE
+            self._reactor.selector.modify(self.sock, events, self)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._reactor.unregister(self.sock)
+        self.sock.close()
+
+
+class ReactorServer(object):
+    """ A listening socket owned by the reactor.
+
+    ``connections`` is the list of the currently connected clients. It is
+    only modified by the reactor thread: iterate over a copy of it.
+    """
+    def __init__(self, reactor, sock, outbox_factory, read_lines, parse=None):
+        self._reactor = reactor
+        self.sock = sock
+        self.sock.setblocking(False)
+        self._outbox_factory = outbox_factory
+        self._read_lines = read_lines
+        self._parse = parse
+        self.connections = []
+
+    def handle(self, events):
+        try:
+            sock, addr = self.sock.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+        except socket.error as e:
+            logger.warning("Error while accepting a connection: %s" % e)
+            return
+
+        logger.debug("Accepted new connection from %s" % str(addr))
+        conn = ReactorConnection(self._reactor, sock,
+                                 self._outbox_factory(sock), self._read_lines,
+                                 self._parse)
+        self._reactor.selector.register(sock, selectors.EVENT_READ, conn)
+        self.connections = self.connections + [conn]
+
+    def _forget(self, conn):
+        self.connections = [c for c in self.connections if c is not conn]
+
+    def close(self):
+        """ Close the server and all its connections (from any thread) """
+        self._reactor.call(self._close)
+
+    def _close(self):
+        for conn in self.connections:
+            conn.close()
+        self.connections = []
+        self._reactor.unregister(self.sock)
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+        self.sock.close()
+
+
+class SocketReactor(threading.Thread):
+    """ Single I/O thread, owning all the MORSE sockets it is given """
+
+    def __init__(self):
+        threading.Thread.__init__(self, name="MORSE socket I/O")
+        self.daemon = True
+        self.selector = selectors.DefaultSelector()
+
+        # socketpair used to wake up the reactor from the logic thread
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._wake_pending = False
+        self.selector.register(self._wake_r, selectors.EVENT_READ, None)
+
+        # handoff queues, filled by the logic thread
+        self._calls = deque()
+        self._flush_requests = deque()
+
+        self._servers = []
+        self._running = True
+
+    def listen(self, sock, outbox_factory, read_lines=False, parse=None):
+        """ Let the reactor handle the listening socket :param sock:.
+
+        :param outbox_factory: callable returning the outbound queue for
+        a new client socket
+        :param read_lines: if True, incoming data are split in lines,
+        available through :py:meth:`ReactorConnection.receive`.
+        Otherwise, they are discarded.
+        :param parse: if set, function called (in the reactor thread) on
+        each received line, :py:meth:`ReactorConnection.receive` then
+        returns its results. It must not raise.
+        """
+        server = ReactorServer(self, sock, outbox_factory, read_lines, parse)
+        self._servers.append(server)
+        self.call(self.selector.register, sock, selectors.EVENT_READ, server)
+        return server
+
+    def call(self, fn, *args):
+        """ Run fn(*args) in the reactor thread """
+        self._calls.append((fn, args))
+        self.wakeup()
+
+    def request_flush(self, conn):
+        self._flush_requests.append(conn)
+        self.wakeup()
+
+    def wakeup(self):
+        if self._wake_pending:
+            return
+        self._wake_pending = True
+        try:
+            self._wake_w.send(b'\0')
+        except (BlockingIOError, InterruptedError):
+            pass # the reactor has already a lot of wake-up calls pending
+
+    def unregister(self, sock):
+        try:
+            self.selector.unregister(sock)
+        except (KeyError, ValueError):
+            pass
+        for server in self._servers:
+            for conn in server.connections:
+                if conn.sock is sock:
+                    server._forget(conn)
+
+    def stop(self):
+        self._running = False
+        self.wakeup()
+        self.join(1.0)
+
+    def _handle_wakeup(self):
+        try:
+            while self._wake_r.recv(4096):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+        # reset the flag *before* consuming the handoff queues, so that
+        # any later request wakes us up again
+        self._wake_pending = False
+
+        calls = self._calls
+        while calls:
+            fn, args = calls.popleft()
+            fn(*args)
+
+        requests = self._flush_requests
+        flushed = set()
+        while requests:
+            conn = requests.popleft()
+            if conn not in flushed and not conn.closed:
+                flushed.add(conn)
+                conn.flush()
+
+    def run(self):
+        logger.info("Socket I/O thread started")
+        while self._running:
+            for key, events in self.selector.select():
+                handler = key.data
+                try:
+                    if handler is None:
+                        self._handle_wakeup()
+                    else:
+                        handler.handle(events)
+                except Exception as e:
+                    logger.error("Unexpected error in the socket I/O thread: "
+                                 "%s" % e, exc_info = True)
+
+        for server in self._servers:
+            server._close()
+        self.selector.close()
+        self._wake_r.close()
+        self._wake_w.close()
+        logger.info("Socket I/O thread stopped")
+
+
+def get_reactor():
+    """ Return the socket I/O thread, started on first call, or None if
+    the simulation does not use it (see ``env.use_io_thread()``)
+    """
+    simu = blenderapi.persistantstorage()
+    if 'socket_reactor' not in simu:
+        reactor = None
+        ssr = blenderapi.getssr()
+        if ssr and ssr.get('use_io_thread', False):
+            reactor = SocketReactor()
+            reactor.start()
+        simu.socket_reactor = reactor
+    return simu.socket_reactor
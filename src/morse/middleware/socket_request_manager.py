@@ -2,14 +2,98 @@ import logging; logger = logging.getLogger("morse." + __name__)
 import socket
 import select
 import json
+from collections import namedtuple
 
-from morse.middleware.socket_datastream import MorseEncoder
+from morse.middleware.socket_datastream import MorseEncoder, ClientQueue
+from morse.middleware.socket_reactor import get_reactor
 from morse.core.request_manager import RequestManager, MorseRPCInvokationError
 from morse.core import status
 
 SERVER_HOST = '' #all available interfaces
 SERVER_PORT = 4000
 MAX_TRIES = 10 # Number of alternative ports to try if the default is already busy
+RECV_SIZE = 65536
+
+CANCEL = 'cancel'
+BATCH = 'batch'
+
+# A parsed request. For a batch, params is the list of the
+# (component, service, params) calls. If the request is malformed, error
+# holds the error message.
+Request = namedtuple('Request', 'id component service params error')
+
+def _parse_params(params):
+    params = params.strip()
+    if not params:
+        return None
+    try:
+        return json.loads(params)
+    except ValueError as e:
+        raise MorseRPCInvokationError("Invalid request syntax: error while parsing the parameters: <%s>. %s" % (params, str(e)))
+
+def _parse_batch(params):
+    calls = _parse_params(params)
+    if not isinstance(calls, list):
+        raise MorseRPCInvokationError("Malformed batch: a list of [component, service, [params]] is expected")
+    res = []
+    for call in calls:
+        if not isinstance(call, list) or not 2 <= len(call) <= 3 or \
+           not all(isinstance(name, str) for name in call[:2]) or \
+           (len(call) == 3 and not isinstance(call[2], (list, type(None)))):
+            raise MorseRPCInvokationError("Malformed batch call <%s>: [component, service, [params]] is expected" % str(call))
+        res.append((call[0], call[1], call[2] if len(call) == 3 else None))
+    return res
+
+def parse_request(line):
+    """ Parse a request line (bytes) to a :py:data:`Request`.
+
+    It does not depend on the simulation state, and never raises: it runs
+    in the socket I/O thread, if it is enabled.
+    """
+    try:
+        line = line.decode().strip()
+    except UnicodeDecodeError:
+        return Request('', None, None, None, "Malformed request: not UTF-8 ")
+
+    try:
+        id, req = line.split(None, 1)
+    except ValueError: # Request contains < 2 tokens.
+        return Request(line, None, None, None, "Malformed request! ")
+
+    try:
+        if req == CANCEL:
+            # Aborting a running request!
+            return Request(id, None, CANCEL, None, None)
+
+        tokens = req.split(None, 2)
+        if tokens[0] == BATCH and len(tokens) > 1 and tokens[1].startswith('['):
+            return Request(id, None, BATCH, _parse_batch(req[len(BATCH):]), None)
+
+        if len(tokens) < 2:
+            raise MorseRPCInvokationError("Malformed request: at least 3 values and at most 4 are expected (id, component, service, [params])")
+        component, service = tokens[:2]
+        params = _parse_params(tokens[2]) if len(tokens) == 3 else None
+        return Request(id, component, service, params, None)
+    except MorseRPCInvokationError as e:
+        return Request(id, None, None, None, e.value)
+
+
+class _Batch(object):
+    """ The results of the calls of a batch, replied at once when the
+    last (possibly asynchronous) call completes """
+    def __init__(self, client, id, size):
+        self.client = client
+        self.id = id
+        self.results = [None] * size
+        self.missing = size
+
+    def set(self, index, result):
+        self.results[index] = result
+        self.missing -= 1
+
+    def response(self):
+        return (status.SUCCESS, self.results)
+
 
 class SocketRequestManager(RequestManager):
     """Implements services to control the MORSE simulator over
@@ -28,6 +112,18 @@ class SocketRequestManager(RequestManager):
 
     ``status`` is one of the constants defined in :py:mod:`morse.core.status`.
 
+    Several calls can be sent in one request, and are then invoked during
+    the same simulation step:
+
+    >>> id batch [[component_name, service, [params]], ...]
+
+    The server answers once all the calls are completed, with the list of
+    the ``[status, result]`` of each call:
+
+    >>> id SUCCESS [[status, result], ...]
+
+    The replies to the requests of a client are sent in a single write per
+    simulation step.
     """
 
     def __str__(self):
@@ -45,6 +141,9 @@ class SocketRequestManager(RequestManager):
         # back.
         self._results_to_output = {}
 
+        # Incomplete requests received from each socket client
+        self._in_buffers = {}
+
         self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
 
@@ -66,10 +165,24 @@ class SocketRequestManager(RequestManager):
 
         logger.info("Socket service manager now listening on port " + str(SERVER_PORT) + ".")
 
+        # If the I/O thread is enabled, it owns the server socket
+        self._endpoint = None
+        reactor = get_reactor()
+        if reactor:
+            self._endpoint = reactor.listen(self._server,
+                                            lambda sock: ClientQueue(sock, None, 'drop_oldest'),
+                                            read_lines=True,
+                                            parse=parse_request)
+
         return True
 
     def finalization(self):
         """ Terminate the ports used to accept requests """
+        if self._endpoint:
+            self._endpoint.close()
+            self._endpoint = None
+            self._server = None
+
         if self._client_sockets:
             logger.info("Closing client sockets...")
             for s in self._client_sockets:
@@ -87,25 +200,26 @@ class SocketRequestManager(RequestManager):
 
     def on_service_completion(self, request_id, results):
 
-        s = None
-
         try:
-            s, id = self._pending_sockets[request_id]
-            del self._pending_sockets[request_id]
+            owner, id = self._pending_sockets.pop(request_id)
         except KeyError:
             logger.info(str(self) + ": ERROR: I can not find the socket which requested " + str(request_id))
             return
 
-        if s in self._results_to_output:
-            self._results_to_output[s].append((id, results))
+        if isinstance(owner, _Batch):
+            owner.set(id, results)
+            if not owner.missing:
+                self._reply(owner.client, owner.id, owner.response())
         else:
-            self._results_to_output[s] = [(id, results)]
+            self._reply(owner, id, results)
 
     def post_registration(self, component, service, is_async):
         return True
 
     def main(self):
-        
+        if self._endpoint:
+            return self._main_io_thread()
+
         sockets = self._client_sockets + [self._server]
 
         try:
@@ -121,10 +235,11 @@ class SocketRequestManager(RequestManager):
 
                 logger.info("Accepted new service connection from " + str(addr))
                 self._client_sockets.append(sock)
+                self._in_buffers[sock] = bytearray()
 
             else:
                 try:
-                    raw = i.recv(4096)
+                    raw = i.recv(RECV_SIZE)
                 except ConnectionResetError as e:
                     import os
                     if os.name == 'nt' and e.errno == 10054:
@@ -136,111 +251,124 @@ class SocketRequestManager(RequestManager):
                     # an empty read means that the remote host has
                     # disconnected itself
                     logger.info("Socket closed by client! Closing it on my side.")
-                    i.close()
-                    self._client_sockets.remove(i)
+                    self._close_client(i)
+                    continue
+
+                # Requests may be split over several reads, or several
+                # requests may come in one read: only complete lines are
+                # handled, the rest waits for the next reads.
+                buf = self._in_buffers[i]
+                buf += raw
+                if b'\n' not in raw:
                     continue
-                raw = raw.decode()
-                assert(raw[-1] == '\n')
-                for req in raw[:-1].split('\n'):
-                    req = req.strip()
-
-                    component = service = "undefined"
-
-                    try:
-                        try:
-                            id, req = req.split(None, 1)
-                        except ValueError: # Request contains < 2 tokens.
-                            id = req
-                            raise MorseRPCInvokationError("Malformed request! ")
-
-                        id = id.strip()
-
-                        logger.info("Got '" + req + "' (id = " + id + ") from " + str(i))
-
-                        if len(req.split()) == 1 and req in ["cancel"]:
-                            # Aborting a running request!
-                            for internal_id, user_id in self._pending_sockets.items():
-                                if user_id[1] == id:
-                                    self.abort_request(internal_id)
-
-                        else:
-                            component, service, params = self._parse_request(req)
-
-                            # on_incoming_request returns either
-                            #(True, result) if it's a synchronous
-                            # request that has been immediately executed, or
-                            # (False, request_id) if it's an asynchronous request whose
-                            # termination will be notified via
-                            # on_service_completion.
-                            is_sync, value = self.on_incoming_request(component, service, params)
-
-                            if is_sync:
-                                if i in self._results_to_output:
-                                    self._results_to_output[i].append((id, value))
-                                else:
-                                    self._results_to_output[i] = [(id, value)]
-                            else:
-                                # Stores the mapping request/socket to notify
-                                # the right socket when the service completes.
-                                # (cf :py:meth:on_service_completion)
-                                # Here, 'value' is the internal request id while
-                                # 'id' is the id used by the socket client.
-                                self._pending_sockets[value] = (i, id)
-
-
-                    except MorseRPCInvokationError as e:
-                        if i in self._results_to_output:
-                            self._results_to_output[i].append((id, (status.FAILED, e.value)))
-                        else:
-                            self._results_to_output[i] = [(id, (status.FAILED, e.value))]
+                lines = buf.split(b'\n')
+                self._in_buffers[i] = bytearray(lines.pop())
+                for line in lines:
+                    if line.strip():
+                        self._handle_request(i, parse_request(line))
 
         if self._results_to_output:
             for o in outputready:
-                if o in self._results_to_output:
-                    for r in self._results_to_output[o]:
-                        return_value = None
-                        try:
-                            if r[1][1]:
-                                return_value = json.dumps(r[1][1], cls=MorseEncoder)
-                        except TypeError as te:
-                            logger.error("Error while serializing a service return value to JSON!\n" +\
-                                    "Details:" + str(te))
-                        response = "%s %s%s" % (r[0], r[1][0], (" " + return_value) if return_value else "")
-                        try:
-                            o.send((response + "\n").encode())
-                            logger.info("Sent back " + response + " to " + str(o))
-                        except socket.error:
-                            logger.warning("It seems that a socket client left while I was sending stuff to it. Closing the socket.")
-                            o.close()
-                            if o in self._client_sockets:
-                                self._client_sockets.remove(o)
-
-                    del self._results_to_output[o]
-
-
-    def _parse_request(self, req):
+                results = self._results_to_output.pop(o, None)
+                if not results:
+                    continue
+                # one write per client and per tick
+                try:
+                    o.sendall(self._format_responses(results))
+                except socket.error:
+                    logger.warning("It seems that a socket client left while I was sending stuff to it. Closing the socket.")
+                    self._close_client(o)
+
+    def _close_client(self, sock):
+        sock.close()
+        if sock in self._client_sockets:
+            self._client_sockets.remove(sock)
+        self._in_buffers.pop(sock, None)
+        self._results_to_output.pop(sock, None)
+
+    def _main_io_thread(self):
+        """ Process the requests received (and parsed) by the I/O thread,
+        and hand the results over to it.
         """
-        Parse the incoming request.
+        for conn in self._endpoint.connections:
+            for req in conn.receive():
+                self._handle_request(conn, req)
+
+        for conn, results in self._results_to_output.items():
+            if conn.closed:
+                continue
+            conn.send(self._format_responses(results))
+        self._results_to_output.clear()
+
+    def _reply(self, client, id, result):
+        self._results_to_output.setdefault(client, []).append((id, result))
+
+    def _handle_request(self, client, request):
+        """ Handle a :py:data:`Request` received from :param client: (a
+        socket, or a connection of the I/O thread)
         """
+        if request.error:
+            self._reply(client, request.id, (status.FAILED, request.error))
+            return
 
-        tokens = req.split(None, 2)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Got %s %s (id = %s) from %s" %
+                         (request.component, request.service, request.id, client))
 
-        if len(tokens) < 1 or len(tokens) > 3:
-            raise MorseRPCInvokationError("Malformed request: at least 3 values and at most 4 are expected (id, component, service, [params])")
+        if request.service == CANCEL:
+            for internal_id, (owner, user_id) in list(self._pending_sockets.items()):
+                if isinstance(owner, _Batch):
+                    user_id = owner.id
+                if user_id == request.id:
+                    self.abort_request(internal_id)
+
+        elif request.service == BATCH:
+            batch = _Batch(client, request.id, len(request.params))
+            for index, call in enumerate(request.params):
+                self._call(batch, index, *call)
+            if not batch.missing:
+                self._reply(client, batch.id, batch.response())
 
-        if len(tokens) == 2:
-            component, service = tokens
-            p = None
         else:
-            component, service, params = tokens
-            
-            params = params.strip()
+            self._call(client, request.id, request.component,
+                       request.service, request.params)
 
-            if params:
-                try:
-                    p =  json.loads(params)
-                except (NameError, SyntaxError, ValueError) as e:
-                    raise MorseRPCInvokationError("Invalid request syntax: error while parsing the parameters: <%s>. %s" % (params, str(e)))
-            else:
-                p = None
-        return component, service, p
+    def _call(self, owner, id, component, service, params):
+        """ Invoke a service. The result is given to :param owner: (a
+        client, or a :py:class:`_Batch`) under :param id: (the request id,
+        or the index of the call in the batch) """
+        try:
+            # on_incoming_request returns either
+            #(True, result) if it's a synchronous
+            # request that has been immediately executed, or
+            # (False, request_id) if it's an asynchronous request whose
+            # termination will be notified via
+            # on_service_completion.
+            is_sync, value = self.on_incoming_request(component, service, params)
+        except MorseRPCInvokationError as e:
+            is_sync, value = True, (status.FAILED, e.value)
+
+        if not is_sync:
+            # Stores the mapping request/socket to notify
+            # the right socket when the service completes.
+            # (cf :py:meth:on_service_completion)
+            # Here, 'value' is the internal request id while
+            # 'id' is the id used by the socket client.
+            self._pending_sockets[value] = (owner, id)
+        elif isinstance(owner, _Batch):
+            owner.set(id, value)
+        else:
+            self._reply(owner, id, value)
+
+    def _format_responses(self, results):
+        return ''.join(self._format_response(r) + "\n" for r in results).encode()
+
+    def _format_response(self, r):
+        return_value = None
+        try:
+            if r[1][1]:
+                return_value = json.dumps(r[1][1], cls=MorseEncoder)
+        except TypeError as te:
+            logger.error("Error while serializing a service return value to JSON!\n" +\
+                    "Details:" + str(te))
+        return "%s %s%s" % (r[0], r[1][0], (" " + return_value) if return_value else "")
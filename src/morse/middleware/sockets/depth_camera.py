@@ -16,19 +16,22 @@ class DepthCameraPublisher(SocketPublisher):
             return bytes() # press [Space] key to enable capturing
 
         points = self.data['points']
-
-        if sys.version_info < (3,4):
-            points = bytes( points )
-
-        data = base64.b64encode( points ).decode() # get string
         intrinsic = [ list(vec) for vec in self.data['intrinsic_matrix'] ]
 
         res = {
             'timestamp': self.data['timestamp'],
             'height':    self.component_instance.image_height,
             'width':     self.component_instance.image_width,
-            'points':    data,
             'intrinsic_matrix': intrinsic,
         }
 
+        if self.binary:
+            # raw points, sent without copy
+            res['points'] = points
+            return self.encode_binary(res)
+
+        if sys.version_info < (3,4):
+            points = bytes( points )
+
+        res['points'] = base64.b64encode( points ).decode() # get string
         return (json.dumps(res) + '\n').encode()
@@ -23,17 +23,21 @@ class VideoCameraPublisher(SocketPublisher):
 
         image = self.process( self.data['image'] )
 
-        data = base64.b64encode( image ).decode() # get string
         intrinsic = [ list(vec) for vec in self.data['intrinsic_matrix'] ]
 
         res = {
             'timestamp': self.data['timestamp'],
             'height':    self.component_instance.image_height,
             'width':     self.component_instance.image_width,
-            'image':     data,
             'intrinsic_matrix': intrinsic,
         }
 
+        if self.binary:
+            # raw image, sent without copy
+            res['image'] = image
+            return self.encode_binary(res)
+
+        res['image'] = base64.b64encode( image ).decode() # get string
         return (json.dumps(res) + '\n').encode()
 
 class Video8uPublisher(VideoCameraPublisher):
@@ -1,33 +1,132 @@
 import logging; logger = logging.getLogger("morse." + __name__)
 from morse.core import blenderapi
+import io
 import re
+import csv
+import json
+import time
+import numbers
+import queue
+import zipfile
+import threading
+from collections import OrderedDict
+import numpy
 from morse.core.datastream import *
 from morse.middleware.abstract_datastream import AbstractDatastream
 
+# Default settings of the writer thread, see
+# env.configure_stream_manager('text', ...)
+QUEUE_SIZE = 10000
+FLUSH_INTERVAL = 1.0
+# Default number of rows written at once by the columnar publishers
+BATCH_SIZE = 1000
+
+class FileWriter(threading.Thread):
+    """
+    Write the data of the text datastreams in a background thread, so
+    that the simulation loop never waits for the disk.
+
+    The datastreams push ``(output, data)`` in a bounded queue: the
+    thread calls ``output.write(data)``, and flushes the outputs every
+    :param flush_interval: seconds. When the queue is full (the disk does
+    not keep up), the simulation waits.
+    """
+    def __init__(self, queue_size = QUEUE_SIZE, flush_interval = FLUSH_INTERVAL):
+        threading.Thread.__init__(self, name = "MORSE text writer")
+        self.daemon = True
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(queue_size)
+        self._dirty = set()
+
+    def write(self, output, data):
+        if self.is_alive():
+            self._queue.put((output, data))
+        else:
+            output.write(data)
+
+    def close_output(self, output):
+        """ Close :param output: once all its pending data are written """
+        if self.is_alive():
+            self._queue.put((output, None))
+        else:
+            output.close()
+
+    def run(self):
+        last_flush = time.monotonic()
+        while True:
+            timeout = last_flush + self.flush_interval - time.monotonic()
+            if timeout <= 0:
+                self._flush()
+                last_flush = time.monotonic()
+                timeout = self.flush_interval
+            try:
+                output, data = self._queue.get(timeout = timeout)
+            except queue.Empty:
+                continue
+
+            if output is None:
+                break
+            try:
+                if data is None:
+                    self._dirty.discard(output)
+                    output.close()
+                else:
+                    output.write(data)
+                    self._dirty.add(output)
+            except Exception as e:
+                logger.error("Error while writing %s: %s" % (output, e))
+        self._flush()
+
+    def _flush(self):
+        for output in self._dirty:
+            output.flush()
+        self._dirty.clear()
+
+    def stop(self):
+        """ Write all the pending data, and stop the thread """
+        if self.is_alive():
+            self._queue.put((None, None))
+            self.join()
+
+_writer = None
+
+def writer():
+    """ Return the writer thread shared by the text datastreams """
+    global _writer
+    if _writer is None:
+        _writer = FileWriter()
+        _writer.start()
+    return _writer
+
+
 class BasePublisher(AbstractDatastream):
     def initialize(self):
         self.filename = self._get_filename()
         self.file = open(self.filename, 'wb')
         self.index = 0
+        self.writer = writer()
 
         line = self.header()
-        self.file.write(line.encode())
+        self.writer.write(self.file, line.encode())
 
     def finalize(self):
-        self.file.close()
+        if self.file:
+            self.writer.close_output(self.file)
+            self.file = None
 
     def _get_filename(self):
         if 'file' in self.kwargs:
             return self.kwargs['file']
         else:
             filename = re.sub(r'\.([0-9]+)', r'\1', self.component_name)
-            return filename + '.txt'
+            return filename + self._extension
+
+    _extension = '.txt'
 
     def default(self, ci):
         line = self.encode_data()
         self.index += 1
-        self.file.write(line.encode())
-        self.file.flush()
+        self.writer.write(self.file, line.encode())
 
     def header(self):
         return ""
@@ -55,6 +154,8 @@ class Publisher(BasePublisher):
         for variable, data in self.data.items():
             if isinstance(data, float):
                 lines.append("\t%s = %.6f\n" % (variable, data))
+            elif hasattr(data, 'tolist'):
+                lines.append("\t%s = %s\n" % (variable, repr(data.tolist())))
             else:
                 lines.append("\t%s = %s\n" % (variable, repr(data)))
         return ''.join(lines)
@@ -74,10 +175,246 @@ class CSVPublisher(BasePublisher):
         for variable, data in self.data.items():
             if isinstance(data, float):
                 lines.append("%.6f;" % data)
+            elif hasattr(data, 'tolist'):
+                lines.append("%s;" % repr(data.tolist()))
             else:
                 lines.append("%s;" % repr(data))
         return ''.join(lines) + '\n'
 
+def schema(component):
+    """ Return the columns of the ``local_data`` of :param component:, as
+    an ordered dictionary name -> {'type': ..., 'doc': ...}, from their
+    declaration with ``add_data`` """
+    fields = OrderedDict()
+    for cls in reversed(type(component).__mro__):
+        if hasattr(cls, '_data_fields'):
+            fields.update(cls._data_fields)
+
+    res = OrderedDict()
+    for name in component.local_data:
+        default_value, type_, doc, level = fields.get(name, (None, '', '', 'all'))
+        res[name] = {'type': type_, 'doc': doc}
+    return res
+
+def _snapshot(value):
+    """ A copy of :param value:, unless it is immutable """
+    copy = getattr(value, 'copy', None)
+    return copy() if copy else value
+
+def _to_list(value):
+    return value.tolist() if hasattr(value, 'tolist') else list(value)
+
+class CSVColumns(object):
+    """ Write rows of values in a CSV file (values separated by
+    semicolons), with the names of the columns on the first line """
+    def __init__(self, filename, schema):
+        self.file = open(filename, 'w', newline = '')
+        self.writer = csv.writer(self.file, delimiter = ';')
+        self.writer.writerow(list(schema))
+
+    def write(self, rows):
+        for row in rows:
+            self.writer.writerow(['%.6f' % value if isinstance(value, float)
+                                  else value if isinstance(value, (int, str))
+                                  else json.dumps(value, default = _to_list)
+                                  for value in row])
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+# The encoding of the columns of the 'npz' format, from the type of the
+# field given to add_data. The columns of other types are encoded as
+# JSON texts, unless their first batch only holds numbers, booleans or
+# strings.
+_ENCODINGS = {'float': 'float', 'double': 'float', 'int': 'int',
+              'bool': 'bool', 'string': 'str'}
+_DTYPES = {'float': numpy.float64, 'int': numpy.int64, 'bool': numpy.bool_}
+
+def _column_encoding(type_, values):
+    """ Return the encoding of a column of :param type_:, whose first
+    batch is :param values: """
+    encoding = _ENCODINGS.get(type_)
+    if encoding:
+        try:
+            _encode_column(encoding, values)
+            return encoding
+        except (TypeError, ValueError):
+            logger.warning("Values of type %s do not match their declared "
+                           "type %s: they are recorded as JSON" %
+                           (type(values[0]).__name__, type_))
+            return 'json'
+    if all(isinstance(value, (bool, numpy.bool_)) for value in values):
+        return 'bool'
+    if all(isinstance(value, numbers.Real) for value in values):
+        return 'float'
+    if all(isinstance(value, str) for value in values):
+        return 'str'
+    return 'json'
+
+def _encode_column(encoding, values):
+    """ Return the numpy array of :param values:, in :param encoding: """
+    if encoding == 'json':
+        return numpy.array([json.dumps(value, default = _to_list)
+                            for value in values], dtype = str)
+    if encoding == 'str':
+        return numpy.array([str(value) for value in values], dtype = str)
+    array = numpy.array(values, dtype = _DTYPES[encoding])
+    if array.ndim != 1:
+        raise ValueError("%s column of %d dimensions" % (encoding, array.ndim))
+    return array
+
+def _decode_column(encoding, array):
+    if encoding != 'json':
+        return array
+    # explicitly an array of objects: the decoded values may be lists of
+    # any length
+    res = numpy.empty(len(array), dtype = object)
+    for i, text in enumerate(array):
+        res[i] = json.loads(text)
+    return res
+
+class NPZColumns(object):
+    """
+    Write rows of values as columns (numpy arrays) in a zip archive,
+    readable with :py:func:`load_columns` (or numpy.load).
+
+    Each batch of rows adds one array per column, named
+    ``<column>.<batch index>.npy``. The encoding of each column (an array
+    of 'float', 'int', 'bool', 'str' or of 'json' texts) is decided from
+    the type of the field (see ``add_data``), or from the first batch,
+    and kept for all the batches. The schema of the columns, with their
+    encoding, is written in ``schema.json`` when the file is closed.
+    """
+    def __init__(self, filename, schema):
+        self.archive = zipfile.ZipFile(filename, 'w', zipfile.ZIP_STORED,
+                                       allowZip64 = True)
+        self.schema = schema
+        self.encodings = None
+        self.batches = 0
+        self.rows = 0
+
+    def write(self, rows):
+        columns = list(zip(*rows))
+        if self.encodings is None:
+            self.encodings = OrderedDict(
+                (name, _column_encoding(self.schema[name]['type'], values))
+                for name, values in zip(self.schema, columns))
+
+        for (name, encoding), values in zip(self.encodings.items(), columns):
+            buf = io.BytesIO()
+            numpy.lib.format.write_array(buf, _encode_column(encoding, values),
+                                         allow_pickle = False)
+            self.archive.writestr('%s.%05d.npy' % (name, self.batches),
+                                  buf.getvalue())
+        self.batches += 1
+        self.rows += len(rows)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        columns = OrderedDict()
+        for name, info in self.schema.items():
+            columns[name] = dict(info)
+            if self.encodings:
+                columns[name]['encoding'] = self.encodings[name]
+        self.archive.writestr('schema.json',
+                              json.dumps({'columns': columns,
+                                          'batches': self.batches,
+                                          'rows': self.rows}, indent = 1))
+        self.archive.close()
+
+def load_columns(filename):
+    """ Read a file written by the 'npz' format of
+    :py:class:`ColumnsPublisher`, and return an ordered dictionary column
+    name -> numpy array (an array of objects for the columns encoded as
+    JSON) """
+    with numpy.load(filename) as npz:
+        info = json.loads(npz['schema.json'].decode(),
+                          object_pairs_hook = OrderedDict)
+        res = OrderedDict()
+        for name, column in info['columns'].items():
+            encoding = column.get('encoding', 'json')
+            res[name] = numpy.concatenate(
+                [_decode_column(encoding, npz['%s.%05d' % (name, i)])
+                 for i in range(info['batches'])] or
+                [numpy.empty(0, dtype = object)])
+        return res
+
+class ColumnsPublisher(BasePublisher):
+    """
+    Record the ``local_data`` of a component as a table, one column per
+    field, one row per sample.
+
+    The rows are kept in memory and handed to the writer thread by
+    batches of ``batch_size`` rows (1000 by default). Two formats are
+    available (option ``format``):
+
+    - 'csv' (default): a CSV file (values separated by semicolons), with
+      the names of the columns on the first line
+    - 'npz': a zip archive of numpy arrays, one per column and per
+      batch, with the schema of the columns (type and documentation of
+      the fields, from ``add_data``). Use :py:func:`load_columns` to
+      read it.
+    """
+    _type_name = "table of the values of the component, as CSV or numpy arrays"
+
+    FORMATS = {'csv': (CSVColumns, '.csv'), 'npz': (NPZColumns, '.npz')}
+
+    def initialize(self):
+        fmt = self.kwargs.get('format', 'csv')
+        try:
+            output_class, self._extension = self.FORMATS[fmt]
+        except KeyError:
+            raise ValueError("Unknown format '%s' for %s (expected one of %s)"
+                             % (fmt, self.component_name, list(self.FORMATS)))
+        self.filename = self._get_filename()
+        self.schema = schema(self.component_instance)
+        self.columns = list(self.schema)
+        self.file = output_class(self.filename, self.schema)
+        self.batch_size = int(self.kwargs.get('batch_size', BATCH_SIZE))
+        self.index = 0
+        self.writer = writer()
+        self._rows = []
+
+    def default(self, ci):
+        data = self.data
+        self._rows.append([_snapshot(data[name]) for name in self.columns])
+        self.index += 1
+        if len(self._rows) >= self.batch_size:
+            self.writer.write(self.file, self._rows)
+            self._rows = []
+
+    def finalize(self):
+        if self.file and self._rows:
+            self.writer.write(self.file, self._rows)
+            self._rows = []
+        BasePublisher.finalize(self)
+
 class TextDatastreamManager(DatastreamManager):
-    """ Produce text files as output for the components """
+    """ Produce text files as output for the components
+
+    The files are written by a background thread, whose queue size
+    (``queue_size``, in samples) and flush interval (``flush_interval``,
+    in seconds) can be set with ``env.configure_stream_manager('text',
+    ...)``.
+    """
+    def __init__(self, args, kwargs):
+        DatastreamManager.__init__(self, args, kwargs)
+        global _writer
+        if _writer is None:
+            _writer = FileWriter(int(kwargs.get('queue_size', QUEUE_SIZE)),
+                                 float(kwargs.get('flush_interval', FLUSH_INTERVAL)))
+            _writer.start()
+
+    def finalize(self):
+        """ Write all the pending data """
+        global _writer
+        DatastreamManager.finalize(self)
+        if _writer:
+            _writer.stop()
+            _writer = None
 
@@ -3,6 +3,7 @@ import sys
 import re
 import yarp
 import mathutils
+import numpy
 from morse.helpers.transformation import Transformation3d
 from morse.middleware.abstract_datastream import AbstractDatastream
 from morse.core.datastream import *
@@ -58,6 +59,8 @@ class YarpPublisher(YarpPort):
             m_bottle = bottle.addList()
             for m_data in data:
                 self.encode_message(m_bottle, m_data, component_name)
+        elif isinstance(data, numpy.ndarray):
+            self.encode_message(bottle, data.tolist(), component_name)
         elif isinstance(data, dict):
             for key, value in data.items():
                 m_bottle = bottle.addList()
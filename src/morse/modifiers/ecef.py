@@ -2,7 +2,6 @@ import logging; logger = logging.getLogger("morse." + __name__)
 
 from morse.modifiers.abstract_modifier import AbstractModifier
 from morse.helpers.coordinates import CoordinateConverter
-import numpy
 
 class ECEFmodifier(AbstractModifier):
     """ 
@@ -27,18 +26,15 @@ class ECEFmodifier(AbstractModifier):
 
     def modify(self):
         try:
-            xe = numpy.matrix(
-                    [
-                    self.data['x'],
-                    self.data['y'],
-                    self.data['z']
-                    ])
+            xe = [self.data['x'],
+                  self.data['y'],
+                  self.data['z']]
             xt = self.method(xe)
             logger.info("%s => %s" % (xe, xt))
 
-            self.data['x'] = xt[0, 0]
-            self.data['y'] = xt[0, 1]
-            self.data['z'] = xt[0, 2]
+            self.data['x'] = xt[0]
+            self.data['y'] = xt[1]
+            self.data['z'] = xt[2]
         except KeyError as detail:
             self.key_error(detail)
 
@@ -3,7 +3,6 @@ import logging; logger = logging.getLogger("morse." + __name__)
 from morse.modifiers.abstract_modifier import AbstractModifier
 from morse.helpers.coordinates import CoordinateConverter
 from math import degrees, radians
-import numpy
 
 class Geodeticmodifier(AbstractModifier):
     """ 
@@ -31,20 +30,17 @@ class CoordinatesToGeodetic(Geodeticmodifier):
     """
     def modify(self):
         try:
-            xe = numpy.matrix(
-                    [
-                    self.data['x'],
-                    self.data['y'],
-                    self.data['z']
-                    ])
+            xe = [self.data['x'],
+                  self.data['y'],
+                  self.data['z']]
             xt = self.converter.ltp_to_geodetic(
                     self.converter.blender_to_ltp(xe))
 
             logger.debug("%s => %s" % (xe, xt))
 
-            self.data['x'] = degrees(xt[0, 0])
-            self.data['y'] = degrees(xt[0, 1])
-            self.data['z'] = xt[0, 2]
+            self.data['x'] = degrees(xt[0])
+            self.data['y'] = degrees(xt[1])
+            self.data['z'] = xt[2]
         except KeyError as detail:
             self.key_error(detail)
 
@@ -53,19 +49,16 @@ class CoordinatesFromGeodetic(Geodeticmodifier):
     """
     def modify(self):
         try:
-            xe = numpy.matrix(
-                    [
-                    radians(self.data['x']),
-                    radians(self.data['y']),
-                    self.data['z']
-                    ])
+            xe = [radians(self.data['x']),
+                  radians(self.data['y']),
+                  self.data['z']]
             xt = self.converter.ltp_to_blender(
                     self.converter.geodetic_to_ltp(xe))
 
             logger.debug("%s => %s" % (xe, xt))
 
-            self.data['x'] = xt[0, 0]
-            self.data['y'] = xt[0, 1]
-            self.data['z'] = xt[0, 2]
+            self.data['x'] = xt[0]
+            self.data['y'] = xt[1]
+            self.data['z'] = xt[2]
         except KeyError as detail:
             self.key_error(detail)
@@ -1,18 +1,98 @@
 import logging; logger = logging.getLogger("morse." + __name__)
+import math
 import mathutils
+import threading
 import time
+from collections import deque
 
 from morse.core import blenderapi
 from morse.core.multinode import SimulationNodeClass
+from morse.core.profiler import Histogram
 
 from pymorse.stream import StreamJSON, PollThread
+from pymorse.multinode import PROTOCOL_VERSION, RobotIds, Subscription, \
+                              pack_pose, encode_poses, decode_poses, pose_changed
+
+# Default thresholds under which a robot is considered as static, and its
+# pose is not sent to the server (in meters and radians)
+POSITION_THRESHOLD = 0.001
+ORIENTATION_THRESHOLD = 0.001
+# In asynchronous mode, external robots are extrapolated at most this
+# long (in seconds) after their last update
+MAX_EXTRAPOLATION = 0.5
+# In synchronous mode, how long to wait for the reply of the server (in
+# seconds)
+REPLY_TIMEOUT = 0.1
+
+def _angle_diff(a, b):
+    return (a - b + math.pi) % (2 * math.pi) - math.pi
+
+class ExternalRobot(object):
+    """
+    A robot of another node, with its last known pose and velocities.
+
+    Velocities are estimated from the two last poses received, using the
+    simulated time of the node owning the robot.
+    """
+    __slots__ = ['obj', 'position', 'rotation', 'velocity',
+                 'angular_velocity', 'sample_time', 'received']
+
+    def __init__(self, obj):
+        self.obj = obj
+        self.sample_time = None
+        self.velocity = None
+        self.angular_velocity = None
+
+    def update(self, position, rotation, sample_time, received):
+        if sample_time is not None and self.sample_time is not None:
+            dt = sample_time - self.sample_time
+            if dt > 0:
+                self.velocity = [(position[i] - self.position[i]) / dt
+                                 for i in range(3)]
+                self.angular_velocity = [_angle_diff(rotation[i], self.rotation[i]) / dt
+                                         for i in range(3)]
+        else:
+            self.velocity = None
+        self.position = position
+        self.rotation = rotation
+        self.sample_time = sample_time
+        self.received = received
+        self._apply(position, rotation)
+
+    def extrapolate(self, now, horizon):
+        """ Move the robot where it should be at real time :param now:,
+        assuming constant velocities, but at most :param horizon: seconds
+        after its last update """
+        if not self.velocity:
+            return
+        dt = min(now - self.received, horizon)
+        if dt <= 0:
+            return
+        self._apply([p + v * dt for p, v in zip(self.position, self.velocity)],
+                    [r + w * dt for r, w in zip(self.rotation, self.angular_velocity)])
+
+    def _apply(self, position, rotation):
+        self.obj.worldPosition = position
+        self.obj.worldOrientation = mathutils.Euler(rotation).to_matrix()
+
 
 class SocketNode(SimulationNodeClass):
     """
     Implements multinode simulation using sockets.
-    """
 
-    out_data = {}
+    Only the robots whose pose changed by more than
+    ``position_threshold`` or ``orientation_threshold`` since they were
+    last sent are published, and the node only receives the robots
+    matching its subscription (``subscribe_robots``,
+    ``subscribe_region``), see :py:mod:`pymorse.multinode`.
+
+    By default, each step waits for the reply of the server (at most
+    ``reply_timeout`` seconds). In
+    ``asynchronous`` mode, the node publishes its robots and goes on:
+    the replies received in the background are applied at the next
+    steps, and the external robots are extrapolated from their last
+    known velocities, for at most ``max_extrapolation`` seconds.
+    """
 
     def initialize(self):
         """
@@ -21,9 +101,43 @@ class SocketNode(SimulationNodeClass):
         self.node_stream = None
         self.poll_thread = None
         self.simulation_time = blenderapi.persistantstorage().time
+
+        self.position_threshold = float(self.options.get('position_threshold',
+                                                         POSITION_THRESHOLD))
+        self.orientation_threshold = float(self.options.get('orientation_threshold',
+                                                            ORIENTATION_THRESHOLD))
+        self.subscription = Subscription(self.options.get('subscribe_robots'),
+                                         self.options.get('subscribe_region'))
+        self.asynchronous = bool(self.options.get('asynchronous', False))
+        self.max_extrapolation = float(self.options.get('max_extrapolation',
+                                                        MAX_EXTRAPOLATION))
+        self.reply_timeout = float(self.options.get('reply_timeout',
+                                                    REPLY_TIMEOUT))
+        self._subscription_sent = False
+        # ids of our robots, and of the robots of the other nodes
+        self._local_ids = RobotIds()
+        self._remote_ids = RobotIds()
+        # last pose sent, per robot, and the robots sent at the last step
+        self._sent_poses = {}
+        self._moving = set()
+        # external robots, per name (None if not in this scene)
+        self._external_robots = {}
+        # node owning each external robot, and simulated time of each node
+        self._owners = {}
+        self._peers = {}
+        # replies of the server, with their reception time, filled by
+        # the poll thread
+        self._inbox = deque()
+        self._inbox_cv = threading.Condition()
+        self._seq = 0
+        self._last_reply_seq = 0
+        self._sent_at = {}
+        self._rtt = Histogram()
+
         logger.debug("Connecting to %s:%d" % (self.host, self.port) )
         try:
             self.node_stream = StreamJSON(self.host, self.port)
+            self.node_stream.subscribe(self._on_reply)
             self.poll_thread = PollThread()
             self.poll_thread.start()
             if self.node_stream.connected:
@@ -33,11 +147,32 @@ class SocketNode(SimulationNodeClass):
             logger.warning("Unable to connect to %s:%s"%(self.host, self.port) )
             logger.warning(str(err))
 
+    def _on_reply(self, in_data):
+        """ Called by the poll thread for each reply of the server """
+        with self._inbox_cv:
+            self._inbox.append((time.time(), in_data))
+            if isinstance(in_data, dict):
+                self._last_reply_seq = in_data.get('__seq', self._seq)
+            self._inbox_cv.notify()
+
     def _exchange_data(self, out_data):
-        """ Send and receive pickled data through a socket """
-        # Use the existing socket connection
+        """ Send the data to the server, and return the replies received
+        since the last call (with their reception time). In synchronous
+        mode, wait for the reply to this message first. """
         self.node_stream.publish([self.node_name, out_data])
-        return self.node_stream.get(timeout=.1) or self.node_stream.last()
+
+        with self._inbox_cv:
+            if not self.asynchronous:
+                deadline = time.time() + self.reply_timeout
+                while self._last_reply_seq < out_data['__seq']:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        logger.debug("no reply of the server")
+                        break
+                    self._inbox_cv.wait(remaining)
+            replies = list(self._inbox)
+            self._inbox.clear()
+        return replies
 
     def synchronize(self):
         if not self.node_stream:
@@ -47,27 +182,117 @@ class SocketNode(SimulationNodeClass):
             logger.debug("not self.node_stream.connected")
             return
 
-        # Get the coordinates of local robots
+        # Send the local robots which moved, and receive the replies with
+        # the changes in the other nodes
+        replies = self._exchange_data(self.encode_robots())
+        scene = blenderapi.scene()
+        for received, in_data in replies:
+            logger.debug("Received: %s" % in_data)
+            try:
+                self.update_scene(in_data, scene, received)
+            except Exception as e:
+                logger.warning("error while processing incoming data: " + str(e))
+
+        if self.asynchronous and self.max_extrapolation > 0:
+            now = time.time()
+            for robot in self._external_robots.values():
+                if robot is not None:
+                    robot.extrapolate(now, self.max_extrapolation)
+
+    def statistics(self):
+        """ Return the round-trip time of the messages to the server, and
+        for each other node, its last known simulated time and its lag
+        (our simulated time minus its one, when we received it) """
+        return {'node': self.node_name,
+                'asynchronous': self.asynchronous,
+                'server_rtt': self._rtt.statistics(),
+                'peers': self._peers,
+                'external_robots': len([r for r in self._external_robots.values()
+                                        if r is not None])}
+
+    def encode_robots(self):
+        """ Build the message holding the local robots whose pose
+        changed since they were last sent """
+        records = []
+        moving = set()
         for obj in blenderapi.persistantstorage().robotDict.keys():
-            #self.out_data[obj.name] = [obj.worldPosition.to_tuple()]
+            position = obj.worldPosition.to_tuple()
             euler_rotation = obj.worldOrientation.to_euler()
-            self.out_data[obj.name] = [obj.worldPosition.to_tuple(), \
-                [euler_rotation.x, euler_rotation.y, euler_rotation.z]]
-        self.out_data['__time'] = [self.simulation_time.time, 1.0/ blenderapi.getfrequency(), self.simulation_time.real_time]
-        # Send the encoded dictionary through a socket
-        #  and receive a reply with any changes in the other nodes
-        in_data = self._exchange_data(self.out_data)
-        logger.debug("Received: %s" % in_data)
-
-        if not in_data:
-            return
+            rotation = (euler_rotation.x, euler_rotation.y, euler_rotation.z)
+            if pose_changed(self._sent_poses.get(obj.name), position, rotation,
+                            self.position_threshold, self.orientation_threshold):
+                moving.add(obj.name)
+            elif obj.name not in self._moving:
+                continue
+            # A robot which just stopped is sent once more, so that the
+            # other nodes see it stopped (and stop extrapolating it)
+            self._sent_poses[obj.name] = (position, rotation)
+            records.append(pack_pose(self._local_ids.id(obj.name),
+                                     position, rotation))
+        self._moving = moving
 
+        self._seq += 1
+        self._sent_at[self._seq] = time.time()
+        out_data = {'__version': PROTOCOL_VERSION,
+                    '__seq': self._seq,
+                    '__time': [self.simulation_time.time,
+                               1.0 / blenderapi.getfrequency(),
+                               self.simulation_time.real_time]}
+        names = self._local_ids.announce()
+        if names:
+            out_data['__names'] = names
+        if records:
+            out_data['__poses'] = encode_poses(records)
+        if not self._subscription_sent:
+            out_data['__subscribe'] = self.subscription.to_dict()
+            self._subscription_sent = True
+        return out_data
+
+    def _external_robot(self, name, scene):
         try:
-            self.update_scene(in_data, blenderapi.scene())
-        except Exception as e:
-            logger.warning("error while processing incoming data: " + str(e))
+            return self._external_robots[name]
+        except KeyError:
+            robot = None
+            if name in scene.objects:
+                obj = scene.objects[name]
+                if obj not in blenderapi.persistantstorage().robotDict:
+                    robot = ExternalRobot(obj)
+            else:
+                logger.debug("%s not found in this simulation scenario, but present in another node. Ignoring it!" % name)
+            self._external_robots[name] = robot
+            return robot
+
+    def update_scene(self, in_data, scene, received = None):
+        if '__version' not in in_data:
+            return self._update_scene_legacy(in_data, scene)
+
+        if received is None:
+            received = time.time()
+        sent_at = self._sent_at.pop(in_data.get('__seq'), None)
+        if sent_at is not None:
+            self._rtt.update(received - sent_at)
+            # forget the messages which never got a reply
+            for seq in [seq for seq in self._sent_at if seq < in_data['__seq']]:
+                del self._sent_at[seq]
+
+        for node, node_time in in_data.get('__peers', {}).items():
+            if node == self.node_name:
+                continue
+            self._peers[node] = {'time': node_time[0],
+                                 'lag': self.simulation_time.time - node_time[0]}
+        self._owners.update(in_data.get('__owners', {}))
+        self._remote_ids.learn(in_data.get('__names', {}))
+        if '__poses' not in in_data:
+            return
+        for robot_id, position, rotation in decode_poses(in_data['__poses']):
+            name = self._remote_ids.name(robot_id)
+            robot = self._external_robot(name, scene) if name else None
+            if robot is not None:
+                peer = self._peers.get(self._owners.get(name))
+                robot.update(position, rotation,
+                             peer['time'] if peer else None, received)
 
-    def update_scene(self, in_data, scene):
+    def _update_scene_legacy(self, in_data, scene):
         # Update the positions of the external robots
         for obj_name, robot_data in in_data.items():
             try:
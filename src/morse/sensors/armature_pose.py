@@ -111,12 +111,11 @@ class ArmaturePose(morse.core.sensor.Sensor):
         (respectively in radian or meters).
 
         """
-        joints = {}
-        # get the rotation of each channel
-        for channel in self.armature.channels:
-            joints[channel.name] = self.get_joint(channel.name)
+        if not self._armature_actuator:
+            self._get_armature_actuator()
 
-        return joints
+        # snapshot of the joint values, shared with the armature actuator
+        return dict(self._armature_actuator.joint_state())
 
     @service
     def get_joint(self, joint):
@@ -159,6 +158,4 @@ class ArmaturePose(morse.core.sensor.Sensor):
         if not self._armature_actuator:
             self._get_armature_actuator()
 
-        joints = self.get_state()
-        for k,v in joints.items():
-            self.local_data[k] = v
+        self.local_data.update(self._armature_actuator.joint_state())
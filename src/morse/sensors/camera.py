@@ -123,6 +123,9 @@ class Camera(morse.core.sensor.Sensor):
                 self._update_scene()
             # Call the bge.texture method to refresh the image
             self._camera_image.refresh(True)
+            if blenderapi.persistantstorage().get('turbo_mode', False):
+                # In turbo mode, the frames are rendered only on request
+                blenderapi.set_render(True)
 
     @property
     def image_data(self):
@@ -91,6 +91,9 @@ class Collision(Sensor):
                  'Only report collision with objects that have this property, '
                  'default "" (all objects)')
 
+    # Reads its own logic bricks: called by them, not by the scheduler
+    uses_logic_bricks = True
+
     def __init__(self, obj, parent=None):
         """ Constructor method.
 
@@ -5,7 +5,6 @@ import math, time
 from morse.core import mathutils
 from morse.core import blenderapi
 from morse.helpers.coordinates import CoordinateConverter
-import numpy
 
 class GPS(morse.core.sensor.Sensor):
     """
@@ -205,18 +204,18 @@ class RawGPS(GPS):
         """
 
         #current position
-        xt = numpy.matrix(self.position_3d.translation)
+        xt = self.position_3d.translation
         ltp = self.coord_converter.blender_to_ltp(xt)
         if self.pltp is not None:
             v = (ltp - self.pltp) * self.frequency
-            self.v = [v[0, 0], v[0, 1], v[0, 2]]
+            self.v = [v[0], v[1], v[2]]
         self.pltp = ltp
         gps_coords = self.coord_converter.ltp_to_geodetic(ltp)
 
         #compose message as close as possible to a GPS-standardprotocol
-        self.local_data['longitude'] = math.degrees(gps_coords[0, 0])
-        self.local_data['latitude'] = math.degrees(gps_coords[0, 1])
-        self.local_data['altitude'] = gps_coords[0, 2]
+        self.local_data['longitude'] = math.degrees(gps_coords[0])
+        self.local_data['latitude'] = math.degrees(gps_coords[1])
+        self.local_data['altitude'] = gps_coords[2]
         self.local_data['velocity'] = self.v
 
 class ExtendedGPS(RawGPS):
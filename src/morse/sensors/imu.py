@@ -3,7 +3,7 @@ import math
 import morse.core.sensor
 from morse.core import mathutils, blenderapi
 from morse.helpers.components import add_data, add_property
-from morse.sensors.magnetometer import MagnetoDriver
+from morse.sensors.magnetometer import MagnetoDriver, DEFAULT_RESOLUTION
 from morse.helpers.velocity import linear_velocities, angular_velocities
 from copy import copy
 
@@ -45,6 +45,11 @@ class IMU(morse.core.sensor.Sensor):
                  "Only robot with dynamic and Velocity control can choose Velocity "
                  "computation. Default choice is Velocity for robot with physics, "
                  "and Position for others")
+    add_property('resolution', DEFAULT_RESOLUTION, 'resolution', 'float',
+                 "the size, in meters, of the cells of the grid on which the "
+                 "magnetic field model is evaluated, the field being "
+                 "interpolated in between (see the magnetometer). If 0, the "
+                 "model is evaluated at each step")
 
     def __init__(self, obj, parent=None):
         """ Constructor method.
@@ -97,7 +102,7 @@ class IMU(morse.core.sensor.Sensor):
         # reference for rotating a vector from imu frame to world frame
         self.rot_i2w = self.bge_object.worldOrientation
 
-        self.mag = MagnetoDriver()
+        self.mag = MagnetoDriver(resolution = self.resolution)
 
         logger.info("IMU Component initialized, runs at %.2f Hz ", self.frequency)
 
@@ -3,6 +3,8 @@ from morse.core import blenderapi
 from morse.core.sensor import Sensor
 from morse.helpers.components import add_data, add_property, add_level
 from morse.builder import bpymorse
+import numpy
+import time
 """
 Important note:
 
@@ -141,6 +143,15 @@ class LaserScanner(Sensor):
         sick.properties(layer_separation = 0.8)
         sick.properties(layer_offset = 0.25)
 
+    When ``Visible_arc`` is set, the arc is redrawn once per scan at most,
+    throttled to ``arc_display_rate`` (10 Hz by default), and not at all on
+    the frames which are not rendered (in background mode, or skipped by
+    the turbo mode). This keeps the display cheap for dense scanners:
+
+    .. code-block:: python
+
+        hokuyo.properties(Visible_arc = True, arc_display_rate = 5.0)
+
     As with any other component, it is possible to adjust the refresh frequency of
     the sensor, after it has been defined in the builder script. For example, to
     set the frequency to 1 Hz:
@@ -158,21 +169,23 @@ class LaserScanner(Sensor):
     add_level("rssi", "morse.sensors.laserscanner.RSSILaserScanner", doc = "laserscanner with rssi: \
                     Laserscan with point_list, range_list and remission_list")
 
-    add_data('point_list', [], "list", "Array that stores the positions of \
+    add_data('point_list', [], "array", "Array that stores the positions of \
             the points found by the laser. The points are given with respect \
-            to the location of the sensor, and stored as lists of three \
-            elements. The number of points depends on the geometry of the arc \
-            parented to the sensor (see below). The point (0, 0, 0) means that\
-            this ray has not it anything in its range", level =["raw", "rssi"] )
-    add_data('range_list', [], "list", "Array that stores the distance to the \
-            first obstacle detected by each ray. The order indexing of this \
+            to the location of the sensor, and stored in a (N, 3) float32 \
+            numpy array, one row of three elements per ray. The number of \
+            points depends on the geometry of the arc parented to the sensor \
+            (see below). The point (0, 0, 0) means that this ray has not it \
+            anything in its range", level =["raw", "rssi"] )
+    add_data('range_list', [], "array", "Array that stores the distance to the \
+            first obstacle detected by each ray, as a float32 numpy array. \
+            The order indexing of this \
             array is the same as for point_list, so that the element in the \
             same index of both lists will correspond to the measures for the \
             same ray. If the ray does not hit anything in its range it returns \
             laser_range", level =["raw", "rssi"])
-    add_data('remission_list', [], "list", "Array that stores the remission \
-            value for the points found by the laser. The specular intensity \
-            is set as the remission value. If no object is hit, the remission \
+    add_data('remission_list', [], "array", "Array that stores the remission \
+            value for the points found by the laser, as a float32 numpy \
+            array. The specular intensity is set as the remission value. If no object is hit, the remission \
             value is set to 0", level ="rssi")
 
     add_property('laser_range', 30.0, 'laser_range', "float",
@@ -187,6 +200,11 @@ class LaserScanner(Sensor):
                   in decimal format. Used when creating the arc object.")
     add_property('visible_arc', False, 'Visible_arc', "boolean",
                  "if the laser arc should be displayed during the simulation")
+    add_property('arc_display_rate', 10.0, 'arc_display_rate', "float",
+                 "Maximum rate (in Hz, real time) at which the arc is \
+                  redrawn when visible_arc is set. The arc is never redrawn \
+                  more than once per scan, nor when the frame is not \
+                  rendered. A value of 0 redraws it at each scan.")
     add_property('layers', 1, 'layers', "integer",
                   "Number of scanning planes used by the sensor.")
     add_property('layer_separation', 0.8, 'layer_separation', "float",
@@ -219,11 +237,6 @@ class LaserScanner(Sensor):
         self._ray_arc.setVisible(self.visible_arc)
         self._ray_list = []
 
-        # Create an empty list to store the intersection points
-        self.local_data['point_list'] = []
-        self.local_data['range_list'] = []
-
-
         # Get the datablock of the arc, to extract its vertices
         ray_object = blenderapi.objectdata(self._ray_arc.name)
         for vertex in ray_object.data.vertices:
@@ -238,90 +251,142 @@ class LaserScanner(Sensor):
             # The position is already given as a mathutils.Vector
             self._ray_list.append(vertex.co)
 
-            # Insert empty points into the data list
-            self.local_data['point_list'].append([0.0, 0.0, 0.0])
-            # Insert zeros into the range list
-            self.local_data['range_list'].append(0.0)
-
             logger.debug("RAY %d = [%.4f, %.4f, %.4f]" %
                          (vertex.index, self._ray_list[vertex.index-1][0],
                                         self._ray_list[vertex.index-1][1],
                                         self._ray_list[vertex.index-1][2]))
 
+        self._init_scan_buffers()
+
         # Get some information to be able to deform the arcs
-        if self.visible_arc:
-            self._layers = 1
-            if 'layers' in self.bge_object:
-                self._layers = self.bge_object['layers']
-            self._vertex_per_layer = len(self._ray_list) // self._layers
+        self._layers = 1
+        if 'layers' in self.bge_object:
+            self._layers = self.bge_object['layers']
+        self._vertex_per_layer = len(self._ray_list) // self._layers
+        # see http://projects.blender.org/tracker/?func=detail&aid=34550
+        # not supported in 2.66 due to BGE bug #34550
+        self._arc_supported = not ((2, 65, 0) < blenderapi.version() <= (2, 66, 3))
+        self._last_arc_display = 0.0
 
         logger.info('Component initialized, runs at %.2f Hz', self.frequency)
 
+    def _init_scan_buffers(self):
+        """
+        Allocate, once for all, the arrays used by the scan.
+
+        The ray directions are stored as homogeneous coordinates, so that
+        a single matrix product gives the world position of the target of
+        every ray. ``point_list`` and ``range_list`` are preallocated
+        float32 arrays, updated in place at each scan.
+        """
+        nb_rays = len(self._ray_list)
+
+        self._rays = numpy.ones((nb_rays, 4))
+        if nb_rays:
+            self._rays[:, :3] = [ray[:] for ray in self._ray_list]
+
+        # World coordinates of the intersection points, and hit flags
+        self._hit_points = numpy.zeros((nb_rays, 3))
+        self._hit_mask = numpy.zeros(nb_rays, dtype=bool)
+
+        self._point_buffer = numpy.zeros((nb_rays, 3), dtype=numpy.float32)
+        self._range_buffer = numpy.zeros(nb_rays, dtype=numpy.float32)
+        self.local_data['point_list'] = self._point_buffer
+        self.local_data['range_list'] = self._range_buffer
+
+    def _ray_targets(self, matrix):
+        """
+        Return the world coordinates of the target of each ray, as a
+        list of [x, y, z] lists, for the sensor transformation
+        ``matrix`` (a 4x4 numpy array).
+        """
+        return self._rays.dot(matrix.T)[:, :3].tolist()
+
+    def _compute_scan(self, matrix):
+        """
+        Compute, in bulk, the ranges and the points (in the sensor frame)
+        from the intersection points found by the last ray casts.
+        """
+        ranges = self._range_buffer
+        points = self._point_buffer
+
+        ranges.fill(self.laser_range)
+        points.fill(0.0)
+
+        mask = self._hit_mask
+        if mask.any():
+            delta = self._hit_points[mask] - matrix[:3, 3]
+            ranges[mask] = numpy.sqrt((delta * delta).sum(axis=1))
+            # Return the points to the reference of the sensor
+            inverse = numpy.linalg.inv(matrix)
+            points[mask] = delta.dot(inverse[:3, :3].T)
+
+        self.local_data['point_list'] = points
+        self.local_data['range_list'] = ranges
 
     def default_action(self):
         """
         Do ray tracing from the SICK object using a semicircle
 
-        Generates a list of lists, with the points located.
+        Fills the ``point_list`` and ``range_list`` arrays with the
+        points located.
         Also deforms the geometry of the arc associated to the SICK,
         as a way to display the results obtained.
         """
-        #logger.debug("ARC POSITION: [%.4f, %.4f, %.4f]" %
-        #                (self.bge_object.position[0],
-        #                 self.bge_object.position[1],
-        #                 self.bge_object.position[2]))
-
-        # Get the inverse of the transformation matrix
-        inverse = self.position_3d.matrix.inverted()
+        matrix = numpy.array(self.position_3d.matrix)
 
-        index = 0
-        for ray in self._ray_list:
-            # Transform the ray to the current position and rotation
-            #  of the sensor
-            correct_ray = self.position_3d.matrix * ray
+        ray_cast = self.bge_object.rayCast
+        hit_points = self._hit_points
+        hit_mask = self._hit_mask
+        laser_range = self.laser_range
 
+        for index, target in enumerate(self._ray_targets(matrix)):
             # Shoot a ray towards the target
-            target, point, normal = self.bge_object.rayCast(correct_ray, None,
-                                                             self.laser_range)
-
-            #logger.debug("\tTarget, point, normal: %s, %s, %s" %
-            #               (target, point, normal))
+            obj, point, _ = ray_cast(target, None, laser_range)
 
             # Register when an intersection occurred
-            if target:
-                distance = self.bge_object.getDistanceTo(point)
-                # Return the point to the reference of the sensor
-                new_point = inverse * point
-
-                #logger.debug("\t\tGOT INTERSECTION WITH RAY: [%.4f, %.4f, %.4f]" % (correct_ray[0], correct_ray[1], correct_ray[2]))
-                #logger.debug("\t\tINTERSECTION AT: [%.4f, %.4f, %.4f] = %s" % (point[0], point[1], point[2], target))
-            # If there was no intersection, store the default values
+            if obj:
+                hit_points[index] = point
+                hit_mask[index] = True
             else:
-                distance = self.laser_range
-                new_point = [0.0, 0.0, 0.0]
+                hit_mask[index] = False
+
+        self._compute_scan(matrix)
+        self.display_arc()
+
 
-            # Save the information gathered
-            self.local_data['point_list'][index] = new_point[:]
-            self.local_data['range_list'][index] = distance
-            index += 1
-            self.change_arc()
+    def display_arc(self):
+        """
+        Display stage of the scan: redraw the arc, at most at
+        ``arc_display_rate``, and only if the next frame is rendered (not
+        in background mode, nor on the frames skipped by the turbo mode).
+        """
+        if not self.visible_arc or not self._arc_supported:
+            return
+        if not blenderapi.viewport_rendering():
+            return
+
+        if self.arc_display_rate > 0:
+            now = time.time()
+            if now - self._last_arc_display < 1.0 / self.arc_display_rate:
+                return
+            self._last_arc_display = now
 
+        self.change_arc()
 
     def change_arc(self):
         # Change the shape of the arc to show what the sensor detects
         # Display only for 1 layer scanner
-        if (2, 65, 0) < blenderapi.version() <= (2, 66, 3):
-            # see http://projects.blender.org/tracker/?func=detail&aid=34550
-            return # not supported in 2.66 due to BGE bug #34550
         # TODO rework the LDMRS (3 layers) display [code in 1.0-beta2]
-        if self.visible_arc and self._layers == 1:
+        if self._layers == 1:
             for mesh in self._ray_arc.meshes:
                 for m_index in range(len(mesh.materials)):
                     # Skip the first vertex (located at the center of the sensor)
                     for v_index in range(1, mesh.getVertexArrayLength(m_index)):
                         vertex = mesh.getVertex(m_index, v_index)
-                        point = self.local_data['point_list'][v_index-1]
-                        if point == [0.0, 0.0, 0.0]:
+                        if self._hit_mask[v_index-1]:
+                            point = self._point_buffer[v_index-1].tolist()
+                        else:
                             # If there was no intersection, move the vertex
                             # to the laser range
                             point = self._ray_list[v_index-1] * self.laser_range
@@ -339,18 +404,11 @@ class LaserScannerRotationZ(LaserScanner):
 
 class RSSILaserScanner(LaserScanner):
 
-    def __init__(self, obj, parent=None):
-        LaserScanner.__init__(self, obj, parent)
-        self.local_data['remission_list'] = []
-        ray_object = blenderapi.objectdata(self._ray_arc.name)
-        for vertex in ray_object.data.vertices:
-            # Skip the first vertex.
-            # It is the one located at the center of the sensor
-            if vertex.index == 0:
-                continue
-
-            # Insert zeros in the remission list
-            self.local_data['remission_list'].append(0.0) 
+    def _init_scan_buffers(self):
+        LaserScanner._init_scan_buffers(self)
+        self._remission_buffer = numpy.zeros(len(self._ray_list),
+                                             dtype=numpy.float32)
+        self.local_data['remission_list'] = self._remission_buffer
        
     def getRSSIValue(self, target):
 
@@ -382,14 +440,15 @@ class RSSILaserScanner(LaserScanner):
             return -1              
 
     def default_action(self):
-        inverse = self.position_3d.matrix.inverted()
+        matrix = numpy.array(self.position_3d.matrix)
 
-        index = 0
-        for ray in self._ray_list:
-            # Transform the ray to the current position and rotation
-            #  of the sensor
-            correct_ray = self.position_3d.matrix * ray
+        ray_cast = self.bge_object.rayCast
+        hit_points = self._hit_points
+        hit_mask = self._hit_mask
+        remissions = self._remission_buffer
+        laser_range = self.laser_range
 
+        for index, target in enumerate(self._ray_targets(matrix)):
             # Shoot a ray towards the target
             """
             target, point, normal = self.bge_object.rayCast(correct_ray, None,
@@ -399,36 +458,19 @@ class RSSILaserScanner(LaserScanner):
             
             target_poly is shorter
             """
-            target, point, normal, target_poly = self.bge_object.rayCast(correct_ray, None,
-                                                             self.laser_range, "", 1, 1, 1)
-
-            #logger.debug("\tTarget, point, normal: %s, %s, %s" %
-            #               (target, point, normal))
+            obj, point, normal, target_poly = ray_cast(target, None,
+                                                       laser_range, "", 1, 1, 1)
 
             # Register when an intersection occurred
-
-
             if target_poly:
-                distance = self.bge_object.getDistanceTo(point)
-                new_point = inverse * point
-
-                rssi = self.getRSSIValue(target_poly)                        
-                            
-                # Return the point to the reference of the sensor
-
-
-                #logger.debug("\t\tGOT INTERSECTION WITH RAY: [%.4f, %.4f, %.4f]" % (correct_ray[0], correct_ray[1], correct_ray[2]))
-                #logger.debug("\t\tINTERSECTION AT: [%.4f, %.4f, %.4f] = %s" % (point[0], point[1], point[2], target))
+                hit_points[index] = point
+                hit_mask[index] = True
+                remissions[index] = self.getRSSIValue(target_poly) or 0
             # If there was no intersection, store the default values
             else:
-                distance = self.laser_range
-                new_point = [0.0, 0.0, 0.0]
-                rssi = 0
-
-            # Save the information gathered
-            self.local_data['point_list'][index] = new_point[:]
-            self.local_data['range_list'][index] = distance
-            self.local_data['remission_list'][index] = rssi
-            index += 1
-            LaserScanner.change_arc(self)
+                hit_mask[index] = False
+                remissions[index] = 0
 
+        self._compute_scan(matrix)
+        self.local_data['remission_list'] = remissions
+        self.display_arc()
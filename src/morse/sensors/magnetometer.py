@@ -5,11 +5,10 @@ import morse.core.sensor
 from morse.helpers.components import add_data, add_property
 from morse.helpers.coordinates import CoordinateConverter
 
-from math import degrees
+from math import degrees, floor
 import datetime
 import os
 
-import numpy
 
 def _decimal_date(date):
     bisextile = (date.year % 4 == 0 and date.year % 100 != 0) or (date.year % 400 == 0)
@@ -21,24 +20,130 @@ def _decimal_date(date):
         day_nb += days_month[i]
     return date.year +  (day_nb - 1.0) / (365.0 + bisextile)
 
-class MagnetoDriver(object):
-    def __init__(self, date = None):
+# Size (in meters) of the cells of the grid on which the field is evaluated
+DEFAULT_RESOLUTION = 100.0
+
+_model = None
+_fields = {}
+
+def _wmm_model():
+    """ Return the WMM model, loaded once for the whole simulation """
+    global _model
+    if _model is None:
         from morse.sensors._magnetometer import Magnetometer as Mag
-        self._mag = Mag(os.path.join(MORSE_COMPONENTS, 'WMM.COF'))
+        _model = Mag(os.path.join(MORSE_COMPONENTS, 'WMM.COF'))
+    return _model
+
+def geomagnetic_field(date, resolution = DEFAULT_RESOLUTION):
+    """ Return the :py:class:`GeomagneticField` at :param date:, shared by
+    all the sensors using the same resolution """
+    key = (date, resolution)
+    if key not in _fields:
+        _fields[key] = GeomagneticField(date, resolution)
+    return _fields[key]
+
+
+class GeomagneticField(object):
+    """ The geomagnetic field (north, east and down components, in nT) in
+    the scene.
+
+    The WMM model is only evaluated on the corners of a grid of
+    :param resolution: meters, the first time a sensor enters one of
+    their cells, and the field is trilinearly interpolated between them.
+    Over a cell of 100 m, the field of the model varies by a few nT at
+    most. If :param resolution: is 0, the model is evaluated at each call.
+    """
+    def __init__(self, date, resolution = DEFAULT_RESOLUTION):
+        self._mag = _wmm_model()
         self._coord_conv = CoordinateConverter.instance()
+        self._date = date
+        self.resolution = float(resolution)
+        # grid corner -> field
+        self._corners = {}
+
+    def evaluate(self, position):
+        """ Evaluate the model at the Blender :param position: """
+        pos_ltp = self._coord_conv.blender_to_ltp(position)
+        pos_lla = self._coord_conv.ltp_to_geodetic(pos_ltp)
+        (decl, incl, f, h, x, y, z) = self._mag.compute(
+                                 degrees(pos_lla[0]),
+                                 degrees(pos_lla[1]),
+                                 pos_lla[2] / 1000.0, self._date)
+        return (x, y, z)
+
+    def _corner(self, corner):
+        try:
+            return self._corners[corner]
+        except KeyError:
+            res = self.resolution
+            field = self._corners[corner] = \
+                    self.evaluate([c * res for c in corner])
+            return field
+
+    def cell(self, position):
+        """ Return the cell of :param position:, and the field at its 8
+        corners """
+        res = self.resolution
+        cell = (int(floor(position[0] / res)),
+                int(floor(position[1] / res)),
+                int(floor(position[2] / res)))
+        i, j, k = cell
+        corners = [self._corner((i + di, j + dj, k + dk))
+                   for di in (0, 1) for dj in (0, 1) for dk in (0, 1)]
+        return cell, corners
+
+    def interpolate(self, position, cell, corners):
+        """ Interpolate the field at :param position: in :param cell: """
+        res = self.resolution
+        u = position[0] / res - cell[0]
+        v = position[1] / res - cell[1]
+        w = position[2] / res - cell[2]
+        field = [0.0, 0.0, 0.0]
+        n = 0
+        for cu in (1 - u, u):
+            for cv in (1 - v, v):
+                for cw in (1 - w, w):
+                    weight = cu * cv * cw
+                    corner = corners[n]
+                    field[0] += weight * corner[0]
+                    field[1] += weight * corner[1]
+                    field[2] += weight * corner[2]
+                    n += 1
+        return field
+
+    def at(self, position):
+        """ Return the field at the Blender :param position: """
+        if not self.resolution:
+            return self.evaluate(position)
+        cell, corners = self.cell(position)
+        return self.interpolate(position, cell, corners)
+
+
+class MagnetoDriver(object):
+    def __init__(self, date = None, resolution = DEFAULT_RESOLUTION):
         if date:
             self._date = date
         else:
             self._date = _decimal_date(datetime.date.today())
+        self._field = geomagnetic_field(self._date, resolution)
+        # last cell of the sensor, and the field at its corners
+        self._cell = None
+        self._corners = None
 
     def compute(self, pose):
-        pos = numpy.matrix(pose.translation)
-        pos_ltp = self._coord_conv.blender_to_ltp(pos)
-        pos_lla = self._coord_conv.ltp_to_geodetic(pos_ltp)
-        (decl, incl, f, h, x, y, z) = self._mag.compute(
-                                 degrees(pos_lla[0, 0]),
-                                 degrees(pos_lla[0, 1]),
-                                 pos_lla[0, 2] / 1000.0, self._date)
+        position = pose.translation
+        field = self._field
+        if not field.resolution:
+            x, y, z = field.evaluate(position)
+        else:
+            res = field.resolution
+            cell = self._cell
+            if cell is None or \
+               not (0 <= position[0] / res - cell[0] < 1 and
+                    0 <= position[1] / res - cell[1] < 1 and
+                    0 <= position[2] / res - cell[2] < 1):
+                self._cell, self._corners = field.cell(position)
+            x, y, z = field.interpolate(position, self._cell, self._corners)
         mag_field = mathutils.Vector((x, y, z))
         return mag_field * pose.rotation_matrix
 
@@ -74,6 +179,11 @@ class Magnetometer(morse.core.sensor.Sensor):
     add_property('date', None, 'date', 'float', 'the date used to adjust \
             for magnetic field. If not precised, consider the today \
             date')
+    add_property('resolution', DEFAULT_RESOLUTION, 'resolution', 'float',
+            'the size, in meters, of the cells of the grid on which the \
+            magnetic field model is evaluated, the field being interpolated \
+            in between. The grid is shared by all the sensors. If 0, the \
+            model is evaluated at each step')
 
     def __init__(self, obj, parent=None):
         """ Constructor method.
@@ -84,7 +194,7 @@ class Magnetometer(morse.core.sensor.Sensor):
         logger.info('%s initialization' % obj.name)
         # Call the constructor of the parent class
         morse.core.sensor.Sensor.__init__(self, obj, parent)
-        self._mag = MagnetoDriver(self.date)
+        self._mag = MagnetoDriver(self.date, self.resolution)
 
         logger.info('Component initialized, runs at %.2f Hz', self.frequency)
 
@@ -1,7 +1,7 @@
 import logging; logger = logging.getLogger("morse." + __name__)
 
-from morse.core import blenderapi
 import morse.core.sensor
+from morse.core.spatial_index import spatial_index
 from morse.core.services import service
 from morse.helpers.components import add_data, add_property
 
@@ -70,22 +70,10 @@ class Proximity(morse.core.sensor.Sensor):
         parent = self.robot_parent.bge_object
 
         # Get the tracked sources
-        for obj in blenderapi.scene().objects:
-            try:
-                obj[self._tag]
-                # Skip distance to self
-                if parent != obj:
-                    distance = self._measure_distance_to_object (parent, obj)
-                    if distance <= self._range:
-                        self.local_data['near_objects'][obj.name] = distance
-            except KeyError:
-                pass
-
-    def _measure_distance_to_object(self, own_robot, target_object):
-        """ Compute the distance between two objects
-
-        Parameters are two blender objects
-        """
-        distance, globalVector, localVector = own_robot.getVectTo(target_object)
-        logger.debug("Distance from robot {0} to object {1} = {2}".format(own_robot, target_object, distance))
-        return distance
+        for obj, distance in spatial_index().near(self._tag,
+                                                  parent.worldPosition,
+                                                  self._range):
+            # Skip distance to self
+            if parent != obj:
+                self.local_data['near_objects'][obj.name] = distance
+
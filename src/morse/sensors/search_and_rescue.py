@@ -89,6 +89,9 @@ class SearchAndRescue(morse.core.sensor.Sensor):
                  'ignored before taking action. A lower number will '
                  'produce a lower delay')
 
+    # Reads its own logic bricks: called by them, not by the scheduler
+    uses_logic_bricks = True
+
     def __init__(self, obj, parent=None):
 
         logger.info('%s initialization' % obj.name)
@@ -1,11 +1,17 @@
 import logging; logger = logging.getLogger("morse." + __name__)
-from morse.core import blenderapi
+import math
+from morse.core import blenderapi, mathutils
+from morse.core.object_registry import object_registry
+from morse.core.spatial_index import spatial_index
 
 import morse.sensors.camera
 
 from morse.helpers import passive_objects
 from morse.helpers.components import add_data, add_property
-from morse.helpers.transformation import Transformation3d
+
+# The corners of the bounding box used as occlusion samples, by pairs of
+# opposite corners
+_SAMPLE_CORNERS = [0, 7, 3, 4, 1, 6, 2, 5]
 
 class SemanticCamera(morse.sensors.camera.Camera):
     """
@@ -48,14 +54,24 @@ class SemanticCamera(morse.sensors.camera.Camera):
     Details of implementation
     -------------------------
 
-    A test is made to identify which of these objects are inside of
-    the view frustum of the camera. Finally, a single visibility test is
-    performed by casting a ray from the center of the camera to the
-    center of the object. If anything other than the test object is
-    found first by the ray, the object is considered to be occluded by
-    something else, even if it is only the center that is being blocked.
-    This occulsion check can be deactivated (for slightly improved
-    performances) by setting the sensor property ``noocclusion`` to ``True``.
+    The tracked objects are not all tested at each step: the spatial index
+    of the scene (:py:class:`morse.core.spatial_index.SpatialIndex`) first
+    discards the objects lying in the cells of its grid which are outside
+    of the view frustum of the camera. For each remaining object, a test is
+    made to identify whether its world axis-aligned bounding box is inside
+    of the view frustum. These boxes are cached, and only computed again
+    when the object moves.
+
+    Finally, a visibility test is performed by casting rays from the
+    camera to the object: first to its origin, then, if the property
+    ``occlusion_samples`` is greater than 1, to points half way between
+    the center and pairs of opposite corners of its bounding box (up to 9
+    rays). The object is visible as soon as one of the rays hits the
+    object (or one of its children) first. With the default of a single
+    ray, an object whose origin is hidden is considered to be occluded,
+    even if the rest of the object is visible. This occlusion check can be
+    deactivated (for improved performances) by setting the sensor property
+    ``noocclusion`` to ``True``.
 
     See also :doc:`../sensors/camera` for generic informations about MORSE cameras.
 
@@ -125,6 +141,12 @@ class SemanticCamera(morse.sensors.camera.Camera):
             "objects or as their 'Type' property. You must then add fix this "
             "property to the objects you want to be detected by the semantic "
             "camera.")
+    add_property('occlusion_samples', 1, 'occlusion_samples', 'int',
+                 'The maximal number of rays cast to check that an object '
+                 'is not hidden by other objects: to its origin first, then '
+                 'to points spread in its bounding box (up to 9). With 1, '
+                 'an object whose origin is hidden is not seen, even if '
+                 'the rest of the object is visible.')
 
     def __init__(self, obj, parent=None):
         """ Constructor method.
@@ -152,22 +174,79 @@ class SemanticCamera(morse.sensors.camera.Camera):
         # (->meshes with a class property set up) as keys
         #  and the bounding boxes of these objects as value.
         self.trackedObjects = {}
-        for o in blenderapi.scene().objects:
-            tagged = ('Type' in o and o['Type'] == self.tag) or (self.tag in o and bool(o[self.tag]))
-                               
-            if tagged:
-                self.trackedObjects[o] = blenderapi.objectdata(o.name).bound_box
-                logger.warning('    - tracking %s' % o.name)
+        # object -> (world transform, world bounding box, occlusion samples)
+        self._boxes = {}
+        self._registry_version = None
+        self.occlusion_samples = max(1, min(9, int(self.occlusion_samples)))
+        self._update_tracked_objects()
 
         if self.noocclusion:
             logger.info("Semantic camera running in 'no occlusion' mode (fast mode).")
         logger.info("Component initialized, runs at %.2f Hz ", self.frequency)
 
 
+    def _update_tracked_objects(self):
+        """ Query the object registry for the tracked objects, if the
+        objects of the scene changed since the last query """
+        registry = object_registry()
+        registry.sync()
+        if registry.version == self._registry_version:
+            return
+        self._registry_version = registry.version
+
+        tracked = {}
+        for o in registry.tracked(self.tag):
+            if o in self.trackedObjects:
+                tracked[o] = self.trackedObjects[o]
+            else:
+                tracked[o] = [mathutils.Vector(corner) for corner in
+                              blenderapi.objectdata(o.name).bound_box]
+                logger.info('    - tracking %s' % o.name)
+        self.trackedObjects = tracked
+        self._boxes = dict((o, box) for o, box in self._boxes.items()
+                           if o in tracked)
+
+        # the largest distance between the position of a tracked object and
+        # a corner of its world bounding box
+        margin = 0.0
+        for o, bb in tracked.items():
+            scale = max(abs(c) for c in o.worldScale)
+            margin = max([margin] + [corner.length * scale for corner in bb])
+        self._margin = margin * math.sqrt(3)
+
+    def _world_box(self, obj):
+        """ Return the world bounding box of :param obj:, and the points
+        used to check its occlusion, computed again only if the object
+        moved """
+        transform = obj.worldTransform
+        key = tuple(row[:] for row in transform)
+        box = self._boxes.get(obj)
+        if box is not None and box[0] == key:
+            return box[1], box[2]
+
+        corners = [transform * corner for corner in self.trackedObjects[obj]]
+        low = [min(c[i] for c in corners) for i in range(3)]
+        high = [max(c[i] for c in corners) for i in range(3)]
+        bbox = [[x, y, z] for x in (low[0], high[0])
+                          for y in (low[1], high[1])
+                          for z in (low[2], high[2])]
+
+        # the origin of the object, then points half way between the
+        # center and the corners of the bounding box
+        samples = [obj.worldPosition.copy()]
+        if self.occlusion_samples > 1:
+            center = mathutils.Vector([(low[i] + high[i]) / 2 for i in range(3)])
+            samples.extend((center + mathutils.Vector(bbox[i])) / 2
+                           for i in _SAMPLE_CORNERS[:self.occlusion_samples - 1])
+
+        self._boxes[obj] = (key, bbox, samples)
+        return bbox, samples
+
     def default_action(self):
         """ Do the actual semantic 'grab'.
 
-        Iterate over all the tracked objects, and check if they are
+        Iterate over the tracked objects which may be in the frustum of the
+        camera (according to the spatial index), and check if they are
         visible for the robot.  Visible objects must have a bounding box
         and be active for physical simulation (have the 'Actor' checkbox
         selected)
@@ -175,31 +254,37 @@ class SemanticCamera(morse.sensors.camera.Camera):
         # Call the action of the parent class
         morse.sensors.camera.Camera.default_action(self)
 
+        self._update_tracked_objects()
+
+        if self.relative:
+            cam_position = self.position_3d.translation
+            cam_rotation = self.position_3d.rotation_matrix.transposed()
+            cam_orientation = self.position_3d.rotation.inverted()
+
         # Create dictionaries
         self.local_data['visible_objects'] = []
-        for obj, bb in self.trackedObjects.items():
-            if self._check_visible(obj, bb):
+        candidates = spatial_index().in_frustum(self.tag, self.blender_cam,
+                                                self._margin)
+        for obj in candidates:
+            if obj in self.trackedObjects and self._check_visible(obj):
                 # Create dictionary to contain object name, type,
                 # description, position and orientation
+                position = obj.worldPosition.copy()
+                orientation = obj.worldOrientation.to_quaternion()
                 if self.relative:
-                    t3d = Transformation3d(obj)
-                    logger.debug("t3d(obj) = {t}".format(t=t3d))
-                    logger.debug("t3d(cam) = {t}".format(t=self.position_3d))
-                    transformation = self.position_3d.transformation3d_with(t3d)
-                    logger.debug("transform = {t}".format(t=transformation))
-                else:
-                    transformation = Transformation3d(obj)
+                    position = cam_rotation * (position - cam_position)
+                    orientation = cam_orientation * orientation
                 obj_dict = {'name': obj.get('Label', obj.name),
                             'description': obj.get('Description', ''),
                             'type': obj.get('Type', ''),
-                            'position': transformation.translation,
-                            'orientation': transformation.rotation}
+                            'position': position,
+                            'orientation': orientation}
                 self.local_data['visible_objects'].append(obj_dict)
                 
         logger.debug("Visible objects: %s" % self.local_data['visible_objects'])
 
 
-    def _check_visible(self, obj, bb):
+    def _check_visible(self, obj):
         """ Check if an object lies inside of the camera frustum. 
         
         The behaviour of this method is impacted by the sensor's 
@@ -207,33 +292,29 @@ class SemanticCamera(morse.sensors.camera.Camera):
         frustum. Does not check it is actually visible (ie, not hidden
         away by another object).
         """
-        # TrackedObjects was filled at initialization
-        #  with the object's bounding boxes
-        pos = obj.position
-        bbox = [[bb_corner[i] + pos[i] for i in range(3)] for bb_corner in bb]
+        bbox, samples = self._world_box(obj)
 
         if logger.isEnabledFor(logging.DEBUG):
             logger.debug("\n--- NEW TEST ---")
-            logger.debug("OBJECT '{0}' AT {1}".format(obj, pos))
+            logger.debug("OBJECT '{0}' AT {1}".format(obj, obj.worldPosition))
             logger.debug("CAMERA '{0}' AT {1}".format(
                                     self.blender_cam, self.blender_cam.position))
             logger.debug("BBOX: >{0}<".format(bbox))
-            logger.debug("BBOX: {0}".format(bb))
-
-        # Translate the bounding box to the current object position
-        #  and check if it is in the frustum
-        if self.blender_cam.boxInsideFrustum(bbox) != self.blender_cam.OUTSIDE:
-
-            if not self.noocclusion:
-                # Check that there are no other objects between the camera
-                # and the selected object
-                # NOTE: This is a very simple test. Hiding only the 'center'
-                # of an object will make it invisible, even if the rest is
-                # still seen from the camera
-                closest_obj = self.bge_object.rayCastTo(obj)
-                if closest_obj in [obj] + list(obj.children):
-                    return True
-            else:
+
+        # Check the world bounding box is in the frustum
+        if self.blender_cam.boxInsideFrustum(bbox) == self.blender_cam.OUTSIDE:
+            return False
+
+        if self.noocclusion:
+            return True
+
+        # Check that there are no other objects between the camera and
+        # the selected object, for at least one of the samples
+        ray_cast = self.bge_object.rayCast
+        for point in samples:
+            closest_obj = ray_cast(point, None, 0)[0]
+            if closest_obj is not None and \
+               (closest_obj is obj or closest_obj.parent is obj):
                 return True
 
         return False
@@ -1,8 +1,8 @@
 import logging; logger = logging.getLogger("morse." + __name__)
 import math
 from sys import maxsize
-from morse.core import blenderapi
 import morse.core.sensor
+from morse.core.spatial_index import spatial_index
 from morse.helpers.components import add_data, add_property
 
 class Thermometer(morse.core.sensor.Sensor):
@@ -54,22 +54,17 @@ class Thermometer(morse.core.sensor.Sensor):
         
         temp = float(self._zero)
 
-        scene = blenderapi.scene()
         # Look for the fire sources marked so
-        for obj in scene.objects:
-            try:
-                f = obj[self._tag]
-                if type(f) == int or type(f) == float:
-                    fire_intensity = float(f)
-                else:
-                    fire_intensity = self._fire
-                    
-                distance, gvect, lvect = self.bge_object.getVectTo(obj)
-                if distance < self._range:
-                    t = fire_intensity * math.exp(- self._alpha * distance)
-                    temp += t
-                    
-            except KeyError as detail:
-                logger.debug("Exception: " + str(detail))
+        for obj, distance in spatial_index().near(self._tag,
+                                                  self.bge_object.worldPosition,
+                                                  self._range):
+            f = obj[self._tag]
+            if type(f) == int or type(f) == float:
+                fire_intensity = float(f)
+            else:
+                fire_intensity = self._fire
+
+            t = fire_intensity * math.exp(- self._alpha * distance)
+            temp += t
 
         self.local_data['temperature'] = float(temp)
@@ -2,8 +2,10 @@ import logging; logger = logging.getLogger("morse." + __name__)
 from morse.core.services import service
 from morse.core import status, blenderapi, mathutils
 from morse.blender.main import reset_objects as main_reset, close_all as main_close, quit as main_terminate
+from morse.blender.main import set_turbo_mode as main_set_turbo_mode
 from morse.core.abstractobject import AbstractObject
 from morse.core.exceptions import *
+from morse.core.profiler import profiler
 import json
 
 def get_structured_children_of(blender_object):
@@ -44,6 +46,16 @@ def get_obj_by_name(name):
                 "Object '%s' does not appear in the scene." % name)
     return scene.objects[name]
 
+def _stream_format(stream):
+    """
+    Return the wire format ('json' or 'binary') of a datastream, as
+    configured in the builder by add_stream(..., format='binary')
+    """
+    kwargs = stream[-1]
+    if isinstance(kwargs, dict):
+        return kwargs.get('format', 'json')
+    return 'json'
+
 class Supervision(AbstractObject):
     def __init__(self):
         AbstractObject.__init__(self)
@@ -105,6 +117,77 @@ class Supervision(AbstractObject):
             logger.warn("Component %s not found. Can't deactivate" % detail)
             raise MorseRPCTypeError("Component %s not found. Can't deactivate" % detail)
 
+    @service
+    def scheduler_statistics(self):
+        """ Return the number of robots and components whose action has
+        been called ('ran') or not ('skipped') at the last simulation step,
+        the totals since the start of the simulation, the number of
+        robots and components by frequency, and the number of components
+        still called by their logic brick ('unscheduled').
+        """
+        return blenderapi.persistantstorage().scheduler.statistics()
+
+    @service
+    def multinode_statistics(self):
+        """ Return statistics about the synchronisation of this node
+        with the other nodes of a multinode simulation. For the socket
+        protocol: the round-trip time of the messages to the server
+        ('server_rtt': count, mean, max, p50, p95 and p99, in seconds)
+        and, for each other node ('peers'), its last known simulated
+        time and its lag behind this node.
+        """
+        simu = blenderapi.persistantstorage()
+        if 'node_instance' not in simu or not simu.node_instance:
+            raise MorseRPCInvokationError("This is not a multinode simulation")
+        return simu.node_instance.statistics()
+
+    @service
+    def set_turbo_mode(self, enable = True):
+        """ Enable (or disable) the turbo mode, in which the frames are
+        rendered only when a camera needs it.
+
+        Note that the frame rate limit, if any, can not be changed at
+        runtime: to run the simulation as fast as possible, use
+        ``env.use_turbo_mode()`` in the Builder script.
+
+        :param enable: True to enable the turbo mode, False to disable it
+        :returns: True if the turbo mode is active
+        """
+        main_set_turbo_mode(enable)
+        return blenderapi.persistantstorage().turbo_mode
+
+    @service
+    def set_profiling(self, enable = True):
+        """ Enable (or disable) the frame-budget profiler, which records
+        the time spent by each component in each stage of the
+        simulation loop.
+        """
+        if enable:
+            profiler.enable()
+        else:
+            profiler.disable()
+
+    @service
+    def profiling_report(self, filename = None):
+        """ Return the statistics recorded by the profiler: for each
+        component, and each stage ('action', 'modifiers', 'datastreams',
+        'services'...), the number of calls, the total, mean, max, p50,
+        p95 and p99 durations (in seconds), and the share of the frame
+        time it represents.
+
+        :param filename: if set, the report is also written in this file
+                         on the simulator side (as CSV if the name ends
+                         with '.csv', in JSON otherwise)
+        """
+        if filename:
+            profiler.dump_report(filename)
+        return profiler.statistics()
+
+    @service
+    def reset_profiling(self):
+        """ Forget all the statistics recorded by the profiler """
+        profiler.reset()
+
     @service
     def suspend_dynamics(self):
         """ Suspends physics for all object in the scene.
@@ -155,7 +238,9 @@ class Supervision(AbstractObject):
 
             if c.name() in simu.datastreams:
                 streams = simu.datastreams[c.name()]
-                cmpt["stream_interfaces"] = [(stream[0], stream[2]) for stream in streams]
+                cmpt["stream_interfaces"] = [(stream[0], stream[2],
+                                              _stream_format(stream))
+                                             for stream in streams]
 
             return cmpt
 
@@ -1,8 +1,10 @@
 import logging; logger = logging.getLogger("morse." + __name__)
+import time
 from morse.core.services import service, async_service
 from morse.core import status, blenderapi
 from morse.core.abstractobject import AbstractObject
-from morse.core.morse_time import time_isafter
+from morse.core.morse_time import time_isafter, LockstepStrategy
+from morse.core.exceptions import MorseRPCInvokationError
 
 class TimeServices(AbstractObject):
     def __init__(self):
@@ -10,6 +12,11 @@ class TimeServices(AbstractObject):
         self.time = blenderapi.persistantstorage().time
         self.ref_fps = blenderapi.getfrequency()
         self._alarm_time = None
+        self._stepping = TimeStepping(self.time)
+
+        # Reference points to compute the real-time factor
+        self._rtf_start = (self.time.time, time.time())
+        self._rtf_last = self._rtf_start
 
     def name(self):
         return "time"
@@ -28,9 +35,24 @@ class TimeServices(AbstractObject):
     def statistics(self):
         """
         Return various statistics associated to the specific time
-        management mode
+        management mode, and the real-time factor (simulated time
+        elapsed divided by wall-clock time elapsed) since the start of
+        the simulation ('real_time_factor') and since the previous call
+        to this service ('instant_real_time_factor')
         """
-        return self.time.statistics()
+        stats = self.time.statistics()
+        now = (self.time.time, time.time())
+        stats['real_time_factor'] = self._real_time_factor(self._rtf_start, now)
+        stats['instant_real_time_factor'] = self._real_time_factor(self._rtf_last, now)
+        self._rtf_last = now
+        return stats
+
+    @staticmethod
+    def _real_time_factor(start, end):
+        wall_time = end[1] - start[1]
+        if wall_time <= 0.0:
+            return 0.0
+        return (end[0] - start[0]) / wall_time
 
     @service
     def set_time_scale(self, value):
@@ -56,14 +78,87 @@ class TimeServices(AbstractObject):
         """
         Sleep  for time seconds
 
+        In Lockstep mode, the simulated time only advances with
+        :py:meth:`TimeStepping.step` and :py:meth:`TimeStepping.run_until`:
+        a client must not wait for a sleep without another client (or
+        thread) stepping the simulation.
+
         :param: a float representing the time to wait (in second)
         """
 
         self._alarm_time = self.time.time + float(time)
         logger.debug('alarm registered for %f' % self._alarm_time)
 
+    def register_services(self):
+        AbstractObject.register_services(self)
+        self._stepping.register_services()
+
     def action(self):
+        self._stepping.action()
+
         if self._alarm_time and time_isafter(self.time.time, self._alarm_time):
             logger.debug('alarm fired at %f difference %f' % (self.time.time, self._alarm_time - self.time.time))
             self._alarm_time = None
             self.completed(status.SUCCESS)
+
+
+class TimeStepping(AbstractObject):
+    """
+    The services stepping the simulation in Lockstep mode, exposed with
+    the other time services.
+
+    They are kept apart from :py:class:`TimeServices` to have their own
+    completion: a pending ``time.sleep`` (which only completes when the
+    simulation is stepped) does not prevent stepping the simulation.
+    """
+    def __init__(self, time):
+        AbstractObject.__init__(self)
+        self.time = time
+        self._running = False
+
+    def name(self):
+        return "time"
+
+    def _request_steps(self, steps = None, until = None):
+        if not isinstance(self.time, LockstepStrategy):
+            raise MorseRPCInvokationError(
+                    "Stepping is only available in Lockstep mode (current "
+                    "mode: %s)" % self.time.name())
+        try:
+            self.time.request(steps, until)
+        except ValueError as e:
+            raise MorseRPCInvokationError(str(e))
+        self._running = True
+
+    @async_service
+    def step(self, n = 1):
+        """
+        In Lockstep mode, advance the simulation by n steps, then block
+        it again.
+
+        The service returns when the n steps have been simulated, with a
+        report containing the number of steps, the simulated time, the
+        wall-clock time taken by the batch, and the resulting real-time
+        factor.
+
+        :param n: the number of steps to simulate (default: 1)
+        """
+        self._request_steps(steps = int(n))
+
+    @async_service
+    def run_until(self, time):
+        """
+        In Lockstep mode, run the simulation until the simulated time
+        reaches time, then block it again.
+
+        The service returns the same report as :py:meth:`step`.
+
+        :param time: the simulated time to reach (in seconds, in the
+                     same referential than ``time.now``)
+        """
+        self._request_steps(until = float(time))
+
+    def action(self):
+        if self._running and not self.time.running:
+            self._running = False
+            self.completed(status.SUCCESS, self.time.last_batch())
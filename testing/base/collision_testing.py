@@ -61,6 +61,21 @@ class CollisionTest(MorseTestCase):
             self.assertNotEqual(collision, None)
             self.assertEqual(collision['objects'], "dala")
 
+    def test_collision_with_scheduler(self):
+        """ The collision sensor reads its own logic brick: it must still be
+        called by it while the scheduler calls the other components """
+        with Morse() as sim:
+            stats = sim.rpc('simulation', 'scheduler_statistics')
+            self.assertEqual(stats['unscheduled'], 1)
+            self.assertGreater(stats['total_ran'], 0)
+
+            send_speed(sim.robot.motion, sim, 1.0, 0.0)
+            sim.sleep(2.0)
+            collision = sim.robot.collision.get(timeout=0.1)
+            self.assertNotEqual(collision, None)
+            self.assertTrue(collision['collision'])
+            self.assertEqual(collision['objects'], "dala")
+
 ########################## Run these tests ##########################
 if __name__ == "__main__":
     from morse.testing.testing import main
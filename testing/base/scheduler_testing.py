@@ -0,0 +1,115 @@
+#! /usr/bin/env python
+"""
+This script tests the scheduler of the components actions.
+
+It does not need a simulation: the robots, components and the sensors of
+their logic bricks are faked.
+"""
+
+import unittest
+from unittest import mock
+
+from morse.core.scheduler import Scheduler
+
+
+class FakeTime(object):
+    def __init__(self, frequency):
+        self.time = 0.0
+        self.mean = 1.0 / frequency
+
+    def step(self):
+        self.time += self.mean
+
+
+class FakeSensor(object):
+    positive = True
+
+
+class FakeObject(object):
+    uses_logic_bricks = False
+    scheduled = False
+
+    def __init__(self, frequency = None):
+        self.bge_object = FakeSensor()
+        self.calls = 0
+        if frequency:
+            self.frequency = frequency
+            self._component_period = 1.0 / frequency
+
+    def action(self):
+        self.calls += 1
+
+
+class BrickObject(FakeObject):
+    uses_logic_bricks = True
+
+
+class SchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.time = FakeTime(60)
+        self.scheduler = Scheduler(self.time)
+        # the sensor of the logic brick of an object is its bge_object
+        patcher = mock.patch('morse.core.blenderapi.getcallingsensor',
+                             lambda obj: obj)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_steps(self, steps):
+        for i in range(steps):
+            self.scheduler.tick()
+            self.time.step()
+
+    def test_frequencies(self):
+        robot = FakeObject()
+        fast = FakeObject()
+        slow = FakeObject(frequency = 10)
+        self.assertTrue(self.scheduler.add(robot, 'robot'))
+        self.assertTrue(self.scheduler.add(fast, 'component'))
+        self.assertTrue(self.scheduler.add(slow, 'component'))
+        self.assertTrue(robot.scheduled)
+        self.assertTrue(robot.periodic_call())
+
+        self.run_steps(60)
+        self.assertEqual(robot.calls, 60)
+        self.assertEqual(fast.calls, 60)
+        self.assertEqual(slow.calls, 10)
+
+        stats = self.scheduler.statistics()
+        self.assertEqual(stats['ticks'], 60)
+        self.assertEqual(stats['total_ran'], 130)
+        self.assertEqual(stats['total_skipped'], 50)
+
+    def test_logic_bricks(self):
+        """ The components reading their own logic bricks are left to them """
+        component = FakeObject()
+        collision = BrickObject()
+        self.assertTrue(self.scheduler.add(component, 'component'))
+        self.assertFalse(self.scheduler.add(collision, 'component'))
+        self.assertFalse(collision.scheduled)
+
+        self.run_steps(5)
+        self.assertEqual(component.calls, 5)
+        self.assertEqual(collision.calls, 0)
+        self.assertEqual(self.scheduler.statistics()['unscheduled'], 1)
+
+    def test_sensor_gating(self):
+        """ As with the logic bricks, an object is only called when the
+        sensor of its brick is positive """
+        component = FakeObject()
+        self.scheduler.add(component, 'component')
+
+        self.run_steps(2)
+        component.bge_object.positive = False
+        self.run_steps(3)
+        self.assertEqual(component.calls, 2)
+        self.assertEqual(self.scheduler.skipped, 1)
+
+        component.bge_object.positive = True
+        self.run_steps(1)
+        self.assertEqual(component.calls, 3)
+
+
+########################## Run these tests ##########################
+if __name__ == "__main__":
+    unittest.main()
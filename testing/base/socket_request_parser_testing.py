@@ -0,0 +1,276 @@
+#! /usr/bin/env python
+"""
+This script tests the parsing of the requests of the socket request
+manager, and their reassembly from the socket reads.
+
+It does not need a simulation: the manager is fed through a pair of
+local sockets, and the services are faked.
+"""
+
+import socket
+import select
+import unittest
+
+from morse.core import status
+from morse.middleware.socket_request_manager import parse_request, \
+                                                    SocketRequestManager, \
+                                                    CANCEL, BATCH
+from morse.middleware.socket_reactor import ReactorConnection
+
+
+class ParseRequestTest(unittest.TestCase):
+
+    def test_request(self):
+        req = parse_request(b'req1 robot.motion set_speed [1.0, 0.5]\n')
+        self.assertEqual(req.id, 'req1')
+        self.assertEqual(req.component, 'robot.motion')
+        self.assertEqual(req.service, 'set_speed')
+        self.assertEqual(req.params, [1.0, 0.5])
+        self.assertIsNone(req.error)
+
+    def test_request_without_params(self):
+        req = parse_request(b'req1 simulation list_robots')
+        self.assertEqual((req.component, req.service), ('simulation', 'list_robots'))
+        self.assertIsNone(req.params)
+        self.assertIsNone(req.error)
+
+    def test_cancel(self):
+        req = parse_request(b'req1 cancel')
+        self.assertEqual(req.id, 'req1')
+        self.assertEqual(req.service, CANCEL)
+        self.assertIsNone(req.error)
+
+    def test_batch(self):
+        req = parse_request(b'b1 batch [["robot.motion", "stop"], '
+                            b'["robot.pose", "get_pose", []], '
+                            b'["robot.motion", "goto", [1, 2, 0]]]')
+        self.assertEqual(req.id, 'b1')
+        self.assertEqual(req.service, BATCH)
+        self.assertIsNone(req.error)
+        self.assertEqual(req.params, [('robot.motion', 'stop', None),
+                                      ('robot.pose', 'get_pose', []),
+                                      ('robot.motion', 'goto', [1, 2, 0])])
+
+    def test_batch_component(self):
+        # a component called 'batch' is still reachable
+        req = parse_request(b'req1 batch get_status')
+        self.assertEqual((req.component, req.service), ('batch', 'get_status'))
+        self.assertIsNone(req.error)
+
+    def test_malformed_requests(self):
+        for line in [b'req1', b'req1 robot.motion', b'\xff\xfe robot service',
+                     b'req1 robot.motion set_speed [1.0, ']:
+            req = parse_request(line)
+            self.assertIsNotNone(req.error, line)
+            self.assertIsNone(req.service, line)
+
+    def test_malformed_batches(self):
+        for batch in [b'[1, 2]',
+                      b'[["robot.motion"]]',
+                      b'[["robot.motion", "goto", [1], "extra"]]',
+                      b'[["robot.motion", 3]]',
+                      b'[["robot.motion", "goto", 1]]',
+                      b'[["robot.motion", "stop"], ',
+                      b'["robot.motion", "stop"']:
+            req = parse_request(b'b1 batch ' + batch)
+            self.assertEqual(req.id, 'b1')
+            self.assertIsNotNone(req.error, batch)
+            self.assertIsNone(req.service, batch)
+
+
+class FakeSocketRequestManager(SocketRequestManager):
+    """ A socket request manager whose only client is the end of a local
+    socket pair, and whose services are faked:
+
+    - 'sync' returns its params at once,
+    - 'async' completes when :py:meth:`complete` is called,
+    - any other service fails.
+    """
+    def initialization(self):
+        self._client_sockets = []
+        self._pending_sockets = {}
+        self._results_to_output = {}
+        self._in_buffers = {}
+        self._endpoint = None
+
+        # never readable: no connection is accepted
+        self._server, self._unused = socket.socketpair()
+
+        sock, self.remote = socket.socketpair()
+        self.remote.settimeout(1.0)
+        self._client_sockets.append(sock)
+        self._in_buffers[sock] = bytearray()
+
+        self.calls = []
+        self.aborted = []
+        self._next_id = 0
+        return True
+
+    def finalization(self):
+        SocketRequestManager.finalization(self)
+        self.remote.close()
+        self._unused.close()
+        return True
+
+    def on_incoming_request(self, component, service, params):
+        self.calls.append((component, service, params))
+        if service == 'sync':
+            return True, (status.SUCCESS, params)
+        if service == 'async':
+            self._next_id += 1
+            return False, self._next_id
+        return True, (status.FAILED, 'unknown service')
+
+    def abort_request(self, request_id):
+        self.aborted.append(request_id)
+
+    def complete(self, request_id, result):
+        self.on_service_completion(request_id, (status.SUCCESS, result))
+
+    def send(self, *chunks):
+        """ Send :param chunks: in distinct reads, and read the replies """
+        for chunk in chunks:
+            self.remote.sendall(chunk)
+            self._wait_readable()
+            self.main()
+        return self.replies()
+
+    def replies(self):
+        self.main()
+        self.remote.setblocking(False)
+        try:
+            data = self.remote.recv(65536)
+        except (socket.error, BlockingIOError):
+            data = b''
+        self.remote.settimeout(1.0)
+        return data.decode().splitlines()
+
+    def _wait_readable(self):
+        select.select(self._client_sockets, [], [], 1.0)
+
+
+class SocketRequestManagerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = FakeSocketRequestManager()
+
+    def tearDown(self):
+        self.manager.finalization()
+
+    def test_split_request(self):
+        replies = self.manager.send(b'req1 robot.moti', b'on sync [1, ', b'2]')
+        self.assertEqual(self.manager.calls, [])
+        self.assertEqual(replies, [])
+
+        replies = self.manager.send(b'\n')
+        self.assertEqual(self.manager.calls, [('robot.motion', 'sync', [1, 2])])
+        self.assertEqual(replies, ['req1 SUCCESS [1, 2]'])
+
+    def test_coalesced_requests(self):
+        replies = self.manager.send(b'req1 a sync [1]\nreq2 b sync [2]\n\nreq3 c sy',
+                                    b'nc [3]\n')
+        self.assertEqual(self.manager.calls, [('a', 'sync', [1]),
+                                              ('b', 'sync', [2]),
+                                              ('c', 'sync', [3])])
+        self.assertEqual(replies, ['req1 SUCCESS [1]',
+                                   'req2 SUCCESS [2]',
+                                   'req3 SUCCESS [3]'])
+
+    def test_malformed_request(self):
+        replies = self.manager.send(b'req1 robot.motion\nreq2 a sync [2]\n')
+        self.assertEqual(self.manager.calls, [('a', 'sync', [2])])
+        self.assertEqual(len(replies), 2)
+        self.assertTrue(replies[0].startswith('req1 FAILED'))
+        self.assertEqual(replies[1], 'req2 SUCCESS [2]')
+
+    def test_malformed_batch(self):
+        replies = self.manager.send(b'b1 batch [["a", "sync"], ["b"]]\n')
+        # nothing of the batch is invoked
+        self.assertEqual(self.manager.calls, [])
+        self.assertEqual(len(replies), 1)
+        self.assertTrue(replies[0].startswith('b1 FAILED'))
+
+    def test_sync_batch(self):
+        replies = self.manager.send(b'b1 batch [["a", "sync", [1]], ["b", "unknown"]]\n')
+        self.assertEqual(replies, ['b1 SUCCESS [["SUCCESS", [1]], '
+                                   '["FAILED", "unknown service"]]'])
+
+    def test_partial_batch_completion(self):
+        manager = self.manager
+        replies = manager.send(b'b1 batch [["a", "async"], ["b", "sync", [2]], '
+                               b'["c", "async"]]\n')
+        self.assertEqual(len(manager.calls), 3)
+        self.assertEqual(replies, [])
+
+        # the batch is replied once, when its last call completes
+        manager.complete(2, 'c done')
+        self.assertEqual(manager.replies(), [])
+        manager.complete(1, 'a done')
+        self.assertEqual(manager.replies(),
+                         ['b1 SUCCESS [["SUCCESS", "a done"], '
+                          '["SUCCESS", [2]], ["SUCCESS", "c done"]]'])
+        self.assertEqual(manager._pending_sockets, {})
+
+    def test_batch_cancel(self):
+        manager = self.manager
+        manager.send(b'b1 batch [["a", "async"], ["b", "async"]]\n'
+                     b'req2 c async\n')
+        self.assertEqual(manager.send(b'b1 cancel\n'), [])
+        # all the pending calls of the batch are aborted, and only them
+        self.assertEqual(sorted(manager.aborted), [1, 2])
+
+        manager.send(b'req2 cancel\n')
+        self.assertEqual(sorted(manager.aborted), [1, 2, 3])
+
+    def test_client_disconnection(self):
+        manager = self.manager
+        manager.send(b'req1 a sy')
+        manager.remote.close()
+        manager._wait_readable()
+        manager.main()
+        self.assertEqual(manager._client_sockets, [])
+        self.assertEqual(manager._in_buffers, {})
+        self.assertEqual(manager.calls, [])
+
+
+class FakeReactor(object):
+    def unregister(self, sock):
+        pass
+
+class ReactorConnectionTest(unittest.TestCase):
+    """ With the I/O thread, the lines are split (and parsed) by the
+    connections of the reactor """
+
+    def setUp(self):
+        sock, self.remote = socket.socketpair()
+        self.connection = ReactorConnection(FakeReactor(), sock, None,
+                                            read_lines = True,
+                                            parse = parse_request)
+
+    def tearDown(self):
+        self.connection.close()
+        self.remote.close()
+
+    def send(self, *chunks):
+        for chunk in chunks:
+            self.remote.sendall(chunk)
+            select.select([self.connection.sock], [], [], 1.0)
+            self.connection._handle_read()
+        return self.connection.receive()
+
+    def test_reassembly(self):
+        self.assertEqual(self.send(b'req1 a sync', b' [1'), [])
+        requests = self.send(b']\nreq2 b', b' sync\nreq3')
+        self.assertEqual([(r.id, r.component, r.params) for r in requests],
+                         [('req1', 'a', [1]), ('req2', 'b', None)])
+
+    def test_blank_lines(self):
+        """ Blank lines are skipped, as in polling mode """
+        requests = self.send(b'\n  \nreq1 a sync\n\r\n\n')
+        self.assertEqual([r.id for r in requests], ['req1'])
+        self.assertTrue(all(r.error is None for r in requests))
+
+
+########################## Run these tests ##########################
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+#! /usr/bin/env python
+"""
+This script tests the 'npz' format of the columnar text datastreams:
+the values written by batches by NPZColumns are read back by
+load_columns.
+
+It does not need a simulation.
+"""
+
+import os
+import json
+import shutil
+import zipfile
+import tempfile
+import unittest
+from collections import OrderedDict
+
+import numpy
+
+from morse.middleware.text_datastream import NPZColumns, load_columns
+
+
+def make_schema(**types):
+    return OrderedDict((name, {'type': types[name], 'doc': ''})
+                       for name in sorted(types))
+
+class NPZColumnsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'columns.npz')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, schema, batches):
+        """ Write :param batches: (lists of rows, the values of a row
+        follow the order of the names of the columns) """
+        output = NPZColumns(self.filename, schema)
+        for rows in batches:
+            output.write(rows)
+        output.close()
+        return load_columns(self.filename)
+
+    def encodings(self):
+        with zipfile.ZipFile(self.filename) as archive:
+            info = json.loads(archive.read('schema.json').decode())
+        return dict((name, column['encoding'])
+                    for name, column in info['columns'].items())
+
+    def test_scalars(self):
+        schema = make_schema(a_float = 'float', b_int = 'int', c_bool = 'bool',
+                             d_string = 'string', e_undeclared = '')
+        columns = self.write(schema, [[[0.5, 1, True, 'x', 2]],
+                                      [[1.5, 2, False, 'longer', 2.5],
+                                       [None, 3, True, '', 3]]])
+        self.assertEqual(list(columns), list(schema))
+        numpy.testing.assert_array_equal(columns['a_float'], [0.5, 1.5, numpy.nan])
+        self.assertEqual(columns['b_int'].dtype, numpy.int64)
+        self.assertEqual(list(columns['b_int']), [1, 2, 3])
+        self.assertEqual(list(columns['c_bool']), [True, False, True])
+        self.assertEqual(list(columns['d_string']), ['x', 'longer', ''])
+        self.assertEqual(list(columns['e_undeclared']), [2.0, 2.5, 3.0])
+        self.assertEqual(self.encodings(),
+                         {'a_float': 'float', 'b_int': 'int', 'c_bool': 'bool',
+                          'd_string': 'str', 'e_undeclared': 'float'})
+
+    def test_ragged_values(self):
+        """ The encoding of a column is kept, even if its values are
+        regular in a batch and ragged in another """
+        schema = make_schema(objects = 'list<objects>', ranges = 'list')
+        objects = [[], [{'name': 'table', 'position': [1.0, 2.0, 0.0]}],
+                   [{'name': 'a'}, {'name': 'b'}]]
+        ranges = [[], [1.0, 2.0], [3.0]]
+        columns = self.write(schema, [[[[], []], [[], []]],
+                                      [[objects[1], ranges[1]],
+                                       [objects[2], ranges[2]]]])
+        self.assertEqual(self.encodings(), {'objects': 'json', 'ranges': 'json'})
+        self.assertEqual(columns['objects'].dtype, object)
+        self.assertEqual(columns['objects'].shape, (4,))
+        self.assertEqual(list(columns['objects']), [[]] + objects)
+        self.assertEqual(list(columns['ranges']), [[]] + ranges)
+
+    def test_arrays(self):
+        """ numpy arrays (and other values with tolist) are recorded as
+        JSON lists """
+        schema = make_schema(point = '', matrix = 'mat3<float>')
+        columns = self.write(schema, [[[numpy.eye(3), numpy.arange(3.0)]],
+                                      [[numpy.zeros((3, 3)), numpy.ones(3)]]])
+        self.assertEqual(self.encodings(), {'matrix': 'json', 'point': 'json'})
+        self.assertEqual(columns['point'][1], [1.0, 1.0, 1.0])
+        self.assertEqual(columns['matrix'][0], numpy.eye(3).tolist())
+
+    def test_mismatching_declaration(self):
+        """ Values not matching their declared type are recorded as JSON """
+        schema = make_schema(position = 'float')
+        columns = self.write(schema, [[[[1.0, 2.0]]], [[[3.0]]]])
+        self.assertEqual(self.encodings(), {'position': 'json'})
+        self.assertEqual(list(columns['position']), [[1.0, 2.0], [3.0]])
+
+    def test_empty(self):
+        columns = self.write(make_schema(x = 'float'), [])
+        self.assertEqual(len(columns['x']), 0)
+
+
+########################## Run these tests ##########################
+if __name__ == "__main__":
+    unittest.main()